@@ -0,0 +1 @@
+"""titiler benchmarks."""
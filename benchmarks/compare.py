@@ -0,0 +1,77 @@
+"""Compare pytest-benchmark results with a baseline.
+
+Usage:
+
+    python benchmarks/compare.py baseline.json output.json --threshold 1.3
+
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict
+
+
+def load(path: str, stat: str) -> Dict[str, float]:
+    """Load benchmark results (`{fullname: stat}`)."""
+    with open(path) as f:
+        results = json.load(f)
+
+    return {bench["fullname"]: bench["stats"][stat] for bench in results["benchmarks"]}
+
+
+def main() -> int:
+    """Print a markdown report and return 1 if a benchmark regressed."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", help="Baseline benchmark JSON file.")
+    parser.add_argument("current", help="Current benchmark JSON file.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.3,
+        help="Maximum allowed current/baseline ratio. Defaults to 1.3 (30%% slower).",
+    )
+    parser.add_argument(
+        "--stat",
+        default="median",
+        choices=["min", "max", "mean", "median"],
+        help="Statistic to compare. Defaults to `median`.",
+    )
+    parser.add_argument(
+        "--fail", action="store_true", help="Exit with status 1 on regression."
+    )
+    args = parser.parse_args()
+
+    baseline = load(args.baseline, args.stat)
+    current = load(args.current, args.stat)
+
+    regressions = 0
+    print("| Benchmark | Baseline (ms) | Current (ms) | Ratio | |")
+    print("| --- | ---: | ---: | ---: | --- |")
+    for name, value in current.items():
+        if name not in baseline:
+            print(f"| `{name}` | - | {value * 1000:.3f} | - | new |")
+            continue
+
+        ratio = value / baseline[name]
+        if ratio > args.threshold:
+            status = "regression"
+            regressions += 1
+        elif ratio < 1 / args.threshold:
+            status = "improvement"
+        else:
+            status = ""
+
+        print(
+            f"| `{name}` | {baseline[name] * 1000:.3f} | {value * 1000:.3f} | {ratio:.2f} | {status} |"
+        )
+
+    print(
+        f"\n{regressions} regression(s) above {args.threshold:.2f}x the baseline {args.stat}."
+    )
+
+    return 1 if regressions and args.fail else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""``pytest`` configuration for titiler benchmarks."""
+
+import os
+
+import numpy
+import pytest
+from cogeo_mosaic.backends import FileBackend
+from cogeo_mosaic.mosaic import MosaicJSON
+from fastapi import FastAPI
+from rasterio.warp import transform_bounds
+from rio_tiler.io import Reader
+from starlette.testclient import TestClient
+
+from titiler.core.errors import DEFAULT_STATUS_CODES, add_exception_handlers
+from titiler.core.factory import TilerFactory
+from titiler.mosaic.errors import MOSAIC_STATUS_CODES
+from titiler.mosaic.factory import MosaicTilerFactory
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..", "src", "titiler")
+CORE_FIXTURES = os.path.join(ROOT_DIR, "core", "tests", "fixtures")
+MOSAIC_FIXTURES = os.path.join(ROOT_DIR, "mosaic", "tests", "fixtures")
+
+COG = os.path.join(CORE_FIXTURES, "cog.tif")
+DEM = os.path.join(CORE_FIXTURES, "dem.tif")
+TCI = os.path.join(CORE_FIXTURES, "TCI.tif")
+MOSAIC_ASSETS = [os.path.join(MOSAIC_FIXTURES, f) for f in ["cog1.tif", "cog2.tif"]]
+
+# Tile covering both mosaic assets
+MOSAIC_TILE = (37, 45, 7)
+
+
+@pytest.fixture(scope="session")
+def cog_client() -> TestClient:
+    """TilerFactory application."""
+    app = FastAPI()
+    app.include_router(TilerFactory().router)
+    add_exception_handlers(app, DEFAULT_STATUS_CODES)
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def mosaic_client() -> TestClient:
+    """MosaicTilerFactory application."""
+    app = FastAPI()
+    app.include_router(MosaicTilerFactory().router)
+    add_exception_handlers(app, DEFAULT_STATUS_CODES)
+    add_exception_handlers(app, MOSAIC_STATUS_CODES)
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def mosaic_factory(tmp_path_factory):
+    """Create MosaicJSON documents with `n` assets for the benchmark tile."""
+    tmpdir = tmp_path_factory.mktemp("mosaics")
+
+    def _mosaic(n: int) -> str:
+        path = str(tmpdir / f"mosaic_{n}.json")
+        if not os.path.exists(path):
+            mosaic_def = MosaicJSON.from_urls(MOSAIC_ASSETS)
+            # Same assets repeated so every quadkey references `n` assets
+            mosaic_def.tiles = {
+                qk: [MOSAIC_ASSETS[i % len(MOSAIC_ASSETS)] for i in range(n)]
+                for qk in mosaic_def.tiles
+            }
+            with FileBackend(path, mosaic_def=mosaic_def) as mosaic:
+                mosaic.write(overwrite=True)
+
+        return path
+
+    return _mosaic
+
+
+@pytest.fixture(scope="session")
+def dem_image():
+    """DEM ImageData (1 band, float32)."""
+    with Reader(DEM) as src:
+        return src.preview(max_size=256)
+
+
+@pytest.fixture(scope="session")
+def large_dem_image():
+    """DEM ImageData (1 band, float32, 1030x1030 e.g 1024x1024 tile with buffer)."""
+    with Reader(DEM) as src:
+        return src.preview(width=1030, height=1030)
+
+
+@pytest.fixture(scope="session")
+def rgb_image():
+    """RGB ImageData (3 bands, uint8)."""
+    with Reader(TCI) as src:
+        return src.preview(max_size=256)
+
+
+@pytest.fixture(scope="session")
+def uint16_array():
+    """Random uint16 array (3 bands, 256x256) and mask."""
+    rng = numpy.random.default_rng(0)
+    data = rng.integers(0, 10000, size=(3, 256, 256)).astype("uint16")
+    mask = numpy.ones((3, 256, 256), dtype="bool")
+    return data, mask
+
+
+@pytest.fixture(scope="session")
+def cog_features():
+    """Create GeoJSON FeatureCollection with `n` polygons within the COG bounds."""
+    with Reader(COG) as src:
+        minx, miny, maxx, maxy = transform_bounds(src.crs, "epsg:4326", *src.bounds)
+
+    def _features(n: int):
+        side = int(numpy.ceil(numpy.sqrt(n)))
+        xres = (maxx - minx) / side
+        yres = (maxy - miny) / side
+        features = []
+        for i in range(n):
+            col, row = i % side, i // side
+            x0, y0 = minx + col * xres, maxy - (row + 1) * yres
+            x1, y1 = x0 + xres * 0.9, y0 + yres * 0.9
+            features.append(
+                {
+                    "type": "Feature",
+                    "properties": {"id": i},
+                    "geometry": {
+                        "type": "Polygon",
+                        "coordinates": [
+                            [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+                        ],
+                    },
+                }
+            )
+
+        return {"type": "FeatureCollection", "features": features}
+
+    return _features
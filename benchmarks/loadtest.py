@@ -0,0 +1,345 @@
+"""Load-test titiler.application with a local object-store stand-in.
+
+The script starts:
+
+- an HTTP server supporting `Range` requests (standing in for S3) with injectable latency and bandwidth,
+- the `titiler.application.main:app` application (uvicorn subprocess, unless `--app-url` is set),
+
+replays a tile-access trace and reports throughput, p50/p99 latency and bytes fetched per tile.
+
+Usage:
+
+    # Tiles covering the dataset at zoom 8 and 9, 50ms latency and 20MB/s per connection
+    python -m benchmarks.loadtest src/titiler/core/tests/fixtures/cog.tif --zoom 8 9 --latency 0.05 --bandwidth 20e6
+
+    # Replay a trace (`z/x/y` lines or web-server access logs with `/tiles/` requests)
+    python -m benchmarks.loadtest cog.tif --trace access.log --concurrency 16 --params rescale=0,1000
+
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+import morecantile
+import numpy
+from rio_tiler.io import Reader
+
+from benchmarks.rangeserver import RangeRequestHandler
+
+# `/tiles/{tileMatrixSetId}/{z}/{x}/{y}@{scale}x.{format}` (from access logs)
+TILE_PATH_REGEX = re.compile(
+    r"/tiles/(?:(?P<tms>[A-Za-z][\w-]*)/)?(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)(?:@(?P<scale>\d)x)?(?:\.(?P<format>\w+))?(?:\?(?P<query>[^\s\"]*))?"
+)
+# `z/x/y`, `z,x,y` or `z x y`
+TILE_REGEX = re.compile(r"^\s*(?P<z>\d+)[/,\s]+(?P<x>\d+)[/,\s]+(?P<y>\d+)\s*$")
+
+
+def get_free_port() -> int:
+    """Return a free TCP port."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_range_server(
+    directory: str,
+    latency: float = 0,
+    bandwidth: Optional[float] = None,
+) -> ThreadingHTTPServer:
+    """Start the range-request server in a background thread."""
+    handler = partial(
+        RangeRequestHandler,
+        directory=directory,
+        latency=latency,
+        bandwidth=bandwidth,
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", get_free_port()), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_application(
+    workers: int, env: Dict[str, str]
+) -> Tuple[subprocess.Popen, str]:
+    """Start `titiler.application` with uvicorn and wait for `/healthz`."""
+    port = get_free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "titiler.application.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        env={**os.environ, **env},
+    )
+
+    app_url = f"http://127.0.0.1:{port}"
+    for _ in range(120):
+        if process.poll() is not None:
+            raise RuntimeError("titiler application failed to start")
+
+        try:
+            with urllib.request.urlopen(f"{app_url}/healthz", timeout=1):
+                return process, app_url
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+
+    process.terminate()
+    raise RuntimeError("titiler application did not respond to /healthz")
+
+
+def parse_trace(path: str) -> List[Dict]:
+    """Parse trace file (`z/x/y` lines or web-server access logs)."""
+    tiles: List[Dict[str, Any]] = []
+    with open(path) as f:
+        for line in f:
+            if match := TILE_REGEX.match(line):
+                tiles.append({k: int(v) for k, v in match.groupdict().items()})
+                continue
+
+            if match := TILE_PATH_REGEX.search(line):
+                groups = match.groupdict()
+                query = groups.pop("query") or ""
+                tile: Dict[str, Any] = {
+                    k: v for k, v in groups.items() if v is not None
+                }
+                tile.update(
+                    z=int(groups["z"]),
+                    x=int(groups["x"]),
+                    y=int(groups["y"]),
+                    params=[(k, v) for k, v in parse_qsl(query) if k != "url"],
+                )
+                tiles.append(tile)
+
+    return tiles
+
+
+def dataset_tiles(dataset: str, zooms: List[int], tms: str) -> List[Dict]:
+    """List tiles covering the dataset for zoom levels."""
+    tilematrixset = morecantile.tms.get(tms)
+    with Reader(dataset, tms=tilematrixset) as src:
+        west, south, east, north = src.get_geographic_bounds(
+            tilematrixset.rasterio_geographic_crs
+        )
+
+    return [
+        {"z": t.z, "x": t.x, "y": t.y}
+        for t in tilematrixset.tiles(west, south, east, north, zooms, truncate=True)
+    ]
+
+
+def fetch(url: str) -> Tuple[float, int, int]:
+    """Fetch url, return latency, status and response size."""
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=60) as response:
+            content = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        content = e.read()
+        status = e.code
+
+    return time.perf_counter() - start, status, len(content)
+
+
+def main() -> int:  # noqa: C901
+    """Run load test."""
+    parser = argparse.ArgumentParser(
+        description="Load-test titiler.application with a local object-store stand-in."
+    )
+    parser.add_argument(
+        "dataset", help="Local dataset to serve through the range-request server."
+    )
+    parser.add_argument("--trace", help="Trace file (`z/x/y` lines or access logs).")
+    parser.add_argument(
+        "--zoom",
+        type=int,
+        nargs="+",
+        help="Zoom levels to generate the trace from the dataset bounds (when no --trace).",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="Number of times to replay the trace."
+    )
+    parser.add_argument("--shuffle", action="store_true", help="Shuffle the trace.")
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=0,
+        help="Number of requests to send (sequentially) before measuring.",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Number of concurrent clients."
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Range-request server latency (seconds) per request.",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=float,
+        help="Range-request server bandwidth (bytes/second) per connection.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Number of uvicorn workers."
+    )
+    parser.add_argument(
+        "--app-url",
+        help="Use a running titiler application instead of starting one (it must be able to reach the range-request server).",
+    )
+    parser.add_argument(
+        "--tile-path",
+        default="/cog/tiles/{tms}/{z}/{x}/{y}.{format}",
+        help="Tile endpoint path template.",
+    )
+    parser.add_argument(
+        "--tms", default="WebMercatorQuad", help="TileMatrixSet identifier."
+    )
+    parser.add_argument("--format", default="png", help="Tile format.")
+    parser.add_argument(
+        "--params",
+        nargs="*",
+        default=[],
+        help="Additional query parameters (`key=value`).",
+    )
+    parser.add_argument(
+        "--env",
+        nargs="*",
+        default=[],
+        help="Environment variables for the application (`KEY=VALUE`).",
+    )
+    parser.add_argument("--output", help="Write the report as JSON to this file.")
+    args = parser.parse_args()
+
+    if args.trace:
+        tiles = parse_trace(args.trace)
+    elif args.zoom:
+        tiles = dataset_tiles(args.dataset, args.zoom, args.tms)
+    else:
+        parser.error("one of --trace or --zoom is required")
+
+    tiles = tiles * args.repeat
+    if args.shuffle:
+        numpy.random.default_rng(0).shuffle(tiles)
+
+    if not tiles:
+        parser.error("empty trace")
+
+    server = start_range_server(
+        os.path.dirname(os.path.abspath(args.dataset)),
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+    )
+    dataset_url = (
+        f"http://127.0.0.1:{server.server_address[1]}/{os.path.basename(args.dataset)}"
+    )
+
+    env = {
+        "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+        "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+        "GDAL_HTTP_MULTIPLEX": "YES",
+        "GDAL_HTTP_VERSION": "2",
+        "VSI_CACHE": "TRUE",
+        **dict(e.split("=", 1) for e in args.env),
+    }
+    process = None
+    if args.app_url:
+        app_url = args.app_url.rstrip("/")
+    else:
+        process, app_url = start_application(args.workers, env)
+
+    extra_params = [tuple(p.split("=", 1)) for p in args.params]
+    urls = []
+    for tile in tiles:
+        path = args.tile_path.format(
+            tms=tile.get("tms", args.tms),
+            z=tile["z"],
+            x=tile["x"],
+            y=tile["y"],
+            format=tile.get("format", args.format),
+        )
+        query = urlencode(
+            [("url", dataset_url), *extra_params, *tile.get("params", [])]
+        )
+        urls.append(f"{app_url}{path}?{query}")
+
+    try:
+        for url in urls[: args.warmup]:
+            fetch(url)
+
+        RangeRequestHandler.reset()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(fetch, urls))
+        duration = time.perf_counter() - start
+
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+        server.shutdown()
+
+    source_requests = len(RangeRequestHandler.requests)
+    latencies = numpy.array([r[0] for r in results]) * 1000
+    statuses: Dict[str, int] = {}
+    for r in results:
+        statuses[str(r[1])] = statuses.get(str(r[1]), 0) + 1
+
+    report = {
+        "requests": len(results),
+        "concurrency": args.concurrency,
+        "statuses": statuses,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(results) / duration, 2),
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 2),
+            "p50": round(float(numpy.percentile(latencies, 50)), 2),
+            "p90": round(float(numpy.percentile(latencies, 90)), 2),
+            "p99": round(float(numpy.percentile(latencies, 99)), 2),
+            "max": round(float(latencies.max()), 2),
+        },
+        "response_bytes_per_tile": round(sum(r[2] for r in results) / len(results)),
+        "source_requests_per_tile": round(source_requests / len(results), 2),
+        "source_bytes_per_tile": round(RangeRequestHandler.nbytes / len(results)),
+        "source": {
+            "latency_s": args.latency,
+            "bandwidth_Bps": args.bandwidth,
+            "requests": source_requests,
+            "bytes": RangeRequestHandler.nbytes,
+        },
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
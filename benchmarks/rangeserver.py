@@ -0,0 +1,120 @@
+"""HTTP server supporting `Range` requests (object-store stand-in).
+
+Used by `benchmarks/loadtest.py` and the `titiler.core` tests.
+
+"""
+
+import os
+import threading
+import time
+from email.utils import formatdate
+from http.server import SimpleHTTPRequestHandler
+from typing import List, Optional, Tuple
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Serve files with `Range` requests support, optional latency and bandwidth limit.
+
+    Requests (path, Range header) and bytes sent are recorded in `requests` and `nbytes`.
+
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    requests: List[Tuple[str, Optional[str]]] = []
+    nbytes = 0
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        *args,
+        directory: Optional[str] = None,
+        latency: float = 0,
+        bandwidth: Optional[float] = None,
+        **kwargs,
+    ):
+        """Set options (serve the current directory by default)."""
+        self.latency = latency
+        self.bandwidth = bandwidth
+        super().__init__(*args, directory=directory, **kwargs)
+
+    @classmethod
+    def reset(cls):
+        """Clear recorded requests."""
+        with cls._lock:
+            cls.requests.clear()
+            cls.nbytes = 0
+
+    def log_message(self, format, *args):  # noqa: A002
+        """Disable logging."""
+
+    def _parse_range(self, size: int) -> Optional[Tuple[int, int]]:
+        header = self.headers.get("Range")
+        if not header or not header.startswith("bytes="):
+            return None
+
+        start, _, end = header[6:].split(",")[0].strip().partition("-")
+        if not start:
+            # suffix range (last N bytes)
+            return max(size - int(end), 0), size - 1
+
+        return int(start), min(int(end) if end else size - 1, size - 1)
+
+    def _send(self, body: bool = True) -> None:
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+
+        stat = os.stat(path)
+        size = stat.st_size
+        byte_range = self._parse_range(size)
+        if byte_range and byte_range[0] >= size:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if body else 0
+
+        # record before responding (clients may return before the body is sent)
+        with self._lock:
+            self.requests.append((self.path, self.headers.get("Range")))
+            type(self).nbytes += length
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        self.send_response(206 if byte_range else 200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("ETag", f'"{stat.st_mtime_ns:x}-{size:x}"')
+        self.send_header("Last-Modified", formatdate(stat.st_mtime, usegmt=True))
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        chunk_size = 65536
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+                if self.bandwidth:
+                    time.sleep(len(chunk) / self.bandwidth)
+
+    def do_GET(self):
+        """Handle GET (with Range) requests."""
+        self._send()
+
+    def do_HEAD(self):
+        """Handle HEAD requests."""
+        self._send(body=False)
@@ -0,0 +1,101 @@
+"""titiler.core benchmarks."""
+
+import pytest
+
+from titiler.core.algorithm import algorithms
+from titiler.core.resources.enums import ImageType
+from titiler.core.utils import render_image, rescale_array
+
+from .conftest import COG
+
+
+@pytest.mark.benchmark(group="tile")
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"rescale": "0,1000"},
+        {"rescale": "0,1000", "colormap_name": "viridis"},
+    ],
+    ids=["raw", "rescale", "rescale+colormap"],
+)
+def test_tile(benchmark, cog_client, params):
+    """Benchmark TilerFactory `/tiles` endpoint."""
+
+    def _tile():
+        response = cog_client.get(
+            "/tiles/WebMercatorQuad/8/87/48.png", params={"url": COG, **params}
+        )
+        assert response.status_code == 200
+        return response
+
+    benchmark(_tile)
+
+
+@pytest.mark.benchmark(group="render")
+@pytest.mark.parametrize(
+    "output_format",
+    [fmt for fmt in ImageType if fmt != ImageType.jpg],
+    ids=lambda fmt: fmt.name,
+)
+def test_render_image(benchmark, rgb_image, output_format):
+    """Benchmark render_image for each output format."""
+    benchmark(render_image, rgb_image, output_format=output_format)
+
+
+@pytest.mark.benchmark(group="rescale")
+def test_rescale_array(benchmark, uint16_array):
+    """Benchmark rescale_array."""
+    data, mask = uint16_array
+    benchmark(
+        lambda: rescale_array(data.copy(), mask, in_range=((0, 10000),)),
+    )
+
+
+ALGORITHMS_PARAMS = {
+    "hillshade": {"buffer": 3},
+    "multiHillshade": {"buffer": 3},
+    "slope": {"buffer": 1},
+    "aspect": {"buffer": 1},
+    "contours": {},
+    "normalizedIndex": {},
+    "terrarium": {},
+    "terrainrgb": {},
+}
+
+
+@pytest.mark.benchmark(group="algorithm")
+@pytest.mark.parametrize("name", algorithms.list())
+def test_algorithm(benchmark, dem_image, rgb_image, name):
+    """Benchmark each registered algorithm."""
+    algorithm = algorithms.get(name)(**ALGORITHMS_PARAMS.get(name, {}))
+    if algorithm.input_nbands and algorithm.input_nbands > 1:
+        image = rgb_image
+    else:
+        image = dem_image
+
+    benchmark(algorithm, image)
+
+
+@pytest.mark.benchmark(group="dem")
+@pytest.mark.parametrize("name", ["hillshade", "multiHillshade", "slope", "aspect"])
+def test_dem_algorithm(benchmark, large_dem_image, name):
+    """Benchmark DEM algorithms on a large image."""
+    algorithm = algorithms.get(name)(**ALGORITHMS_PARAMS.get(name, {}))
+    benchmark(algorithm, large_dem_image)
+
+
+@pytest.mark.benchmark(group="statistics")
+@pytest.mark.parametrize("nfeatures", [1, 10, 50])
+def test_geojson_statistics(benchmark, cog_client, cog_features, nfeatures):
+    """Benchmark TilerFactory `/statistics` (POST) endpoint."""
+    features = cog_features(nfeatures)
+
+    def _statistics():
+        response = cog_client.post(
+            "/statistics", params={"url": COG, "max_size": 256}, json=features
+        )
+        assert response.status_code == 200
+        return response
+
+    benchmark(_statistics)
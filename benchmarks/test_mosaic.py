@@ -0,0 +1,27 @@
+"""titiler.mosaic benchmarks."""
+
+import pytest
+
+from .conftest import MOSAIC_TILE
+
+
+@pytest.mark.benchmark(group="mosaic")
+@pytest.mark.parametrize("nassets", [1, 2, 4, 8])
+def test_mosaic_tile(benchmark, mosaic_client, mosaic_factory, nassets):
+    """Benchmark MosaicTilerFactory `/tiles` endpoint with N assets per tile.
+
+    The `mean` pixel selection method is used so every asset is read.
+
+    """
+    mosaic = mosaic_factory(nassets)
+    x, y, z = MOSAIC_TILE
+
+    def _tile():
+        response = mosaic_client.get(
+            f"/tiles/WebMercatorQuad/{z}/{x}/{y}.png",
+            params={"url": mosaic, "pixel_selection": "mean", "rescale": "0,1000"},
+        )
+        assert response.status_code == 200
+        return response
+
+    benchmark(_tile)
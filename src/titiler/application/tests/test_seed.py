@@ -0,0 +1,127 @@
+"""Test titiler.application.seed."""
+
+import json
+import os
+
+import morecantile
+
+from titiler.application.seed import count_tiles, iter_tiles, main, tile_ranges
+from titiler.core.archives import MBTilesWriter, deserialize_header
+
+from .conftest import DATA_DIR
+
+cog = os.path.join(DATA_DIR, "cog.tif")
+
+
+def test_iter_tiles():
+    """Test tiles enumeration."""
+    tms = morecantile.tms.get("WebMercatorQuad")
+    bbox = (-10, -10, 10, 10)
+    assert len(list(iter_tiles(tms, bbox, 0))) == 1
+    assert len(list(iter_tiles(tms, bbox, 4))) == 4
+
+    # Only tiles intersecting the geometry
+    geometry = {
+        "type": "Polygon",
+        "coordinates": [[[-10, -10], [10, 10], [-10, 10], [-10, -10]]],
+    }
+    tiles = list(iter_tiles(tms, bbox, 8, geometry))
+    all_tiles = list(iter_tiles(tms, bbox, 8))
+    assert 0 < len(tiles) < len(all_tiles)
+    assert morecantile.Tile(120, 120, 8) in tiles
+    assert morecantile.Tile(135, 135, 8) not in tiles
+    assert count_tiles(tms, bbox, 8, geometry) == len(tiles)
+    assert count_tiles(tms, bbox, 8) == len(all_tiles)
+
+
+def test_tile_ranges():
+    """Test tile ranges (same tiles as morecantile)."""
+    tms = morecantile.tms.get("WebMercatorQuad")
+    assert tile_ranges(tms, (-10, -10, 10, 10), 4) == [(7, 7, 8, 8)]
+
+    # Antimeridian crossing
+    bbox = (170, -20, -170, 20)
+    assert len(tile_ranges(tms, bbox, 4)) == 2
+    assert sorted(iter_tiles(tms, bbox, 4)) == sorted(tms.tiles(*bbox, [4]))
+    assert count_tiles(tms, bbox, 4) == len(list(tms.tiles(*bbox, [4])))
+
+    # Coalesced tile matrices
+    tms = morecantile.tms.get("CDB1GlobalGrid")
+    bbox = (-180, -90, 180, 90)
+    assert sorted(iter_tiles(tms, bbox, 2)) == sorted(tms.tiles(*bbox, [2]))
+    assert count_tiles(tms, bbox, 2) == len(list(tms.tiles(*bbox, [2])))
+
+
+def test_seed_directory(tmp_path, capsys):
+    """Seed tiles in a directory."""
+    output = str(tmp_path / "tiles")
+    args = [cog, "--minzoom", "5", "--maxzoom", "6", "--output", output]
+    args += ["--param", "rescale=0,1000", "--format", "jpeg"]
+    assert main(args) == 0
+    assert "10/10 tiles" in capsys.readouterr().err
+    assert sorted(os.listdir(output)) == ["5", "6"]
+    assert os.path.exists(os.path.join(output, "5", "10", "5.jpeg"))
+
+    # Resume
+    os.remove(os.path.join(output, "5", "10", "5.jpeg"))
+    assert main(args) == 0
+    err = capsys.readouterr().err
+    assert "rendered: 1, skipped: 9" in err
+    assert os.path.exists(os.path.join(output, "5", "10", "5.jpeg"))
+
+    # Errors
+    assert main(args + ["--overwrite", "--param", "bidx=10", "--quiet"]) == 1
+
+
+def test_seed_archives(tmp_path):
+    """Seed tiles in MBTiles/PMTiles archives."""
+    mbtiles = str(tmp_path / "tiles.mbtiles")
+    args = [cog, "--maxzoom", "7", "--param", "rescale=0,1000", "--quiet"]
+    assert main(args + ["--output", mbtiles, "--bbox=-61,72,-59,74"]) == 0
+    with MBTilesWriter(mbtiles) as src:
+        tiles = sorted((z, x, y) for z, x, y, _ in src.tiles())
+        metadata = dict(src.db.execute("SELECT name, value FROM metadata"))
+
+    assert tiles[0] == (0, 0, 0)
+    assert len(tiles) == 14
+    assert metadata["format"] == "png"
+    assert metadata["maxzoom"] == "7"
+
+    geometry = tmp_path / "area.geojson"
+    geometry.write_text(
+        json.dumps(
+            {
+                "type": "Feature",
+                "properties": {},
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [
+                        [[-61, 72], [-59, 72], [-59, 74], [-61, 74], [-61, 72]]
+                    ],
+                },
+            }
+        )
+    )
+    pmtiles = str(tmp_path / "tiles.pmtiles")
+    assert main(args + ["--output", pmtiles, "--geometry", str(geometry)]) == 0
+    assert not os.path.exists(f"{pmtiles}.partial.mbtiles")
+    with open(pmtiles, "rb") as f:
+        header = deserialize_header(f.read())
+
+    assert header.addressed_tiles_count == 14
+    assert header.clustered
+    assert header.min_zoom == 0
+    assert header.max_zoom == 7
+    assert header.min_lon_e7 == -610_000_000
+
+
+def test_seed_warmup(tmp_path):
+    """Render tiles without output."""
+    assert main([cog, "--maxzoom", "3", "--quiet"]) == 0
+
+
+def test_seed_no_httpx(monkeypatch, capsys):
+    """Exit with a clear message when httpx is not installed."""
+    monkeypatch.setattr("titiler.application.seed.httpx", None)
+    assert main([cog, "--maxzoom", "0"]) == 1
+    assert "titiler.application[seed]" in capsys.readouterr().err
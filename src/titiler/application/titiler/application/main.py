@@ -2,11 +2,13 @@
 
 import logging
 import re
+from typing import Optional
 
+import attr
 import jinja2
 from fastapi import Depends, FastAPI, HTTPException, Security
 from fastapi.security.api_key import APIKeyQuery
-from rio_tiler.io import Reader, STACReader
+from rio_tiler.io import STACReader
 from starlette.middleware.cors import CORSMiddleware
 from starlette.requests import Request
 from starlette.responses import HTMLResponse
@@ -15,6 +17,7 @@ from starlette_cramjam.middleware import CompressionMiddleware
 
 from titiler.application import __version__ as titiler_version
 from titiler.application.settings import ApiSettings
+from titiler.core.cache import CachedReader, ImageCache, RangeCache
 from titiler.core.errors import DEFAULT_STATUS_CODES, add_exception_handlers
 from titiler.core.factory import (
     AlgorithmFactory,
@@ -27,8 +30,11 @@ from titiler.core.middleware import (
     CacheControlMiddleware,
     LoggerMiddleware,
     LowerCaseQueryStringMiddleware,
+    ProfilerMiddleware,
     TotalTimeMiddleware,
 )
+from titiler.core.resources.enums import OptionalHeader
+from titiler.core.routing import add_route_profiling
 from titiler.extensions import (
     cogValidateExtension,
     cogViewerExtension,
@@ -72,6 +78,37 @@ if api_settings.global_access_token:
 
     app_dependencies.append(Depends(validate_access_token))
 
+# In debug mode, image endpoints return per-stage timings in `Server-Timing` header
+optional_headers = [OptionalHeader.server_timing] if api_settings.debug else []
+
+
+def image_cache() -> Optional[ImageCache]:
+    """Processed images cache (one per factory)."""
+    if not api_settings.image_cache_size:
+        return None
+
+    return ImageCache(
+        maxsize=api_settings.image_cache_size, ttl=api_settings.image_cache_ttl
+    )
+
+
+range_cache = (
+    RangeCache(
+        api_settings.range_cache_directory,
+        maxsize=api_settings.range_cache_maxsize,
+        blocksize=api_settings.range_cache_blocksize,
+    )
+    if api_settings.range_cache_directory
+    else None
+)
+
+
+@attr.s
+class Reader(CachedReader):
+    """Reader using the application range-request cache."""
+
+    cache: Optional[RangeCache] = attr.ib(default=range_cache)
+
 
 ###############################################################################
 
@@ -100,6 +137,10 @@ if not api_settings.disable_cog:
     cog = TilerFactory(
         reader=Reader,
         router_prefix="/cog",
+        conditional_requests=api_settings.conditional_requests,
+        single_flight=api_settings.single_flight,
+        image_cache=image_cache(),
+        optional_headers=optional_headers,
         extensions=[
             cogValidateExtension(),
             cogViewerExtension(),
@@ -120,6 +161,9 @@ if not api_settings.disable_stac:
     stac = MultiBaseTilerFactory(
         reader=STACReader,
         router_prefix="/stac",
+        conditional_requests=api_settings.conditional_requests,
+        image_cache=image_cache(),
+        optional_headers=optional_headers,
         extensions=[
             stacViewerExtension(),
         ],
@@ -134,7 +178,14 @@ if not api_settings.disable_stac:
 ###############################################################################
 # Mosaic endpoints
 if not api_settings.disable_mosaic:
-    mosaic = MosaicTilerFactory(router_prefix="/mosaicjson")
+    mosaic = MosaicTilerFactory(
+        dataset_reader=Reader,
+        router_prefix="/mosaicjson",
+        conditional_requests=api_settings.conditional_requests,
+        single_flight=api_settings.single_flight,
+        image_cache=image_cache(),
+        optional_headers=optional_headers,
+    )
     app.include_router(
         mosaic.router,
         prefix="/mosaicjson",
@@ -195,13 +246,28 @@ app.add_middleware(
 app.add_middleware(
     CacheControlMiddleware,
     cachecontrol=api_settings.cachecontrol,
-    exclude_path={r"/healthz"},
+    exclude_path={r"/healthz", r"/metrics"},
+    policies=api_settings.cachecontrol_policies,
 )
 
 if api_settings.debug:
     app.add_middleware(LoggerMiddleware, headers=True, querystrings=True)
     app.add_middleware(TotalTimeMiddleware)
 
+if api_settings.profiler_output_dir:
+    app.add_middleware(
+        ProfilerMiddleware,
+        output_dir=api_settings.profiler_output_dir,
+        threshold=api_settings.profiler_threshold,
+        sample_rate=api_settings.profiler_sample_rate,
+    )
+
+if api_settings.metrics:
+    from titiler.core.metrics import MetricsMiddleware, metrics_endpoint
+
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 if api_settings.lower_case_query_parameters:
     app.add_middleware(LowerCaseQueryStringMiddleware)
 
@@ -289,3 +355,7 @@ def landing(request: Request):
             "urlparams": str(request.url.query),
         },
     )
+
+
+if api_settings.profiler_output_dir:
+    add_route_profiling(app.routes)
@@ -0,0 +1,478 @@
+"""titiler.application tile seeding (cache warm-up).
+
+Pre-render tiles for a dataset (or MosaicJSON) by calling the application's `/tiles`
+endpoint (in process or on a running server) and write them to a directory
+(`{z}/{x}/{y}.{format}`), a MBTiles or a PMTiles archive.
+
+    $ titiler-seed https://data.org/cog.tif --maxzoom 8 --output tiles.pmtiles
+
+Seeding is resumable: tiles already in the output are skipped (unless `--overwrite`).
+
+Note: requires `httpx` (`python -m pip install "titiler.application[seed]"`).
+
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import morecantile
+import numpy
+from morecantile.models import LL_EPSILON
+from morecantile.utils import lons_contain_antimeridian
+from rasterio.features import bounds as geometry_bounds
+from rasterio.features import rasterize
+from rasterio.transform import from_bounds
+from rasterio.warp import transform_geom
+
+from titiler.core.archives import (
+    MBTilesWriter,
+    TileType,
+    mbtiles_to_pmtiles,
+    tile_types,
+)
+
+try:
+    import httpx
+except ImportError:  # pragma: nocover
+    httpx = None  # type: ignore
+
+
+class DirectoryWriter:
+    """Write tiles as `{z}/{x}/{y}.{format}` files."""
+
+    def __init__(self, path: str, extension: str):
+        """Init writer."""
+        self.path = path
+        self.extension = extension
+
+    def _tile_path(self, z: int, x: int, y: int) -> str:
+        return os.path.join(self.path, str(z), str(x), f"{y}.{self.extension}")
+
+    def has_tile(self, z: int, x: int, y: int) -> bool:
+        """Check if the tile exists."""
+        return os.path.exists(self._tile_path(z, x, y))
+
+    def write_tile(self, z: int, x: int, y: int, data: bytes) -> None:
+        """Write tile."""
+        path = self._tile_path(z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+
+    def close(self) -> None:
+        """Nothing to do."""
+
+
+class NullWriter:
+    """Discard tiles (warm-up a remote server cache)."""
+
+    def has_tile(self, z: int, x: int, y: int) -> bool:
+        """No tile is stored."""
+        return False
+
+    def write_tile(self, z: int, x: int, y: int, data: bytes) -> None:
+        """Discard tile."""
+
+    def close(self) -> None:
+        """Nothing to do."""
+
+
+def tile_ranges(
+    tms: morecantile.TileMatrixSet, bbox: Sequence[float], zoom: int
+) -> List[Tuple[int, int, int, int]]:
+    """Tile index ranges (`minx, miny, maxx, maxy`) covering the bbox at zoom level.
+
+    Same tiles as `tms.tiles()` (bbox crossing the antimeridian are split).
+
+    """
+    west, south, east, north = bbox
+    if west > east:
+        bboxes = [
+            (tms.bbox.left, south, east, north),
+            (west, south, tms.bbox.right, north),
+        ]
+    else:
+        bboxes = [(west, south, east, north)]
+
+    ranges = []
+    for w, s, e, n in bboxes:
+        contain_180th = lons_contain_antimeridian(e, tms.bbox.right)
+        w = max(tms.bbox.left, w)
+        s = max(tms.bbox.bottom, s)
+        e = max(tms.bbox.right, e) if contain_180th else min(tms.bbox.right, e)
+        n = min(tms.bbox.top, n)
+
+        nw = tms.tile(w + LL_EPSILON, n - LL_EPSILON, zoom, ignore_coalescence=True)
+        se = tms.tile(e - LL_EPSILON, s + LL_EPSILON, zoom, ignore_coalescence=True)
+        ranges.append(
+            (min(nw.x, se.x), min(nw.y, se.y), max(nw.x, se.x), max(nw.y, se.y))
+        )
+
+    return ranges
+
+
+def _tile_blocks(
+    tms: morecantile.TileMatrixSet,
+    bbox: Sequence[float],
+    zoom: int,
+    geometry: Optional[Dict] = None,
+    block_size: int = 1024,
+) -> Iterator[Tuple[int, int, numpy.ndarray]]:
+    """Blocks of at most `block_size x block_size` tiles as `(minx, miny, mask)`."""
+    matrix = tms.matrix(zoom)
+    if geometry:
+        geometry = transform_geom("epsg:4326", tms.rasterio_crs, geometry)
+
+    for minx, miny, maxx, maxy in tile_ranges(tms, bbox, zoom):
+        for y0 in range(miny, maxy + 1, block_size):
+            for x0 in range(minx, maxx + 1, block_size):
+                height = min(block_size, maxy + 1 - y0)
+                width = min(block_size, maxx + 1 - x0)
+
+                if geometry:
+                    # Burn the geometry on the block's tile grid
+                    left, _, _, top = tms.xy_bounds(morecantile.Tile(x0, y0, zoom))
+                    _, bottom, right, _ = tms.xy_bounds(
+                        morecantile.Tile(x0 + width - 1, y0 + height - 1, zoom)
+                    )
+                    mask = rasterize(
+                        [geometry],
+                        out_shape=(height, width),
+                        transform=from_bounds(left, bottom, right, top, width, height),
+                        all_touched=True,
+                        fill=0,
+                        default_value=1,
+                        dtype="uint8",
+                    ).astype("bool")
+                else:
+                    mask = numpy.ones((height, width), dtype="bool")
+
+                if matrix.variableMatrixWidths is not None:
+                    cols = numpy.arange(x0, x0 + width)
+                    for row in range(height):
+                        cf = matrix.get_coalesce_factor(y0 + row)
+                        if cf != 1:
+                            mask[row] &= cols % cf == 0
+
+                yield x0, y0, mask
+
+
+def count_tiles(
+    tms: morecantile.TileMatrixSet,
+    bbox: Sequence[float],
+    zoom: int,
+    geometry: Optional[Dict] = None,
+) -> int:
+    """Number of tiles `iter_tiles` yields (without enumerating them)."""
+    if geometry:
+        return sum(
+            int(mask.sum()) for _, _, mask in _tile_blocks(tms, bbox, zoom, geometry)
+        )
+
+    matrix = tms.matrix(zoom)
+    count = 0
+    for minx, miny, maxx, maxy in tile_ranges(tms, bbox, zoom):
+        if matrix.variableMatrixWidths is None:
+            count += (maxx - minx + 1) * (maxy - miny + 1)
+            continue
+
+        for y in range(miny, maxy + 1):
+            cf = matrix.get_coalesce_factor(y)
+            count += maxx // cf - (minx - 1) // cf
+
+    return count
+
+
+def iter_tiles(
+    tms: morecantile.TileMatrixSet,
+    bbox: Sequence[float],
+    zoom: int,
+    geometry: Optional[Dict] = None,
+) -> Iterator[morecantile.Tile]:
+    """Tiles intersecting the bbox (and the optional GeoJSON geometry) at zoom level."""
+    for x0, y0, mask in _tile_blocks(tms, bbox, zoom, geometry):
+        rows, cols = numpy.nonzero(mask)
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            yield morecantile.Tile(x0 + col, y0 + row, zoom)
+
+
+def read_geometry(path: str) -> Dict:
+    """Read GeoJSON file (Geometry, Feature or FeatureCollection) as one geometry."""
+    with open(path) as f:
+        geojson = json.load(f)
+
+    if geojson["type"] == "FeatureCollection":
+        geometries = [feat["geometry"] for feat in geojson["features"]]
+    elif geojson["type"] == "Feature":
+        geometries = [geojson["geometry"]]
+    else:
+        geometries = [geojson]
+
+    return {"type": "GeometryCollection", "geometries": geometries}
+
+
+class Progress:
+    """Seeding progress."""
+
+    def __init__(self, total: int, quiet: bool = False):
+        """Init counters."""
+        self.total = total
+        self.quiet = quiet
+        self.counts = {"rendered": 0, "skipped": 0, "empty": 0, "errors": 0}
+        self.start = time.perf_counter()
+        self._last = 0.0
+
+    @property
+    def done(self) -> int:
+        """Number of processed tiles."""
+        return sum(self.counts.values())
+
+    def update(self, status: str) -> None:
+        """Count tile and print progress."""
+        self.counts[status] += 1
+        now = time.perf_counter()
+        if not self.quiet and (now - self._last > 1 or self.done == self.total):
+            self._last = now
+            rate = self.counts["rendered"] / max(now - self.start, 1e-6)
+            counts = ", ".join(f"{k}: {v}" for k, v in self.counts.items())
+            print(
+                f"\r{self.done}/{self.total} tiles ({rate:.1f} tiles/s, {counts})",
+                end="\n" if self.done == self.total else "",
+                file=sys.stderr,
+                flush=True,
+            )
+
+
+def seed(  # noqa: C901
+    client: "httpx.Client",
+    url: str,
+    writer,
+    tms: morecantile.TileMatrixSet,
+    zooms: Sequence[int],
+    bbox: Sequence[float],
+    geometry: Optional[Dict] = None,
+    endpoint: str = "/cog",
+    tile_format: str = "png",
+    scale: int = 1,
+    params: Optional[Dict[str, str]] = None,
+    workers: int = 4,
+    overwrite: bool = False,
+    quiet: bool = False,
+) -> Dict[str, int]:
+    """Render tiles and write them with `writer` (tiles already written are skipped)."""
+    query = {"url": url, **(params or {})}
+    suffix = f"@{scale}x" if scale > 1 else ""
+
+    def _render(tile: morecantile.Tile) -> Tuple[morecantile.Tile, Optional[bytes]]:
+        response = client.get(
+            f"{endpoint}/tiles/{tms.id}/{tile.z}/{tile.x}/{tile.y}{suffix}.{tile_format}",
+            params=query,
+        )
+        if response.status_code in [204, 404]:
+            return tile, None
+
+        if response.status_code != 200:
+            raise ValueError(f"{tile}: {response.status_code} {response.text[:200]}")
+
+        return tile, response.content
+
+    def _tiles() -> Iterator[morecantile.Tile]:
+        for zoom in zooms:
+            yield from iter_tiles(tms, bbox, zoom, geometry)
+
+    total = sum(count_tiles(tms, bbox, zoom, geometry) for zoom in zooms)
+    progress = Progress(total, quiet=quiet)
+
+    def _done(future: Future) -> None:
+        try:
+            tile, content = future.result()
+        except Exception as e:
+            print(f"\nError: {e}", file=sys.stderr)
+            progress.update("errors")
+            return
+
+        if content is None:
+            progress.update("empty")
+            return
+
+        writer.write_tile(tile.z, tile.x, tile.y, content)
+        progress.update("rendered")
+
+    # Keep a bounded number of tiles in flight, results are written from this thread
+    pending: Set[Future] = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for tile in _tiles():
+            if not overwrite and writer.has_tile(tile.z, tile.x, tile.y):
+                progress.update("skipped")
+                continue
+
+            pending.add(executor.submit(_render, tile))
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _done(future)
+
+        for future in pending:
+            _done(future)
+
+    return progress.counts
+
+
+def _import_app(path: str):
+    """Import an ASGI application from a `module:attribute` string."""
+    module, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module), attr or "app")
+
+
+def main(argv: Optional[List[str]] = None) -> int:  # noqa: C901
+    """Seed tiles."""
+    parser = argparse.ArgumentParser(
+        prog="titiler-seed",
+        description="Pre-render tiles for a dataset or a MosaicJSON.",
+    )
+    parser.add_argument("url", help="Dataset or MosaicJSON URL.")
+    parser.add_argument(
+        "--endpoint",
+        default="/cog",
+        help="Tiler endpoints prefix (e.g `/cog` or `/mosaicjson`). Defaults to `/cog`.",
+    )
+    parser.add_argument(
+        "--tms", default="WebMercatorQuad", help="TileMatrixSet identifier."
+    )
+    parser.add_argument("--minzoom", type=int, default=0, help="Minimum zoom level.")
+    parser.add_argument(
+        "--maxzoom", type=int, required=True, help="Maximum zoom level."
+    )
+    area = parser.add_mutually_exclusive_group()
+    area.add_argument(
+        "--bbox",
+        help="Area to seed as `west,south,east,north` (WGS84). Defaults to the dataset bounds.",
+    )
+    area.add_argument("--geometry", help="Area to seed as a GeoJSON file.")
+    parser.add_argument("--format", default="png", help="Tile format.")
+    parser.add_argument("--scale", type=int, default=1, help="Tile size scale.")
+    parser.add_argument(
+        "--param",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Additional tile query parameter (e.g `rescale=0,1000`).",
+    )
+    parser.add_argument(
+        "--output",
+        help="Output directory, `.mbtiles` or `.pmtiles` file. Without output, tiles are rendered and discarded (cache warm-up).",
+    )
+    server = parser.add_mutually_exclusive_group()
+    server.add_argument(
+        "--app",
+        default="titiler.application.main:app",
+        help="Application to render the tiles with (`module:attribute`).",
+    )
+    server.add_argument(
+        "--app-url", help="URL of a running titiler server to render the tiles with."
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Number of workers.")
+    parser.add_argument(
+        "--overwrite", action="store_true", help="Re-render existing tiles."
+    )
+    parser.add_argument("--quiet", action="store_true", help="Do not show progress.")
+    args = parser.parse_args(argv)
+
+    if httpx is None:
+        print(
+            "`httpx` must be installed to use titiler-seed: "
+            'python -m pip install "titiler.application[seed]"',
+            file=sys.stderr,
+        )
+        return 1
+
+    tms = morecantile.tms.get(args.tms)
+    params = dict(p.split("=", 1) for p in args.param)
+    zooms = list(range(args.minzoom, args.maxzoom + 1))
+
+    if args.app_url:
+        client = httpx.Client(base_url=args.app_url, timeout=60)
+    else:
+        from starlette.testclient import TestClient
+
+        client = TestClient(_import_app(args.app))
+
+    with client:
+        geometry = read_geometry(args.geometry) if args.geometry else None
+        if geometry:
+            bbox = list(geometry_bounds(geometry))
+        elif args.bbox:
+            bbox = [float(v) for v in args.bbox.split(",")]
+        else:
+            response = client.get(f"{args.endpoint}/bounds", params={"url": args.url})
+            response.raise_for_status()
+            bbox = response.json()["bounds"]
+
+        output = args.output or ""
+        archive = output.endswith((".mbtiles", ".pmtiles"))
+        if archive and tms.id != "WebMercatorQuad":
+            parser.error("MBTiles and PMTiles archives require `WebMercatorQuad` TMS")
+
+        metadata = {
+            "name": os.path.basename(args.url),
+            "format": args.format,
+            "type": "overlay",
+            "bounds": ",".join(map(str, bbox)),
+            "minzoom": str(args.minzoom),
+            "maxzoom": str(args.maxzoom),
+            "tilesize": str(256 * args.scale),
+        }
+
+        writer: object
+        if output.endswith(".mbtiles"):
+            writer = MBTilesWriter(output, metadata=metadata)
+        elif output.endswith(".pmtiles"):
+            # Tiles are staged in a MBTiles file (to resume seeding), converted at the end
+            writer = MBTilesWriter(f"{output}.partial.mbtiles", metadata=metadata)
+        elif output:
+            writer = DirectoryWriter(output, args.format)
+        else:
+            writer = NullWriter()
+
+        try:
+            counts = seed(
+                client,
+                args.url,
+                writer,
+                tms,
+                zooms,
+                bbox,
+                geometry=geometry,
+                endpoint=args.endpoint,
+                tile_format=args.format,
+                scale=args.scale,
+                params=params,
+                workers=args.workers,
+                overwrite=args.overwrite,
+                quiet=args.quiet,
+            )
+        finally:
+            writer.close()  # type: ignore
+
+    if output.endswith(".pmtiles") and not counts["errors"]:
+        mbtiles_to_pmtiles(
+            f"{output}.partial.mbtiles",
+            output,
+            tile_type=tile_types.get(args.format, TileType.unknown),
+            bounds=bbox,
+            metadata=metadata,
+        )
+        os.remove(f"{output}.partial.mbtiles")
+
+    return 1 if counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 """Titiler API settings."""
 
-from typing import Optional
+from typing import Dict, Optional
 
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -13,6 +13,8 @@ class ApiSettings(BaseSettings):
     cors_origins: str = "*"
     cors_allow_methods: str = "GET"
     cachecontrol: str = "public, max-age=3600"
+    # route name to Cache-Control mapping, e.g `{"tile": "public, max-age=86400, stale-while-revalidate=3600"}`
+    cachecontrol_policies: Dict[str, Optional[str]] = {}
     root_path: str = ""
     debug: bool = False
 
@@ -22,6 +24,29 @@ class ApiSettings(BaseSettings):
 
     lower_case_query_parameters: bool = False
 
+    # profile requests and write profiles of slow requests (> `profiler_threshold` seconds) in `profiler_output_dir`
+    profiler_output_dir: Optional[str] = None
+    profiler_threshold: float = 1.0
+    profiler_sample_rate: int = 100
+
+    # add Prometheus metrics middleware and `/metrics` endpoint (requires `prometheus-client`)
+    metrics: bool = False
+
+    # add ETag/Last-Modified headers and handle conditional requests for image endpoints
+    conditional_requests: bool = False
+
+    # coalesce concurrent identical tile requests
+    single_flight: bool = False
+
+    # cache tiles images after post-processing (before rendering), size in bytes (0 to disable)
+    image_cache_size: int = 0
+    image_cache_ttl: Optional[float] = 300
+
+    # cache HTTP range requests of `/cog` and `/mosaicjson` datasets on disk (shared between workers)
+    range_cache_directory: Optional[str] = None
+    range_cache_maxsize: int = 1024**3
+    range_cache_blocksize: int = 256 * 1024
+
     # an API key required to access any endpoint, passed via the ?access_token= query parameter
     global_access_token: Optional[str] = None
 
@@ -1,12 +1,17 @@
 """``pytest`` configuration."""
 
 import os
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer
 from typing import Any, Dict
 
 import pytest
 import rasterio
 from rasterio.io import MemoryFile
 
+from benchmarks.rangeserver import RangeRequestHandler
+
 DATA_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
 
 
@@ -33,3 +38,15 @@ def mock_rasterio_open(asset):
     assert asset.startswith("https://myurl.com/")
     asset = asset.replace("https://myurl.com", DATA_DIR)
     return rasterio.open(asset)
+
+
+@pytest.fixture(scope="session")
+def server():
+    """Start HTTP server."""
+    httpd = ThreadingHTTPServer(
+        ("127.0.0.1", 0), partial(RangeRequestHandler, directory=DATA_DIR)
+    )
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
@@ -1,16 +1,40 @@
 """Test the Algorithms class."""
 
 import json
+import os
+import sys
+from importlib import metadata as importlib_metadata
 
+import morecantile
 import numpy
+import pytest
 from fastapi import Depends, FastAPI
+from pydantic import ValidationError
+from rasterio.crs import CRS
 from rasterio.io import MemoryFile
+from rio_tiler.constants import WEB_MERCATOR_CRS, WGS84_CRS
 from rio_tiler.models import ImageData
 from starlette.responses import Response
 from starlette.testclient import TestClient
 
-from titiler.core.algorithm import BaseAlgorithm
+from titiler.core.algorithm import AlgorithmPipeline, BaseAlgorithm
 from titiler.core.algorithm import algorithms as default_algorithms
+from titiler.core.algorithm import entry_point_algorithms, with_halo
+from titiler.core.algorithm.dem import cellsize
+from titiler.core.algorithm.expression import (
+    compile_expression,
+    evaluate,
+    evaluate_masked,
+)
+from titiler.core.algorithm.pipeline import FusedAlgorithm
+from titiler.core.errors import (
+    DEFAULT_STATUS_CODES,
+    BadRequestError,
+    add_exception_handlers,
+)
+from titiler.core.factory import AlgorithmFactory, TilerFactory
+
+from .conftest import DATA_DIR
 
 
 class Multiply(BaseAlgorithm):
@@ -235,3 +259,394 @@ def test_terrainrgb():
     assert out.array.shape == (3, 256, 256)
     assert out.array.dtype == "uint8"
     assert out.array[0, 0, 0] is numpy.ma.masked
+
+
+def test_pipeline():
+    """test algorithm pipeline."""
+    arr = numpy.ma.MaskedArray(
+        numpy.random.randint(1, 5000, (2, 300, 300), dtype="uint16"),
+        mask=numpy.zeros((2, 300, 300), dtype="bool"),
+    )
+    arr.mask[:, 0:100, 0:100] = True
+    img = ImageData(arr)
+
+    ndi = default_algorithms.get("normalizedIndex")()
+    contours = default_algorithms.get("contours")(minz=-1, maxz=1, increment=1)
+
+    pipeline = AlgorithmPipeline(steps=[ndi, contours])
+    assert pipeline.input_nbands == 2
+    assert pipeline.output_nbands == 3
+    assert pipeline.output_dtype == "uint8"
+    assert len(pipeline.stages) == 1
+    assert isinstance(pipeline.stages[0], FusedAlgorithm)
+
+    # Fused (by blocks of rows) and sequential outputs are the same
+    expected = contours(ndi(img))
+    for block_size in [300, 1000, 65536]:
+        pipeline.stages[0].block_size = block_size
+        out = pipeline(img)
+        assert out.array.shape == (3, 300, 300)
+        assert out.array.dtype == "uint8"
+        numpy.testing.assert_array_equal(out.array.data, expected.array.data)
+        numpy.testing.assert_array_equal(out.array.mask, expected.array.mask)
+        assert out.array[0, 0, 0] is numpy.ma.masked
+        assert out.bounds == img.bounds
+
+    # Non-elementwise algorithms are not fused
+    hillshade = default_algorithms.get("hillshade")(buffer=0)
+    pipeline = AlgorithmPipeline(steps=[ndi, hillshade, contours])
+    assert pipeline.stages == [ndi, hillshade, contours]
+    out = pipeline(img)
+    assert out.array.shape == (3, 300, 300)
+
+    # Incompatible number of bands
+    with pytest.raises(ValidationError):
+        AlgorithmPipeline(steps=[contours, hillshade])
+
+    with pytest.raises(BadRequestError):
+        AlgorithmPipeline(steps=[hillshade, contours])(img)
+
+
+def test_pipeline_deps():
+    """test algorithm pipeline dependency."""
+    app = FastAPI()
+
+    @app.get("/")
+    def main(algorithm=Depends(default_algorithms.dependency)):
+        """endpoint."""
+        arr = numpy.zeros((2, 256, 256), dtype="uint16")
+        arr[0] = 1
+        arr[1] = 2
+        img = algorithm(ImageData(arr))
+        return {"type": type(algorithm).__name__, "count": img.count}
+
+    client = TestClient(app)
+    response = client.get("/", params={"algorithm": "normalizedIndex"})
+    assert response.json() == {"type": "NormalizedIndex", "count": 1}
+
+    response = client.get("/", params={"algorithm": ["normalizedIndex", "contours"]})
+    assert response.json() == {"type": "AlgorithmPipeline", "count": 3}
+
+    response = client.get(
+        "/",
+        params={
+            "algorithm": ["normalizedIndex", "contours"],
+            "algorithm_params": ["{}", json.dumps({"increment": 10})],
+        },
+    )
+    assert response.json() == {"type": "AlgorithmPipeline", "count": 3}
+
+    response = client.get(
+        "/",
+        params={
+            "algorithm": ["normalizedIndex", "contours"],
+            "algorithm_params": [json.dumps({"increment": 10})],
+        },
+    )
+    assert response.status_code == 400
+
+    response = client.get("/", params={"algorithm": ["contours", "hillshade"]})
+    assert response.status_code == 400
+    assert "expects 1 band(s)" in response.json()["detail"]
+
+    # Input bands count is also checked for single algorithms
+    app = FastAPI()
+    app.include_router(TilerFactory().router)
+    add_exception_handlers(app, DEFAULT_STATUS_CODES)
+
+    client = TestClient(app)
+    response = client.get(
+        "/preview.png",
+        params={
+            "url": os.path.join(DATA_DIR, "dem.tif"),
+            "algorithm": "normalizedIndex",
+        },
+    )
+    assert response.status_code == 400
+    assert "expects 2 band(s), got 1" in response.json()["detail"]
+
+
+def test_halo():
+    """test algorithm halo."""
+    hillshade = default_algorithms.get("hillshade")()
+    assert hillshade.halo == 3
+    assert default_algorithms.get("hillshade")(buffer=0).halo == 0
+    assert default_algorithms.get("contours")().halo == 0
+
+    assert with_halo({}, None) == {}
+    assert with_halo({}, hillshade) == {"buffer": 3}
+    assert with_halo({"buffer": 1, "padding": 2}, hillshade) == {
+        "buffer": 3,
+        "padding": 2,
+    }
+    # larger user buffer is kept
+    assert with_halo({"buffer": 10}, hillshade) == {"buffer": 10}
+
+    pipeline = AlgorithmPipeline(
+        steps=[hillshade, default_algorithms.get("hillshade")(buffer=2)]
+    )
+    assert pipeline.halo == 5
+
+    arr = numpy.random.randint(0, 5000, (1, 266, 266), dtype="uint16")
+    out = pipeline(ImageData(arr))
+    assert out.array.shape == (1, 256, 256)
+
+
+def test_evaluate():
+    """test numexpr expression evaluation."""
+    compile_expression.cache_clear()
+
+    b1 = numpy.full((1, 10, 10), 1, dtype="uint16")
+    b2 = numpy.full((1, 10, 10), 3, dtype="uint16")
+    out = evaluate("(b2 - b1) / (b2 + b1)", b1=b1, b2=b2)
+    assert out.dtype == "float64"
+    numpy.testing.assert_array_equal(out, 0.5)
+
+    out = evaluate(
+        "(b2 - b1) / (b2 + b1) * factor", dtype="float32", b1=b1, b2=b2, factor=2
+    )
+    assert out.dtype == "float32"
+    assert out.shape == (1, 10, 10)
+    numpy.testing.assert_array_equal(out, 1.0)
+
+    # compiled expressions are cached by expression and input types
+    evaluate("(b2 - b1) / (b2 + b1)", b1=b1 * 2, b2=b2 * 2)
+    assert compile_expression.cache_info().hits == 1
+    evaluate("(b2 - b1) / (b2 + b1)", b1=b1.astype("float32"), b2=b2)
+    assert compile_expression.cache_info().misses == 3
+
+    b1 = numpy.ma.MaskedArray(b1, mask=False)
+    b1.mask[0, 0, 0] = True
+    b2 = numpy.ma.MaskedArray(b2)
+    b2[0, 1, 1] = 0
+    b1[0, 1, 1] = 0
+    out = evaluate_masked("(b2 - b1) / (b2 + b1)", dtype="float32", b1=b1, b2=b2)
+    assert isinstance(out, numpy.ma.MaskedArray)
+    assert out.dtype == "float32"
+    assert out[0, 0, 0] is numpy.ma.masked  # masked input
+    assert out[0, 1, 1] is numpy.ma.masked  # division by zero
+    assert out.count() == 98
+
+
+def test_evaluate_numpy(monkeypatch):
+    """Expressions are evaluated with numpy without numexpr."""
+    arr = numpy.random.randint(0, 5000, (2, 266, 266), dtype="uint16")
+    arr[1, :10, :10] = 0
+    algos = [
+        default_algorithms.get("hillshade")(),
+        default_algorithms.get("slope")(),
+        default_algorithms.get("aspect")(),
+    ]
+    img = ImageData(numpy.ma.MaskedArray(arr[0:1]))
+    expected = [algo(img).array for algo in algos]
+    index = default_algorithms.get("normalizedIndex")()
+    expected_index = index(ImageData(numpy.ma.MaskedArray(arr))).array
+
+    monkeypatch.setattr("titiler.core.algorithm.expression.numexpr", None)
+    for algo, array in zip(algos, expected):
+        out = algo(img).array
+        assert out.dtype == array.dtype
+        numpy.testing.assert_allclose(out, array, atol=1)
+
+    out = index(ImageData(numpy.ma.MaskedArray(arr))).array
+    assert out.dtype == "float32"
+    numpy.testing.assert_array_equal(out.mask, expected_index.mask)
+    numpy.testing.assert_allclose(out, expected_index, rtol=1e-6)
+
+    out = evaluate("where(b1 > 1, b1, 0) * factor", dtype="uint8", b1=arr, factor=0)
+    assert out.dtype == "uint8"
+    assert out.shape == arr.shape
+
+
+def test_cellsize():
+    """test DEM pixel size."""
+    assert cellsize(ImageData(numpy.zeros((1, 10, 10)))) == (1.0, 1.0)
+
+    img = ImageData(
+        numpy.zeros((1, 100, 100)),
+        crs=CRS.from_epsg(2056),
+        bounds=(2600000, 1200000, 2601000, 1201000),
+    )
+    assert cellsize(img) == (10.0, 10.0)
+
+    # geographic (1/1000 degree at 60° latitude)
+    img = ImageData(
+        numpy.zeros((1, 100, 100)), crs=WGS84_CRS, bounds=(10.0, 59.95, 10.1, 60.05)
+    )
+    xres, yres = cellsize(img)
+    assert yres == pytest.approx(111.32, rel=1e-3)
+    assert xres == pytest.approx(111.32 / 2, rel=1e-3)
+
+    # Web Mercator tile at zoom 10 (~152.9m pixels), latitude ~60°
+    tms = morecantile.tms.get("WebMercatorQuad")
+    tile = tms.tile(10.0, 60.0, 10)
+    img = ImageData(
+        numpy.zeros((1, 256, 256)), crs=WEB_MERCATOR_CRS, bounds=tms.xy_bounds(tile)
+    )
+    xres, yres = cellsize(img)
+    assert 152.87 * 0.49 < xres < 152.87 * 0.51
+    assert xres == yres
+
+
+def test_slope_aspect():
+    """test slope and aspect."""
+    # plane rising eastward (2m per meter), 20m pixels
+    z = numpy.tile(numpy.arange(100, dtype="float32") * 40.0, (100, 1))
+    arr = numpy.ma.MaskedArray(z[numpy.newaxis], mask=False)
+    arr.mask[0, 0:10, 0:10] = True
+    img = ImageData(arr, crs=CRS.from_epsg(2056), bounds=(0, 0, 2000, 2000))
+
+    out = default_algorithms.get("slope")()(img)
+    assert out.array.shape == (1, 98, 98)
+    assert out.array.dtype == "float32"
+    assert out.band_names == ["slope"]
+    assert out.bounds == (20, 20, 1980, 1980)
+    numpy.testing.assert_allclose(out.array.compressed(), 63.43495, rtol=1e-5)
+    assert out.array[0, 0, 0] is numpy.ma.masked
+    # neighbors of masked pixels are masked (output is shifted by `buffer`)
+    assert out.array[0, 8, 9] is numpy.ma.masked
+    assert out.array[0, 9, 9] is not numpy.ma.masked
+
+    out = default_algorithms.get("slope")(units="percent", z_factor=0.5)(img)
+    numpy.testing.assert_allclose(out.array.compressed(), 100.0, rtol=1e-5)
+
+    out = default_algorithms.get("slope")(buffer=0)(img)
+    assert out.array.shape == (1, 100, 100)
+    assert out.bounds == img.bounds
+
+    # facing west
+    out = default_algorithms.get("aspect")()(img)
+    assert out.array.shape == (1, 98, 98)
+    numpy.testing.assert_allclose(out.array.compressed(), 270.0)
+
+    # facing south
+    img = ImageData(
+        numpy.ma.MaskedArray(z.T[::-1][numpy.newaxis]),
+        crs=CRS.from_epsg(2056),
+        bounds=(0, 0, 2000, 2000),
+    )
+    out = default_algorithms.get("aspect")()(img)
+    numpy.testing.assert_allclose(out.array.compressed(), 180.0)
+
+    # flat areas are masked
+    img = ImageData(
+        numpy.ma.MaskedArray(numpy.zeros((1, 10, 10), dtype="float32")),
+        crs=CRS.from_epsg(2056),
+        bounds=(0, 0, 100, 100),
+    )
+    assert default_algorithms.get("aspect")()(img).array.mask.all()
+
+
+def test_multi_hillshade():
+    """test multidirectional hillshade."""
+    algo = default_algorithms.get("multiHillshade")()
+
+    arr = numpy.random.randint(0, 5000, (1, 262, 262), dtype="uint16")
+    out = algo(ImageData(arr))
+    assert out.array.shape == (1, 256, 256)
+    assert out.array.dtype == "uint8"
+
+    # flat: sin(altitude)
+    out = algo(ImageData(numpy.zeros((1, 20, 20), dtype="float32")))
+    assert numpy.unique(out.array).tolist() == [int(255 * numpy.sin(numpy.pi / 4))]
+
+    # slopes facing the lights (west) are brighter
+    z = numpy.tile(numpy.arange(20, dtype="float32"), (20, 1))
+    west = algo(ImageData(z[numpy.newaxis])).array
+    east = algo(ImageData(z[numpy.newaxis, :, ::-1])).array
+    assert west.mean() > east.mean()
+
+
+def test_lazy_algorithms(tmp_path, monkeypatch):
+    """Algorithms registered by path are imported on first use."""
+    (tmp_path / "titiler_plugin_algorithms.py").write_text(
+        """
+from titiler.core.algorithm import BaseAlgorithm
+
+
+class Invert(BaseAlgorithm):
+    title: str = "Invert"
+    description: str = "Invert data."
+
+    maximum: int = 255
+
+    def __call__(self, img):
+        img.array = (self.maximum - img.array).astype("uint8")
+        return img
+
+
+NotAnAlgorithm = dict
+"""
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    entry_points = {
+        "titiler.algorithms": [
+            importlib_metadata.EntryPoint(
+                name="invert",
+                value="titiler_plugin_algorithms:Invert",
+                group="titiler.algorithms",
+            ),
+            # default algorithms are not overwritten
+            importlib_metadata.EntryPoint(
+                name="hillshade",
+                value="titiler_plugin_algorithms:Invert",
+                group="titiler.algorithms",
+            ),
+        ]
+    }
+    monkeypatch.setattr(importlib_metadata, "entry_points", lambda: entry_points)
+    plugins = entry_point_algorithms()
+    assert plugins == {
+        "invert": "titiler_plugin_algorithms:Invert",
+        "hillshade": "titiler_plugin_algorithms:Invert",
+    }
+
+    algorithms = default_algorithms.register({"invert": plugins["invert"]})
+    assert "invert" in algorithms.list()
+    assert "titiler_plugin_algorithms" not in sys.modules
+
+    app = FastAPI()
+    app.include_router(AlgorithmFactory(supported_algorithm=algorithms).router)
+
+    @app.get("/")
+    def main(algorithm=Depends(algorithms.dependency)):
+        """endpoint."""
+        img = ImageData(numpy.ma.MaskedArray(numpy.zeros((1, 2, 2), dtype="uint8")))
+        return Response(algorithm(img).data.tobytes())
+
+    client = TestClient(app)
+    response = client.get("/", params={"algorithm": "invert"})
+    assert response.status_code == 200
+    assert response.content == b"\xff" * 4
+    assert "titiler_plugin_algorithms" in sys.modules
+
+    response = client.get("/algorithms/invert")
+    assert response.status_code == 200
+    assert response.json()["title"] == "Invert"
+    assert response.json()["parameters"]["maximum"]["default"] == 255
+
+    algorithms = default_algorithms.register(
+        {"bad": "titiler_plugin_algorithms:NotAnAlgorithm"}
+    )
+    with pytest.raises(TypeError):
+        algorithms.get("bad")
+
+    # algorithms which cannot be imported are skipped from the listing
+    algorithms = algorithms.register(
+        {
+            "invert": "titiler_plugin_algorithms:Invert",
+            "missing": "titiler_missing_plugin:Algorithm",
+        }
+    )
+    app = FastAPI()
+    app.include_router(AlgorithmFactory(supported_algorithm=algorithms).router)
+
+    client = TestClient(app)
+    with pytest.warns(UserWarning):
+        response = client.get("/algorithms")
+    assert response.status_code == 200
+    assert "invert" in response.json()
+    assert "hillshade" in response.json()
+    assert "bad" not in response.json()
+    assert "missing" not in response.json()
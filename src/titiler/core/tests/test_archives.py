@@ -0,0 +1,251 @@
+"""Test titiler.core.archives."""
+
+import io
+import os
+
+import pytest
+
+from titiler.core.archives import (
+    PMTILES_HEADER_SIZE,
+    Compression,
+    Entry,
+    MBTilesWriter,
+    PMTilesReader,
+    PMTilesWriter,
+    TileType,
+    deserialize_directory,
+    deserialize_header,
+    find_tile,
+    mbtiles_to_pmtiles,
+    read_archive_tile,
+    zxy_to_tileid,
+)
+from titiler.core.cache import RangeCache
+
+from .conftest import DATA_DIR, RangeRequestHandler
+
+
+def read_tile(archive: bytes, z: int, x: int, y: int):
+    """Read a tile from a PMTiles archive."""
+    header = deserialize_header(archive)
+    entries = deserialize_directory(
+        archive[header.root_offset : header.root_offset + header.root_length]
+    )
+    tile_id = zxy_to_tileid(z, x, y)
+    for _ in range(4):
+        entry = find_tile(entries, tile_id)
+        if entry is None:
+            return None
+
+        if entry.run_length > 0:
+            offset = header.tile_data_offset + entry.offset
+            return archive[offset : offset + entry.length]
+
+        offset = header.leaf_directory_offset + entry.offset
+        entries = deserialize_directory(archive[offset : offset + entry.length])
+
+    return None
+
+
+def test_tileid():
+    """Test Hilbert tile ids."""
+    assert zxy_to_tileid(0, 0, 0) == 0
+    assert [zxy_to_tileid(1, x, y) for x, y in [(0, 0), (0, 1), (1, 1), (1, 0)]] == [
+        1,
+        2,
+        3,
+        4,
+    ]
+    assert zxy_to_tileid(2, 0, 0) == 5
+    assert zxy_to_tileid(2, 3, 0) == 20
+    assert zxy_to_tileid(3, 0, 0) == 21
+
+    # tile ids are unique
+    ids = {zxy_to_tileid(4, x, y) for x in range(16) for y in range(16)}
+    assert len(ids) == 256
+    assert min(ids) == zxy_to_tileid(4, 0, 0) == 85
+    assert max(ids) == 85 + 255
+
+    with pytest.raises(ValueError):
+        zxy_to_tileid(1, 2, 0)
+
+
+def test_find_tile():
+    """Test directory search."""
+    entries = [Entry(1, 0, 10, 1), Entry(5, 10, 10, 3), Entry(20, 0, 50, 0)]
+    assert find_tile(entries, 0) is None
+    assert find_tile(entries, 1) == entries[0]
+    assert find_tile(entries, 2) is None
+    assert find_tile(entries, 7) == entries[1]
+    assert find_tile(entries, 8) is None
+    # leaf directory
+    assert find_tile(entries, 100) == entries[2]
+
+
+def test_pmtiles_writer():
+    """Test PMTilesWriter."""
+    with PMTilesWriter(tile_type=TileType.png) as writer:
+        writer.write_tile(1, 0, 0, b"a")
+        writer.write_tile(1, 0, 1, b"b")
+        writer.write_tile(1, 1, 1, b"b")
+        writer.write_tile(1, 1, 0, b"c")
+        writer.write_tile(0, 0, 0, b"root")
+
+        f = io.BytesIO()
+        writer.write_to(f, bounds=(-10, -20, 10, 20), metadata={"name": "test"})
+        archive = f.getvalue()
+
+    header = deserialize_header(archive)
+    assert header.tile_type == TileType.png
+    assert header.tile_compression == Compression.none
+    assert header.internal_compression == Compression.gzip
+    assert header.min_zoom == 0
+    assert header.max_zoom == 1
+    assert header.min_lat_e7 == -200_000_000
+    assert header.addressed_tiles_count == 5
+    # identical consecutive tiles are merged in one entry
+    assert header.tile_entries_count == 4
+    assert header.tile_contents_count == 4
+    # tile 0/0/0 was written last
+    assert not header.clustered
+    assert header.root_offset == PMTILES_HEADER_SIZE
+    assert header.tile_data_length == len(b"abcroot")
+    assert len(archive) == header.tile_data_offset + header.tile_data_length
+
+    assert read_tile(archive, 0, 0, 0) == b"root"
+    assert read_tile(archive, 1, 0, 0) == b"a"
+    assert read_tile(archive, 1, 0, 1) == b"b"
+    assert read_tile(archive, 1, 1, 1) == b"b"
+    assert read_tile(archive, 1, 1, 0) == b"c"
+    assert read_tile(archive, 2, 0, 0) is None
+
+    with PMTilesWriter() as writer:
+        writer.write_tile(0, 0, 0, b"a")
+        writer.write_tile(0, 0, 0, b"a")
+        with pytest.raises(ValueError):
+            list(writer.finalize())
+
+
+def test_pmtiles_writer_leaf_directories():
+    """Root directory larger than 16kB are split in leaf directories."""
+    with PMTilesWriter() as writer:
+        for x in range(256):
+            for y in range(256):
+                writer.write_tile(8, x, y, f"{x}-{y}".encode())
+
+        archive = b"".join(writer.finalize())
+
+    header = deserialize_header(archive)
+    assert header.leaf_directory_length > 0
+    assert header.tile_entries_count == 256 * 256
+    assert header.root_offset + header.root_length <= 16384
+    assert read_tile(archive, 8, 12, 200) == b"12-200"
+    assert read_tile(archive, 8, 255, 0) == b"255-0"
+
+
+def test_mbtiles(tmp_path):
+    """Test MBTilesWriter and conversion to PMTiles."""
+    path = str(tmp_path / "tiles.mbtiles")
+    with MBTilesWriter(path, metadata={"name": "test", "minzoom": 0}) as writer:
+        writer.write_tile(1, 1, 0, b"c")
+        writer.write_tile(1, 0, 0, b"a")
+        writer.write_tile(0, 0, 0, b"root")
+        assert writer.has_tile(1, 1, 0)
+        assert not writer.has_tile(1, 1, 1)
+
+    with MBTilesWriter(path) as writer:
+        assert sorted(writer.tiles()) == [
+            (0, 0, 0, b"root"),
+            (1, 0, 0, b"a"),
+            (1, 1, 0, b"c"),
+        ]
+        # TMS rows
+        assert writer.db.execute(
+            "SELECT tile_row FROM tiles WHERE zoom_level=1 AND tile_column=1"
+        ).fetchone() == (1,)
+        assert dict(writer.db.execute("SELECT name, value FROM metadata")) == {
+            "name": "test",
+            "minzoom": "0",
+        }
+
+    dst = str(tmp_path / "tiles.pmtiles")
+    mbtiles_to_pmtiles(path, dst, tile_type=TileType.png)
+    assert not os.path.exists(f"{dst}.tmp")
+    with open(dst, "rb") as f:
+        archive = f.read()
+
+    header = deserialize_header(archive)
+    assert header.clustered
+    assert read_tile(archive, 1, 1, 0) == b"c"
+    assert read_tile(archive, 0, 0, 0) == b"root"
+
+
+def test_pmtiles_reader(tmp_path):
+    """Read tiles from a PMTiles archive."""
+    path = str(tmp_path / "tiles.pmtiles")
+    with PMTilesWriter() as writer:
+        for x in range(256):
+            for y in range(256):
+                writer.write_tile(8, x, y, f"{x}-{y}".encode())
+
+        with open(path, "wb") as f:
+            writer.write_to(f, metadata={"name": "leaves"})
+
+    with PMTilesReader(path, max_directories=2) as reader:
+        assert reader.header.leaf_directory_length > 0
+        assert reader.metadata == {"name": "leaves"}
+        assert reader.media_type == "image/png"
+        assert reader.get_tile(8, 12, 200) == b"12-200"
+        assert reader.get_tile(8, 255, 0) == b"255-0"
+        assert reader.get_tile(8, 0, 0) == b"0-0"
+        # leaf directories are cached (LRU)
+        assert len(reader._directories) == 2
+        # not in the archive
+        assert reader.get_tile(7, 0, 0) is None
+        assert reader.get_tile(9, 0, 0) is None
+
+
+def test_pmtiles_reader_remote(server, tmp_path):
+    """Read tiles from a remote PMTiles archive."""
+    url = f"{server}/tiles.pmtiles"
+
+    RangeRequestHandler.requests.clear()
+    with PMTilesReader(url) as reader:
+        assert reader.metadata["format"] == "png"
+        assert reader.get_tile(2, 1, 0) == b"2-1-0"
+        assert reader.get_tile(3, 0, 0) is None
+    # header + root directory, metadata and tile
+    assert len(RangeRequestHandler.requests) == 3
+    assert RangeRequestHandler.requests[0][1] == "bytes=0-16383"
+
+    # through the range-request cache
+    cache = RangeCache(str(tmp_path / "cache"))
+    with PMTilesReader(url, cache=cache) as reader:
+        assert reader.get_tile(2, 1, 0) == b"2-1-0"
+
+    RangeRequestHandler.requests.clear()
+    with PMTilesReader(url, cache=cache) as reader:
+        assert reader.get_tile(2, 1, 0) == b"2-1-0"
+    assert not RangeRequestHandler.requests
+
+
+def test_read_archive_tile():
+    """Read pre-rendered tiles."""
+    path = os.path.join(DATA_DIR, "tiles.pmtiles")
+    assert read_archive_tile(path, 1, 0, 1) == (b"1-0-1", "image/png")
+    assert read_archive_tile(path, 1, 0, 1, format="png") == (b"1-0-1", "image/png")
+
+    # not in the archive
+    assert not read_archive_tile(path, 3, 0, 1)
+    # tile size or format do not match the archive
+    assert not read_archive_tile(path, 1, 0, 1, tilesize=512)
+    assert not read_archive_tile(path, 1, 0, 1, format="pngraw")
+    assert not read_archive_tile(path, 1, 0, 1, format="jpeg")
+
+    # tile outside the tile matrix
+    assert not read_archive_tile(path, 1, 2, 0)
+    assert not read_archive_tile(path, 1, 0, -1)
+
+    # missing or invalid archives
+    assert not read_archive_tile(os.path.join(DATA_DIR, "nothere.pmtiles"), 1, 0, 1)
+    assert not read_archive_tile(os.path.join(DATA_DIR, "cog.tif"), 1, 0, 1)
@@ -0,0 +1,64 @@
+"""Test titiler.core.arrays."""
+
+import numpy
+import pytest
+
+from titiler.core.arrays import decode_array, encode_array
+from titiler.core.errors import BadRequestError
+from titiler.core.resources.enums import ArrayCompression
+
+
+@pytest.mark.parametrize("dtype", ["uint8", "int16", "uint16", "float32", "float64"])
+@pytest.mark.parametrize("compression", list(ArrayCompression))
+def test_encode_decode(dtype, compression):
+    """Encode and decode arrays."""
+    if compression == ArrayCompression.zstd:
+        pytest.importorskip("zstandard")
+    elif compression == ArrayCompression.lz4:
+        pytest.importorskip("lz4")
+
+    data = numpy.arange(3 * 20 * 30).reshape((3, 20, 30)).astype(dtype)
+    mask = numpy.zeros((20, 30), dtype="uint8")
+    mask[5:10, 5:10] = 255
+
+    content = encode_array(data, mask, compression=compression)
+    assert content[:4] == b"TIAR"
+
+    arr, msk = decode_array(content)
+    assert arr.dtype == data.dtype
+    numpy.testing.assert_array_equal(arr, data)
+    numpy.testing.assert_array_equal(msk, mask)
+
+    arr, msk = decode_array(encode_array(data[0], compression=compression))
+    assert arr.shape == (1, 20, 30)
+    numpy.testing.assert_array_equal(arr[0], data[0])
+    assert msk is None
+
+
+def test_encode_layout():
+    """Uncompressed payload is the raw (little-endian) data and mask."""
+    data = numpy.arange(2 * 4 * 5, dtype=">u2").reshape((2, 4, 5))
+    mask = numpy.full((4, 5), 255, dtype="uint8")
+
+    content = encode_array(data, mask)
+    assert len(content) == 24 + data.size * 2 + mask.size
+    assert content[24 : 24 + data.size * 2] == data.astype("<u2").tobytes()
+    assert content[24 + data.size * 2 :] == mask.tobytes()
+
+    arr, _ = decode_array(content)
+    assert arr.dtype == numpy.dtype("<u2")
+    numpy.testing.assert_array_equal(arr, data)
+
+    # non-contiguous arrays
+    arr, _ = decode_array(encode_array(data[:, ::2, ::2]))
+    numpy.testing.assert_array_equal(arr, data[:, ::2, ::2])
+
+    with pytest.raises(ValueError):
+        decode_array(b"NPY" + content[3:])
+
+
+def test_missing_compression_module(monkeypatch):
+    """Compression modules are optional."""
+    monkeypatch.setattr("titiler.core.arrays.zstandard", None)
+    with pytest.raises(BadRequestError):
+        encode_array(numpy.zeros((1, 2, 2)), compression=ArrayCompression.zstd)
@@ -0,0 +1,207 @@
+"""Test titiler.core.cache."""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import ThreadingHTTPServer
+
+import numpy
+import pytest
+from rio_tiler.models import ImageData
+
+from titiler.core.algorithm import AlgorithmPipeline, algorithms
+from titiler.core.cache import CachedReader, ImageCache, RangeCache
+
+from .conftest import DATA_DIR, RangeRequestHandler
+
+
+def test_range_cache(server, tmp_path):
+    """Test RangeCache."""
+    cache = RangeCache(str(tmp_path), blocksize=1024)
+    remote = cache.stat(f"{server}/cog.tif")
+    assert remote.size == os.path.getsize(os.path.join(DATA_DIR, "cog.tif"))
+    stat = os.stat(os.path.join(DATA_DIR, "cog.tif"))
+    assert remote.etag == f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    with open(os.path.join(DATA_DIR, "cog.tif"), "rb") as f:
+        f.seek(1000)
+        expected = f.read(3000)
+
+    RangeRequestHandler.requests.clear()
+    assert cache.read(remote, 1000, 3000) == expected
+    # 4 missing consecutive blocks fetched in one request
+    assert RangeRequestHandler.requests == [("/cog.tif", "bytes=0-4095")]
+    assert cache.disk_usage() == 4096
+
+    RangeRequestHandler.requests.clear()
+    assert cache.read(remote, 1000, 3000) == expected
+    assert cache.read(remote, 2048, 10) == expected[1048:1058]
+    assert not RangeRequestHandler.requests
+
+    # Only fetch missing blocks
+    assert len(cache.read(remote, 3000, 2000)) == 2000
+    assert RangeRequestHandler.requests == [("/cog.tif", "bytes=4096-5119")]
+
+    # Reads past the end of file are truncated
+    assert len(cache.read(remote, remote.size - 10, 100)) == 10
+    assert cache.read(remote, remote.size + 10, 100) == b""
+
+    # Keys include the ETag
+    assert cache.key(remote, 0, 1023) != cache.key(
+        remote._replace(etag='"v2"'), 0, 1023
+    )
+
+    with pytest.raises(FileNotFoundError):
+        cache.stat(f"{server}/nothere.tif")
+
+
+def test_range_cache_no_range_support(tmp_path):
+    """Files are not downloaded when the server ignores the Range header."""
+
+    class NoRangeHandler(RangeRequestHandler):
+        """Ignore Range header."""
+
+        def _parse_range(self, size):
+            return None
+
+    httpd = ThreadingHTTPServer(
+        ("127.0.0.1", 0), partial(NoRangeHandler, directory=DATA_DIR)
+    )
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        cache = RangeCache(str(tmp_path), blocksize=1024)
+        remote = cache.stat(f"http://127.0.0.1:{httpd.server_address[1]}/cog.tif")
+        with pytest.raises(OSError, match="Range requests not supported"):
+            cache.read(remote, 0, 100)
+    finally:
+        httpd.shutdown()
+
+    assert cache.disk_usage() == 0
+
+
+def test_range_cache_eviction(server, tmp_path):
+    """Least recently used blocks are removed."""
+    cache = RangeCache(str(tmp_path), blocksize=1024, maxsize=4096)
+    remote = cache.stat(f"{server}/cog.tif")
+    first = cache.path(cache.key(remote, 0, 1023))
+
+    cache.read(remote, 0, 1024)
+    os.utime(first, (0, 0))
+    cache.read(remote, 1024, 4096)
+
+    assert cache.disk_usage() <= 4096
+    assert not os.path.exists(first)
+
+    # Lock files are shared by the blocks
+    assert len(os.listdir(tmp_path / ".locks")) <= cache.lock_stripes + 1
+
+
+def test_range_cache_shared_size(server, tmp_path):
+    """The cache size is synced with the blocks written by other workers."""
+    worker1 = RangeCache(str(tmp_path), blocksize=1024, maxsize=8192)
+    worker2 = RangeCache(str(tmp_path), blocksize=1024, maxsize=8192)
+    remote = worker1.stat(f"{server}/cog.tif")
+
+    worker1.read(remote, 0, 1024)
+    worker2.read(remote, 1024, 7168)
+    assert worker1.disk_usage() == 8192
+
+    # worker1 only wrote 1 block but sees the blocks written by worker2
+    worker1.read(remote, 8192, 2048)
+    assert worker1.disk_usage() <= 8192
+
+
+def test_cached_reader(server, tmp_path):
+    """Test CachedReader."""
+    cache = RangeCache(str(tmp_path))
+    url = f"{server}/cog.tif"
+
+    with CachedReader(os.path.join(DATA_DIR, "cog.tif"), cache=cache) as src:
+        expected = src.tile(87, 48, 8)
+        info = src.info()
+
+    with CachedReader(url, cache=cache) as src:
+        assert src.info() == info
+        img = src.tile(87, 48, 8)
+        assert (img.array == expected.array).all()
+
+    RangeRequestHandler.requests.clear()
+    with CachedReader(url, cache=cache) as src:
+        img = src.tile(87, 48, 8)
+        assert (img.array == expected.array).all()
+
+    # All requests served from the cache
+    assert not RangeRequestHandler.requests
+
+    # Concurrent readers
+    def _tile(_):
+        with CachedReader(url, cache=cache) as src:
+            return src.tile(87, 48, 8).array
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for arr in executor.map(_tile, range(8)):
+            assert (arr == expected.array).all()
+
+    # Without cache, use rasterio's default
+    with CachedReader(os.path.join(DATA_DIR, "cog.tif"), cache=None) as src:
+        assert src.info() == info
+
+
+def test_ImageCache():
+    """Test ImageCache."""
+    image = ImageData(numpy.ma.MaskedArray(numpy.ones((1, 16, 16), dtype="float32")))
+    size = 16 * 16 * 4 + 16 * 16
+
+    cache = ImageCache(maxsize=2 * size)
+    assert cache.key("cog.tif", 1, {"bidx": [1]}) == cache.key(
+        "cog.tif", 1, {"bidx": [1]}
+    )
+    assert cache.key("cog.tif", 1) != cache.key("cog.tif", 2)
+
+    # algorithms are keyed by class and parameters
+    hillshade = algorithms.get("hillshade")
+    assert cache.key(hillshade()) == cache.key(hillshade())
+    assert cache.key(hillshade()) != cache.key(hillshade(azimuth=90))
+    assert cache.key(hillshade()) != cache.key(algorithms.get("slope")())
+    assert cache.key(AlgorithmPipeline(steps=[hillshade()])) != cache.key(
+        AlgorithmPipeline(steps=[hillshade(azimuth=90)])
+    )
+
+    # numpy values are not truncated
+    assert cache.key(numpy.arange(2000)) != cache.key(numpy.arange(2001))
+    assert cache.key(numpy.float32(1.5)) == cache.key(1.5)
+
+    # values without stable representation (e.g functions) are not cached
+    assert cache.key("cog.tif", lambda img: img) is None
+
+    cache.set("a", image, {1: (0, 0, 0, 255)})
+    cached, colormap = cache.get("a")
+    assert colormap == {1: (0, 0, 0, 255)}
+    numpy.testing.assert_array_equal(cached.array, image.array)
+
+    # returned image is a copy
+    cached.array[:] = 0
+    assert cache.get("a")[0].array.max() == 1
+
+    # least recently used images are evicted
+    cache.set("b", image)
+    cache.get("a")
+    cache.set("c", image)
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.size == 2 * size
+
+    # expired
+    cache = ImageCache(ttl=0)
+    cache.set("a", image)
+    time.sleep(0.01)
+    assert cache.get("a") is None
+    assert cache.size == 0
+
+    # too large
+    cache = ImageCache(maxsize=10)
+    cache.set("a", image)
+    assert not len(cache)
@@ -6,7 +6,7 @@ from starlette.responses import Response
 from starlette.testclient import TestClient
 from typing_extensions import Annotated
 
-from titiler.core.middleware import CacheControlMiddleware
+from titiler.core.middleware import CacheControlMiddleware, CachePolicy
 
 
 def test_cachecontrol_middleware_exclude():
@@ -72,3 +72,73 @@ def test_cachecontrol_middleware_exclude():
 
     response = client.get("/emptytiles/3/1/1")
     assert not response.headers.get("Cache-Control")
+
+
+def test_cachecontrol_middleware_policies():
+    """Test route name policies."""
+    app = FastAPI()
+
+    @app.get("/tiles/{z}/{x}/{y}")
+    async def tile(z: int, x: int, y: int):
+        """tile."""
+        return "yeah"
+
+    @app.get("/tilejson.json")
+    async def tilejson():
+        """tilejson."""
+        return "yeah"
+
+    @app.get("/info")
+    async def info():
+        """info."""
+        return "yeah"
+
+    @app.get("/statistics")
+    async def statistics():
+        """statistics."""
+        return "yeah"
+
+    @app.get("/healthz")
+    async def healthz():
+        """healthz."""
+        return "yeah"
+
+    app.add_middleware(
+        CacheControlMiddleware,
+        cachecontrol="public, max-age=3600",
+        exclude_path={r"/healthz"},
+        policies={
+            "tile": CachePolicy(
+                max_age=3600,
+                s_maxage=86400,
+                stale_while_revalidate=600,
+                stale_if_error=86400,
+            ),
+            "tilejson": "public, max-age=60",
+            "info": None,
+            "healthz": "public, max-age=10",
+        },
+    )
+
+    client = TestClient(app)
+
+    response = client.get("/tiles/3/1/1")
+    assert (
+        response.headers["Cache-Control"]
+        == "public, max-age=3600, s-maxage=86400, stale-while-revalidate=600, stale-if-error=86400"
+    )
+
+    response = client.get("/tilejson.json")
+    assert response.headers["Cache-Control"] == "public, max-age=60"
+
+    response = client.get("/info")
+    assert not response.headers.get("Cache-Control")
+
+    response = client.get("/statistics")
+    assert response.headers["Cache-Control"] == "public, max-age=3600"
+
+    # exclude_path takes precedence over policies
+    response = client.get("/healthz")
+    assert not response.headers.get("Cache-Control")
+
+    assert str(CachePolicy(max_age=0, public=False)) == "max-age=0"
@@ -0,0 +1,134 @@
+"""Test titiler.core.coverage."""
+
+import numpy
+from affine import Affine
+from rasterio.features import rasterize
+from rio_tiler.models import ImageData
+
+from titiler.core.coverage import (
+    centroid_coverage,
+    exact_coverage,
+    get_coverage_array,
+)
+from titiler.core.resources.enums import CoverageMethod
+
+square = {
+    "type": "Polygon",
+    "coordinates": [[[0.5, 0.5], [2.5, 0.5], [2.5, 2.5], [0.5, 2.5], [0.5, 0.5]]],
+}
+
+
+def test_exact_coverage():
+    """Test exact coverage against known areas."""
+    transform = Affine.identity()
+    coverage = exact_coverage(square, transform, 4, 4)
+    assert coverage.dtype == "float32"
+    numpy.testing.assert_allclose(
+        coverage,
+        [
+            [0.25, 0.5, 0.25, 0],
+            [0.5, 1, 0.5, 0],
+            [0.25, 0.5, 0.25, 0],
+            [0, 0, 0, 0],
+        ],
+    )
+
+    # ring orientation does not matter
+    reverse = {"type": "Polygon", "coordinates": [square["coordinates"][0][::-1]]}
+    numpy.testing.assert_allclose(exact_coverage(reverse, transform, 4, 4), coverage)
+
+    # hole and polygon larger than the image
+    polygon = {
+        "type": "Polygon",
+        "coordinates": [
+            [[-1.5, -1], [3.25, -1], [3.25, 3.75], [-1.5, 3.75], [-1.5, -1]],
+            [[1, 1], [2, 1], [2, 2], [1, 2], [1, 1]],
+        ],
+    }
+    coverage = exact_coverage(polygon, transform, 4, 4)
+    assert coverage[1, 1] == 0
+    assert coverage[0, 3] == 0.25
+    assert coverage[3, 3] == 0.1875
+    assert numpy.isclose(coverage.sum(), 3.25 * 3.75 - 1)
+
+    # multipolygon
+    multi = {
+        "type": "MultiPolygon",
+        "coordinates": [square["coordinates"], polygon["coordinates"][1:]],
+    }
+    assert numpy.isclose(exact_coverage(multi, transform, 4, 4).sum(), 4)
+
+    # outside the image
+    outside = {
+        "type": "Polygon",
+        "coordinates": [[[10, 10], [12, 10], [12, 12], [10, 12], [10, 10]]],
+    }
+    assert not exact_coverage(outside, transform, 4, 4).any()
+
+
+def test_exact_coverage_supersample():
+    """Compare exact coverage with a supersampled rasterization."""
+    transform = Affine.translation(100, 200) * Affine.scale(0.5, -0.5)
+    triangle = {
+        "type": "Polygon",
+        "coordinates": [
+            [[100.2, 199.9], [103.8, 199.4], [101.7, 196.5], [100.2, 199.9]]
+        ],
+    }
+    coverage = exact_coverage(triangle, transform, 8, 8)
+
+    scale = 100
+    supersample = rasterize(
+        [(triangle, 1)],
+        out_shape=(8 * scale, 8 * scale),
+        transform=transform * Affine.scale(1 / scale),
+        fill=0,
+        dtype="uint8",
+    )
+    supersample = supersample.reshape(8, scale, 8, scale).sum(axis=(1, 3)) / scale**2
+    numpy.testing.assert_allclose(coverage, supersample, atol=1e-3)
+
+
+def test_get_coverage_array():
+    """Test get_coverage_array methods."""
+    image = ImageData(
+        numpy.ma.zeros((1, 4, 4)),
+        bounds=(0, -4, 4, 0),
+        crs="epsg:3857",
+    )
+    coverage = get_coverage_array(image, square, shape_crs="epsg:3857")
+    assert coverage.sum() == 0
+
+    flipped = {
+        "type": "Feature",
+        "properties": {},
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [[[x, -y] for x, y in square["coordinates"][0]]],
+        },
+    }
+    coverage = get_coverage_array(image, flipped, shape_crs="epsg:3857")
+    numpy.testing.assert_allclose(
+        coverage, exact_coverage(square, Affine.identity(), 4, 4)
+    )
+
+    # pixels centers inside the geometry
+    polygon = {
+        "type": "Polygon",
+        "coordinates": [
+            [[0.2, -0.2], [2.2, -0.2], [2.2, -2.2], [0.2, -2.2], [0.2, -0.2]]
+        ],
+    }
+    coverage = get_coverage_array(
+        image, polygon, shape_crs="epsg:3857", method=CoverageMethod.centroid
+    )
+    assert coverage.tolist() == [[1, 1, 0, 0], [1, 1, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]]
+    numpy.testing.assert_array_equal(
+        coverage, centroid_coverage(polygon, image.transform, 4, 4)
+    )
+
+    # non polygonal geometries use rio-tiler's supersampled coverage
+    line = {"type": "LineString", "coordinates": [[0.5, -0.5], [3.5, -0.5]]}
+    coverage = get_coverage_array(image, line, shape_crs="epsg:3857")
+    assert coverage[0].all()
+    assert not coverage[1:].any()
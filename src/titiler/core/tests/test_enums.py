@@ -12,6 +12,8 @@ from titiler.core.resources.enums import ImageType
         ("png", "PNG", "image/png"),
         ("npy", "NPY", "application/x-binary"),
         ("tif", "GTiff", "image/tiff; application=geotiff"),
+        ("cog", "COG", "image/tiff; application=geotiff; profile=cloud-optimized"),
+        ("bin", "BIN", "application/octet-stream"),
         ("jpg", "JPEG", "image/jpg"),
         ("jpeg", "JPEG", "image/jpeg"),
         ("jp2", "JP2OpenJPEG", "image/jp2"),
@@ -32,3 +34,13 @@ def test_imagetype(value, driver, mediatype):
 def test_imageprofile(driver):
     """test image profile."""
     assert ImageType[driver].profile == img_profiles.get(driver)
+
+
+def test_cogprofile():
+    """test COG profile."""
+    profile = ImageType.cog.profile
+    assert profile["compress"] == "DEFLATE"
+    assert profile["overviews"] == "AUTO"
+    # profile is a copy
+    profile["compress"] = "LZW"
+    assert ImageType.cog.profile["compress"] == "DEFLATE"
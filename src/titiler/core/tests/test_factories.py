@@ -1,10 +1,14 @@
 """Test TiTiler Tiler Factories."""
 
+import hashlib
 import json
 import os
 import pathlib
+import threading
+import time
 import warnings
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from io import BytesIO
 from typing import Dict, Optional, Sequence, Type
@@ -27,7 +31,9 @@ from rio_tiler.io import BaseReader, MultiBandReader, Reader, STACReader
 from starlette.requests import Request
 from starlette.testclient import TestClient
 
-from titiler.core.dependencies import RescaleType
+from titiler.core.arrays import decode_array
+from titiler.core.cache import ImageCache
+from titiler.core.dependencies import ArchiveParams, RescaleType
 from titiler.core.errors import DEFAULT_STATUS_CODES, add_exception_handlers
 from titiler.core.factory import (
     AlgorithmFactory,
@@ -38,6 +44,8 @@ from titiler.core.factory import (
     TilerFactory,
     TMSFactory,
 )
+from titiler.core.middleware import TotalTimeMiddleware
+from titiler.core.resources.enums import OptionalHeader
 
 from .conftest import DATA_DIR, mock_rasterio_open, parse_img
 
@@ -49,7 +57,7 @@ WEB_TMS = TileMatrixSets({"WebMercatorQuad": morecantile.tms.get("WebMercatorQua
 def test_TilerFactory():
     """Test TilerFactory class."""
     cog = TilerFactory()
-    assert len(cog.router.routes) == 22
+    assert len(cog.router.routes) == 25
     assert len(cog.supported_tms.list()) == NB_DEFAULT_TMS
 
     cog = TilerFactory(router_prefix="something", supported_tms=WEB_TMS)
@@ -76,7 +84,7 @@ def test_TilerFactory():
     assert response.status_code == 422
 
     cog = TilerFactory(add_preview=False, add_part=False, add_viewer=False)
-    assert len(cog.router.routes) == 14
+    assert len(cog.router.routes) == 17
 
     app = FastAPI()
     cog = TilerFactory()
@@ -759,7 +767,7 @@ def test_MultiBaseTilerFactory(rio):
     rio.open = mock_rasterio_open
 
     stac = MultiBaseTilerFactory(reader=STACReader)
-    assert len(stac.router.routes) == 24
+    assert len(stac.router.routes) == 27
 
     app = FastAPI()
     app.include_router(stac.router)
@@ -1147,7 +1155,7 @@ def test_MultiBandTilerFactory():
     bands = MultiBandTilerFactory(
         reader=BandFileReader, path_dependency=CustomPathParams
     )
-    assert len(bands.router.routes) == 23
+    assert len(bands.router.routes) == 26
 
     app = FastAPI()
     app.include_router(bands.router)
@@ -1538,7 +1546,7 @@ def test_TilerFactory_WithDependencies():
         ],
         router_prefix="something",
     )
-    assert len(cog.router.routes) == 22
+    assert len(cog.router.routes) == 25
 
     app = FastAPI()
     app.include_router(cog.router, prefix="/something")
@@ -1997,3 +2005,807 @@ def test_colormap_factory():
     assert meta["count"] == 4
     assert meta["width"] == 20
     assert meta["height"] == 256
+
+
+def test_TilerFactory_conditional_requests():
+    """Test ETag/Last-Modified headers and conditional requests."""
+    app = FastAPI()
+    cog = TilerFactory(conditional_requests=True)
+    app.include_router(cog.router)
+    add_exception_handlers(app, DEFAULT_STATUS_CODES)
+    client = TestClient(app)
+
+    url = f"{DATA_DIR}/cog.tif"
+    response = client.get(
+        "/tiles/WebMercatorQuad/8/87/48.png", params={"url": url, "rescale": "0,1000"}
+    )
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith('"')
+    last_modified = response.headers["Last-Modified"]
+
+    # Same request, same ETag
+    response = client.get(
+        "/tiles/WebMercatorQuad/8/87/48.png", params={"rescale": "0,1000", "url": url}
+    )
+    assert response.headers["ETag"] == etag
+
+    # Different parameters, different ETag
+    response = client.get(
+        "/tiles/WebMercatorQuad/8/87/48.png", params={"url": url, "rescale": "0,500"}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    with patch.object(Reader, "tile") as read_tile:
+        response = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.png",
+            params={"url": url, "rescale": "0,1000"},
+            headers={"If-None-Match": etag},
+        )
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert not response.content
+        read_tile.assert_not_called()
+
+        response = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.png",
+            params={"url": url, "rescale": "0,1000"},
+            headers={"If-None-Match": f'"something", W/{etag}'},
+        )
+        assert response.status_code == 304
+
+        response = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.png",
+            params={"url": url, "rescale": "0,1000"},
+            headers={"If-Modified-Since": last_modified},
+        )
+        assert response.status_code == 304
+        read_tile.assert_not_called()
+
+    response = client.get(
+        "/tiles/WebMercatorQuad/8/87/48.png",
+        params={"url": url, "rescale": "0,1000"},
+        headers={"If-None-Match": '"something"'},
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        "/tiles/WebMercatorQuad/8/87/48.png",
+        params={"url": url, "rescale": "0,1000"},
+        headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"},
+    )
+    assert response.status_code == 200
+
+    response = client.get("/preview.png", params={"url": url, "max_size": 64})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    response = client.get(
+        "/preview.png",
+        params={"url": url, "max_size": 64},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+
+    response = client.get(
+        "/bbox/-56.228,72.715,-54.547,73.188.png", params={"url": url}
+    )
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    response = client.get(
+        "/bbox/-56.228,72.715,-54.547,73.188.png",
+        params={"url": url},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+
+    # Validators are not computed by default
+    app = FastAPI()
+    app.include_router(TilerFactory().router)
+    client = TestClient(app)
+    response = client.get(
+        "/tiles/WebMercatorQuad/8/87/48.png", params={"url": url, "rescale": "0,1000"}
+    )
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+
+def test_TilerFactory_server_timing(caplog):
+    """Test Server-Timing header."""
+    url = f"{DATA_DIR}/cog.tif"
+
+    cog = TilerFactory(optional_headers=[OptionalHeader.server_timing])
+    app = FastAPI()
+    app.include_router(cog.router)
+    app.add_middleware(TotalTimeMiddleware)
+    client = TestClient(app)
+
+    with caplog.at_level("DEBUG", logger="titiler.timings"):
+        response = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.png",
+            params={"url": url, "rescale": "0,1000", "colormap_name": "viridis"},
+        )
+    assert response.status_code == 200
+    stages = [t.split(";")[0] for t in response.headers["Server-Timing"].split(", ")]
+    assert stages == [
+        "dependencies",
+        "open",
+        "read",
+        "rescale",
+        "colormap",
+        "encode",
+        "total",
+    ]
+
+    logs = [
+        json.loads(r.message) for r in caplog.records if r.name == "titiler.timings"
+    ]
+    assert len(logs) == 1
+    assert logs[0]["route"] == "tile"
+    assert list(logs[0]["timings"]) == stages[:-1]
+
+    response = client.get("/preview.png", params={"url": url, "max_size": 64})
+    assert response.status_code == 200
+    assert "read;dur=" in response.headers["Server-Timing"]
+
+    response = client.get(
+        "/bbox/-56.228,72.715,-54.547,73.188.png", params={"url": url}
+    )
+    assert response.status_code == 200
+    assert "read;dur=" in response.headers["Server-Timing"]
+
+    # Not added by default
+    app = FastAPI()
+    app.include_router(TilerFactory().router)
+    client = TestClient(app)
+    response = client.get(
+        "/tiles/WebMercatorQuad/8/87/48.png", params={"url": url, "rescale": "0,1000"}
+    )
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+
+
+def test_TilerFactory_single_flight():
+    """Concurrent identical tile requests share one render."""
+    url = f"{DATA_DIR}/cog.tif"
+    calls = []
+    barrier = threading.Barrier(4)
+
+    @attr.s
+    class SlowReader(Reader):
+        """Reader counting (slow) tile reads."""
+
+        def tile(self, *args, **kwargs):
+            """Read tile."""
+            calls.append(args)
+            time.sleep(0.2)
+            return super().tile(*args, **kwargs)
+
+    cog = TilerFactory(
+        reader=SlowReader,
+        single_flight=True,
+        optional_headers=[OptionalHeader.server_timing],
+    )
+    app = FastAPI()
+    app.include_router(cog.router)
+
+    with TestClient(app) as client:
+
+        def _get(params):
+            barrier.wait()
+            return client.get("/tiles/WebMercatorQuad/8/87/48.png", params=params)
+
+        # query parameters order doesn't matter
+        params = [
+            {"url": url, "rescale": "0,1000"},
+            {"rescale": "0,1000", "url": url},
+            {"url": url, "rescale": "0,1000"},
+            {"url": url, "rescale": "0,500"},
+        ]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            responses = list(executor.map(_get, params))
+
+    assert all(r.status_code == 200 for r in responses)
+    assert len(calls) == 2
+    assert responses[0].content == responses[1].content == responses[2].content
+    timings = [r.headers["Server-Timing"] for r in responses[:3]]
+    assert sum("singleflight;dur=" in t for t in timings) == 2
+
+    # Not in flight anymore
+    with TestClient(app) as client:
+        response = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.png",
+            params={"url": url, "rescale": "0,1000"},
+        )
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert not cog.flights._flights
+
+
+def test_TilerFactory_image_cache():
+    """Re-styled tiles are not read nor post-processed again."""
+    url = f"{DATA_DIR}/cog.tif"
+    calls = []
+
+    @attr.s
+    class CountingReader(Reader):
+        """Reader counting tile reads."""
+
+        def tile(self, *args, **kwargs):
+            """Read tile."""
+            calls.append(args)
+            return super().tile(*args, **kwargs)
+
+    cog = TilerFactory(
+        reader=CountingReader,
+        image_cache=ImageCache(),
+        optional_headers=[OptionalHeader.server_timing],
+    )
+    app = FastAPI()
+    app.include_router(cog.router)
+
+    with TestClient(app) as client:
+        params = {"url": url, "algorithm": "hillshade", "buffer": 3}
+        response = client.get("/tiles/WebMercatorQuad/8/87/48.png", params=params)
+        assert response.status_code == 200
+        assert "postprocess;dur=" in response.headers["Server-Timing"]
+        assert len(calls) == 1
+        assert len(cog.image_cache) == 1
+
+        # other rendering options (format, colormap, rescale): cached image
+        for styling in [
+            {},
+            {"colormap_name": "viridis"},
+            {"rescale": "0,100", "colormap_name": "terrain"},
+        ]:
+            response = client.get(
+                "/tiles/WebMercatorQuad/8/87/48.jpeg", params={**params, **styling}
+            )
+            assert response.status_code == 200
+            timings = response.headers["Server-Timing"]
+            assert "cache;dur=" in timings
+            assert "postprocess;dur=" not in timings
+
+        assert len(calls) == 1
+
+        # same styling returns the same image (cached image is not modified)
+        first = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.png", params={**params, "rescale": "0,100"}
+        )
+        second = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.png", params={**params, "rescale": "0,100"}
+        )
+        assert first.content == second.content
+        assert len(calls) == 1
+
+        # other algorithm parameters, band or tile
+        for other in [
+            {**params, "algorithm_params": '{"azimuth": 90}'},
+            {"url": url, "bidx": 1},
+        ]:
+            response = client.get("/tiles/WebMercatorQuad/8/87/48.png", params=other)
+            assert response.status_code == 200
+
+        response = client.get("/tiles/WebMercatorQuad/8/87/47.png", params=params)
+        assert response.status_code == 200
+        assert len(calls) == 4
+        assert len(cog.image_cache) == 4
+
+    # custom post-processing functions are not cached
+    cog = TilerFactory(
+        reader=CountingReader,
+        image_cache=ImageCache(),
+        process_dependency=lambda: lambda img: img,
+    )
+    app = FastAPI()
+    app.include_router(cog.router)
+
+    with TestClient(app) as client:
+        for _ in range(2):
+            response = client.get(
+                "/tiles/WebMercatorQuad/8/87/48.png", params={"url": url}
+            )
+            assert response.status_code == 200
+
+    assert len(calls) == 6
+    assert not len(cog.image_cache)
+
+
+def test_TilerFactory_points():
+    """Test /points endpoints."""
+    app = FastAPI()
+    app.include_router(TilerFactory(max_points=10).router)
+    add_exception_handlers(app, DEFAULT_STATUS_CODES)
+    client = TestClient(app)
+
+    coordinates = [[-56.228, 72.715], [-59.337, 73.9898], [0, 0]]
+    response = client.post(
+        "/points",
+        params={"url": f"{DATA_DIR}/cog.tif"},
+        json={"type": "MultiPoint", "coordinates": coordinates},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["coordinates"] == coordinates
+    assert body["band_names"] == ["b1"]
+    for (lon, lat), values in zip(coordinates[:2], body["values"]):
+        point = client.get(f"/point/{lon},{lat}?url={DATA_DIR}/cog.tif").json()
+        assert values == point["values"]
+    assert body["values"][2] == [None]
+
+    feature_collection = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {},
+                "geometry": {"type": "Point", "coordinates": coordinates[0]},
+            },
+            {
+                "type": "Feature",
+                "properties": {},
+                "geometry": {"type": "MultiPoint", "coordinates": coordinates[1:]},
+            },
+        ],
+    }
+    response = client.post(
+        "/points.json",
+        params={"url": f"{DATA_DIR}/cog.tif", "expression": "b1*2"},
+        json=feature_collection,
+    )
+    assert response.status_code == 200
+    assert response.json()["band_names"] == ["b1*2"]
+    assert response.json()["values"] == [
+        [v[0] * 2] if v[0] is not None else [None] for v in body["values"]
+    ]
+
+    response = client.post(
+        "/points.bin",
+        params={"url": f"{DATA_DIR}/cog.tif", "compression": "zlib"},
+        json={"lon": [c[0] for c in coordinates], "lat": [c[1] for c in coordinates]},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    arr, mask = decode_array(response.content)
+    assert arr.shape == (1, 1, 3)
+    assert arr[0, 0, :2].tolist() == [v[0] for v in body["values"][:2]]
+    assert mask.tolist() == [[255, 255, 0]]
+
+    response = client.post(
+        "/points",
+        params={"url": f"{DATA_DIR}/cog.tif"},
+        json={
+            "type": "Polygon",
+            "coordinates": [[[-57, 73], [-56, 73], [-56, 72], [-57, 73]]],
+        },
+    )
+    assert response.status_code == 422
+
+    response = client.post(
+        "/points",
+        params={"url": f"{DATA_DIR}/cog.tif"},
+        json={
+            "type": "Feature",
+            "properties": {},
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [[[-57, 73], [-56, 73], [-56, 72], [-57, 73]]],
+            },
+        },
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        "/points",
+        params={"url": f"{DATA_DIR}/cog.tif"},
+        json={"lon": [-56.228, -59.337], "lat": [72.715]},
+    )
+    assert response.status_code == 422
+
+    response = client.post(
+        "/points",
+        params={"url": f"{DATA_DIR}/cog.tif"},
+        json={"lon": [-56.228] * 11, "lat": [72.715] * 11},
+    )
+    assert response.status_code == 400
+
+
+def test_TilerFactory_statistics_coverage():
+    """Test coverage methods of POST /statistics."""
+    app = FastAPI()
+    app.include_router(TilerFactory().router)
+    client = TestClient(app)
+
+    feature = {
+        "type": "Feature",
+        "properties": {},
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [
+                [
+                    [-56.4, 73.9],
+                    [-56.1, 73.9],
+                    [-56.1, 74.1],
+                    [-56.4, 74.1],
+                    [-56.4, 73.9],
+                ]
+            ],
+        },
+    }
+
+    stats = {}
+    for method in ["exact", "centroid"]:
+        response = client.post(
+            "/statistics",
+            params={"url": f"{DATA_DIR}/cog.tif", "coverage_method": method},
+            json=feature,
+        )
+        assert response.status_code == 200
+        stats[method] = response.json()["properties"]["statistics"]["b1"]
+
+    response = client.post(
+        "/statistics", params={"url": f"{DATA_DIR}/cog.tif"}, json=feature
+    )
+    assert response.json()["properties"]["statistics"]["b1"] == stats["exact"]
+
+    # centroid coverage only uses whole pixels
+    assert stats["centroid"]["count"] == int(stats["centroid"]["count"])
+    assert stats["exact"]["count"] != int(stats["exact"]["count"])
+    assert stats["exact"]["count"] == pytest.approx(stats["centroid"]["count"], rel=0.1)
+
+    response = client.post(
+        "/statistics",
+        params={"url": f"{DATA_DIR}/cog.tif", "coverage_method": "supersample"},
+        json=feature,
+    )
+    assert response.status_code == 422
+
+
+def test_TilerFactory_profile():
+    """Test /profile endpoint."""
+    app = FastAPI()
+    app.include_router(TilerFactory(max_points=200).router)
+    add_exception_handlers(app, DEFAULT_STATUS_CODES)
+    client = TestClient(app)
+
+    line = {"type": "LineString", "coordinates": [[-57, 73.5], [-56.4, 73.9]]}
+    response = client.post(
+        "/profile", params={"url": f"{DATA_DIR}/cog.tif", "samples": 5}, json=line
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["band_names"] == ["b1"]
+    assert len(body["coordinates"]) == len(body["distances"]) == 5
+    assert body["coordinates"][0] == [-57, 73.5]
+    assert body["coordinates"][-1] == [-56.4, 73.9]
+    assert body["distances"][0] == 0
+    for (lon, lat), values in zip(body["coordinates"], body["values"]):
+        point = client.get(f"/point/{lon},{lat}?url={DATA_DIR}/cog.tif").json()
+        assert values == point["values"]
+
+    # default to 100 samples
+    response = client.post(
+        "/profile",
+        params={"url": f"{DATA_DIR}/cog.tif"},
+        json={"type": "Feature", "properties": {}, "geometry": line},
+    )
+    assert response.status_code == 200
+    assert len(response.json()["values"]) == 100
+
+    response = client.post(
+        "/profile", params={"url": f"{DATA_DIR}/cog.tif", "spacing": 5000}, json=line
+    )
+    assert response.status_code == 200
+    distances = response.json()["distances"]
+    assert distances[:3] == [0, 5000, 10000]
+    assert len(distances) == 11
+
+    response = client.post(
+        "/profile",
+        params={"url": f"{DATA_DIR}/cog.tif", "spacing": 5000, "samples": 10},
+        json=line,
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        "/profile", params={"url": f"{DATA_DIR}/cog.tif", "samples": 201}, json=line
+    )
+    assert response.status_code == 422
+
+    # samples count is checked before sampling the line
+    response = client.post(
+        "/profile", params={"url": f"{DATA_DIR}/cog.tif", "spacing": 1e-6}, json=line
+    )
+    assert response.status_code == 400
+    assert "Too many samples" in response.json()["detail"]
+
+    response = client.post(
+        "/profile",
+        params={"url": f"{DATA_DIR}/cog.tif"},
+        json={
+            "type": "Feature",
+            "properties": {},
+            "geometry": {"type": "Point", "coordinates": [-57, 73.5]},
+        },
+    )
+    assert response.status_code == 400
+
+
+def test_TilerFactory_archive():
+    """Serve pre-rendered tiles from a PMTiles archive."""
+    url = f"{DATA_DIR}/cog.tif"
+    archive = f"{DATA_DIR}/tiles.pmtiles"
+
+    cog = TilerFactory(
+        archive_dependency=ArchiveParams,
+        optional_headers=[OptionalHeader.server_timing],
+    )
+    app = FastAPI()
+    app.include_router(cog.router)
+
+    with TestClient(app) as client:
+        # tile in the archive (z0-2)
+        response = client.get(
+            "/tiles/WebMercatorQuad/2/1/0.png", params={"url": url, "archive": archive}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.content == b"2-1-0"
+        assert "archive" in response.headers["Server-Timing"]
+        assert "read" not in response.headers["Server-Timing"]
+
+        response = client.get(
+            "/tiles/WebMercatorQuad/2/1/0", params={"url": url, "archive": archive}
+        )
+        assert response.content == b"2-1-0"
+
+        # Fall through to dynamic rendering
+        # tile not in the archive
+        response = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.png",
+            params={"url": url, "archive": archive},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert "read" in response.headers["Server-Timing"]
+
+        # tile size, format or TMS do not match the archive
+        for path in [
+            "/tiles/WebMercatorQuad/2/1/0@2x.png",
+            "/tiles/WebMercatorQuad/2/1/0.jpeg",
+            "/tiles/WorldCRS84Quad/2/1/0.png",
+        ]:
+            response = client.get(path, params={"url": url, "archive": archive})
+            assert response.status_code == 200
+            assert response.content != b"2-1-0"
+
+        # no archive
+        response = client.get("/tiles/WebMercatorQuad/2/1/0.png", params={"url": url})
+        assert response.status_code == 200
+        assert response.content != b"2-1-0"
+
+        # rendering options
+        for params in [
+            {"rescale": "0,1000"},
+            {"colormap_name": "viridis"},
+            {"algorithm": "hillshade"},
+            {"expression": "b1*2"},
+        ]:
+            response = client.get(
+                "/tiles/WebMercatorQuad/2/1/0.png",
+                params={"url": url, "archive": archive, **params},
+            )
+            assert response.status_code == 200
+            assert response.content != b"2-1-0"
+
+        # invalid or missing archive
+        for path in [f"{DATA_DIR}/nothere.pmtiles", url]:
+            response = client.get(
+                "/tiles/WebMercatorQuad/2/1/0.png", params={"url": url, "archive": path}
+            )
+            assert response.status_code == 200
+            assert response.content != b"2-1-0"
+
+    cog = TilerFactory(archive_dependency=ArchiveParams, conditional_requests=True)
+    app = FastAPI()
+    app.include_router(cog.router)
+
+    with TestClient(app) as client:
+        # archive tiles ETag is computed from the tile content
+        response = client.get(
+            "/tiles/WebMercatorQuad/2/1/0.png", params={"url": url, "archive": archive}
+        )
+        assert response.content == b"2-1-0"
+        etag = response.headers["ETag"]
+        assert etag == f'"{hashlib.sha1(b"2-1-0").hexdigest()}"'
+        assert "Last-Modified" not in response.headers
+
+        response = client.get(
+            "/tiles/WebMercatorQuad/2/1/0.png",
+            params={"url": url, "archive": archive},
+            headers={"If-None-Match": etag},
+        )
+        assert response.status_code == 304
+
+
+def test_TilerFactory_stream_part():
+    """Large GeoTIFF outputs are written by strips and streamed."""
+    url = f"{DATA_DIR}/cog.tif"
+    feature = {
+        "type": "Feature",
+        "properties": {},
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [
+                [[-56.0, 72.8], [-55.0, 72.8], [-55.0, 73.1], [-56.0, 72.8]]
+            ],
+        },
+    }
+
+    responses = {}
+    for name, threshold in [("memory", None), ("stream", 100)]:
+        cog = TilerFactory(stream_threshold=threshold)
+        app = FastAPI()
+        app.include_router(cog.router)
+        with TestClient(app) as client:
+            responses[name] = [
+                client.get(
+                    "/bbox/-56.228,72.715,-54.547,73.188/300x200.tif",
+                    params={"url": url, "rescale": "0,1000"},
+                ),
+                client.post(
+                    "/feature/300x200.tif",
+                    params={"url": url, "dst_crs": "epsg:3857"},
+                    json=feature,
+                ),
+                client.get(
+                    "/bbox/-56.228,72.715,-54.547,73.188/300x200.tif",
+                    params={"url": url, "colormap_name": "viridis"},
+                ),
+            ]
+
+    for memory, stream in zip(responses["memory"], responses["stream"]):
+        assert memory.status_code == 200
+        assert stream.status_code == 200
+        assert stream.headers["content-type"] == "image/tiff; application=geotiff"
+        assert "content-length" not in stream.headers
+
+        with MemoryFile(memory.content) as mem, MemoryFile(stream.content) as smem:
+            with mem.open() as src, smem.open() as dst:
+                assert src.profile["count"] == dst.profile["count"]
+                assert src.crs == dst.crs
+                assert src.transform.almost_equals(dst.transform)
+                numpy.testing.assert_array_equal(src.read(), dst.read())
+
+
+def test_TilerFactory_cog_output():
+    """Cloud Optimized GeoTIFF outputs."""
+    url = f"{DATA_DIR}/cog.tif"
+
+    cog = TilerFactory(stream_threshold=1024 * 1024)
+    app = FastAPI()
+    app.include_router(cog.router)
+
+    with TestClient(app) as client:
+        for path, params in [
+            ("/preview.cog", {}),
+            ("/preview", {"format": "cog"}),
+            ("/bbox/-56.228,72.715,-54.547,73.188/800x600.cog", {}),
+            # streamed output (larger than `stream_threshold`)
+            ("/bbox/-56.228,72.715,-54.547,73.188/1300x1200.cog", {}),
+        ]:
+            response = client.get(path, params={"url": url, **params})
+            assert response.status_code == 200
+            assert (
+                response.headers["content-type"]
+                == "image/tiff; application=geotiff; profile=cloud-optimized"
+            )
+            with MemoryFile(response.content) as mem:
+                with mem.open() as dst:
+                    assert dst.tags(ns="IMAGE_STRUCTURE")["LAYOUT"] == "COG"
+                    assert dst.profile["compress"] == "deflate"
+                    assert dst.profile["tiled"]
+                    assert dst.overviews(1)
+                    assert dst.crs
+
+        feature = {
+            "type": "Feature",
+            "properties": {},
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [
+                    [[-56.0, 72.8], [-55.0, 72.8], [-55.0, 73.1], [-56.0, 72.8]]
+                ],
+            },
+        }
+        response = client.post("/feature.cog", params={"url": url}, json=feature)
+        assert response.status_code == 200
+        with MemoryFile(response.content) as mem:
+            with mem.open() as dst:
+                assert dst.tags(ns="IMAGE_STRUCTURE")["LAYOUT"] == "COG"
+
+
+def test_TilerFactory_bin_output():
+    """Binary array outputs."""
+    cog = TilerFactory()
+    app = FastAPI()
+    app.include_router(cog.router)
+
+    with TestClient(app) as client:
+        response = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.bin",
+            params={"url": f"{DATA_DIR}/cog.tif"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/octet-stream"
+        data, mask = decode_array(response.content)
+        assert data.shape == (1, 256, 256)
+        assert data.dtype == "uint16"
+        assert mask.shape == (256, 256)
+
+        npy = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.npy",
+            params={"url": f"{DATA_DIR}/cog.tif"},
+        )
+        arr = numpy.load(BytesIO(npy.content))
+        numpy.testing.assert_array_equal(data[0], arr[0])
+        numpy.testing.assert_array_equal(mask, arr[1])
+
+        response = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.bin",
+            params={"url": f"{DATA_DIR}/cog.tif", "compression": "zlib"},
+        )
+        assert response.status_code == 200
+        assert len(response.content) < len(npy.content)
+        compressed, _ = decode_array(response.content)
+        numpy.testing.assert_array_equal(compressed, data)
+
+        response = client.get(
+            "/bbox/-56.228,72.715,-54.547,73.188/100x100.bin",
+            params={"url": f"{DATA_DIR}/cog.tif", "compression": "zlib"},
+        )
+        assert response.status_code == 200
+        data, _ = decode_array(response.content)
+        assert data.shape == (1, 100, 100)
+
+
+def test_TilerFactory_algorithm_halo():
+    """Reads are expanded for neighborhood algorithms."""
+    url = f"{DATA_DIR}/cog.tif"
+    cog = TilerFactory(stream_threshold=100 * 100)
+    app = FastAPI()
+    app.include_router(cog.router)
+
+    with TestClient(app) as client:
+        response = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.npy",
+            params={"url": url, "algorithm": "hillshade"},
+        )
+        assert response.status_code == 200
+        arr = numpy.load(BytesIO(response.content))
+        assert arr.shape == (2, 256, 256)
+
+        # Same as explicitly requesting a buffer
+        response = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.npy",
+            params={"url": url, "algorithm": "hillshade", "buffer": 3},
+        )
+        numpy.testing.assert_array_equal(numpy.load(BytesIO(response.content)), arr)
+
+        # Larger buffers are kept
+        response = client.get(
+            "/tiles/WebMercatorQuad/8/87/48.npy",
+            params={"url": url, "algorithm": "hillshade", "buffer": 10},
+        )
+        assert numpy.load(BytesIO(response.content)).shape == (2, 270, 270)
+
+        # in memory and streamed outputs
+        for size in ["80x80", "200x150"]:
+            response = client.get(
+                f"/bbox/-56.228,72.715,-54.547,73.188/{size}.tif",
+                params={"url": url, "algorithm": "hillshade"},
+            )
+            assert response.status_code == 200
+            with MemoryFile(response.content) as mem:
+                with mem.open() as dst:
+                    assert f"{dst.width}x{dst.height}" == size
@@ -0,0 +1,103 @@
+"""Test titiler.core.metrics."""
+
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+from starlette.testclient import TestClient
+
+from titiler.core.factory import TilerFactory
+from titiler.core.metrics import MetricsMiddleware, metrics_endpoint
+
+from .conftest import DATA_DIR
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_metrics_middleware():
+    """Test metrics collection."""
+    app = FastAPI()
+    cog = TilerFactory(router_prefix="/cog", conditional_requests=True)
+    app.include_router(cog.router, prefix="/cog")
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_endpoint, include_in_schema=False)
+    client = TestClient(app)
+
+    route = "/cog/tiles/{tileMatrixSetId}/{z}/{x}/{y}.{format}"
+    labels = {"method": "GET", "route": route}
+    requests = _sample("titiler_request_duration_seconds_count", status="200", **labels)
+    sizes = _sample("titiler_response_size_bytes_sum", **labels)
+    opens = _sample("titiler_reader_open_total", route=route)
+    reads = _sample("titiler_stage_duration_seconds_count", route=route, stage="read")
+    misses = _sample("titiler_cache_requests_total", route=route, result="miss")
+    hits = _sample("titiler_cache_requests_total", route=route, result="hit")
+
+    response = client.get(
+        "/cog/tiles/WebMercatorQuad/8/87/48.png",
+        params={"url": f"{DATA_DIR}/cog.tif", "rescale": "0,1000"},
+    )
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    assert (
+        _sample("titiler_request_duration_seconds_count", status="200", **labels)
+        == requests + 1
+    )
+    assert _sample("titiler_response_size_bytes_sum", **labels) == sizes + len(
+        response.content
+    )
+    assert _sample("titiler_reader_open_total", route=route) == opens + 1
+    assert (
+        _sample("titiler_stage_duration_seconds_count", route=route, stage="read")
+        == reads + 1
+    )
+    assert (
+        _sample("titiler_cache_requests_total", route=route, result="miss")
+        == misses + 1
+    )
+
+    response = client.get(
+        "/cog/tiles/WebMercatorQuad/8/87/48.png",
+        params={"url": f"{DATA_DIR}/cog.tif", "rescale": "0,1000"},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+    assert (
+        _sample("titiler_cache_requests_total", route=route, result="hit") == hits + 1
+    )
+    # no dataset opened for 304 responses
+    assert _sample("titiler_reader_open_total", route=route) == opens + 1
+
+    # endpoints without processing timings also count opened readers
+    info_route = "/cog/info"
+    info_opens = _sample("titiler_reader_open_total", route=info_route)
+    response = client.get("/cog/info", params={"url": f"{DATA_DIR}/cog.tif"})
+    assert response.status_code == 200
+    assert _sample("titiler_reader_open_total", route=info_route) == info_opens + 1
+
+    # unknown routes are grouped together
+    unmatched = _sample(
+        "titiler_request_duration_seconds_count",
+        method="GET",
+        route="unmatched",
+        status="404",
+    )
+    response = client.get("/something/that/does/not/exist")
+    assert response.status_code == 404
+    assert (
+        _sample(
+            "titiler_request_duration_seconds_count",
+            method="GET",
+            route="unmatched",
+            status="404",
+        )
+        == unmatched + 1
+    )
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "titiler_request_duration_seconds_bucket" in response.text
+    assert "titiler_threadpool_tokens" in response.text
+    assert _sample("titiler_threadpool_tokens") > 0
+    assert REGISTRY.get_sample_value("titiler_threadpool_tokens_in_use") is not None
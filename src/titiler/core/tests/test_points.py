@@ -0,0 +1,64 @@
+"""Test titiler.core.points."""
+
+from unittest.mock import patch
+
+import numpy
+import pytest
+from rio_tiler.io import Reader, STACReader
+
+from titiler.core.errors import BadRequestError
+from titiler.core.points import read_points, sample_line
+
+from .conftest import DATA_DIR, mock_rasterio_open
+
+
+def test_read_points():
+    """Test read_points against the reader's point method."""
+    rng = numpy.random.default_rng(0)
+    with Reader(f"{DATA_DIR}/cog.tif") as src:
+        minx, miny, maxx, maxy = src.get_geographic_bounds("epsg:4326")
+        coordinates = list(
+            zip(rng.uniform(minx - 1, maxx, 200), rng.uniform(miny, maxy + 1, 200))
+        )
+        pts = read_points(src, coordinates, nodata=1)
+        assert pts.values.shape == (1, 200)
+        assert pts.band_names == ["b1"]
+        assert pts.outside.any()
+
+        for i, (lon, lat) in enumerate(coordinates):
+            if pts.outside[i]:
+                assert pts.values.mask[:, i].all()
+                continue
+
+            expected = src.point(lon, lat, nodata=1).array
+            assert pts.values[:, i].tolist() == expected.tolist()
+
+    # non-rasterio readers read points one by one
+    with patch("rio_tiler.io.rasterio.rasterio") as rio:
+        rio.open = mock_rasterio_open
+        with STACReader(f"{DATA_DIR}/item.json") as src:
+            pts = read_points(src, [(23.5, 32.0), (0, 0)], assets=["B01"])
+            assert pts.band_names == ["B01_b1"]
+            assert pts.outside.tolist() == [False, True]
+            assert pts.values.mask.tolist() == [[False, True]]
+
+
+def test_sample_line():
+    """Test sample_line."""
+    coordinates, distances = sample_line(
+        [[0, 0], [3, 4], [3, 4], [3, 8]], samples=4, geographic=False
+    )
+    assert numpy.allclose(coordinates, [[0, 0], [1.8, 2.4], [3, 5], [3, 8]])
+    assert numpy.allclose(distances, [0, 3, 6, 9])
+
+    coordinates, distances = sample_line([[0, 0], [3, 4]], spacing=2, geographic=False)
+    assert distances.tolist() == [0, 2, 4, 5]
+    assert coordinates[-1].tolist() == [3, 4]
+
+    # great-circle distances in meters
+    _, distances = sample_line([[0, 0], [1, 0]], samples=2)
+    assert round(distances[-1]) == 111195
+
+    # samples count is checked before sampling the line
+    with pytest.raises(BadRequestError):
+        sample_line([[0, 0], [1, 0]], spacing=1e-6, max_samples=10000)
@@ -0,0 +1,177 @@
+"""Test titiler.core.middleware.ProfilerMiddleware."""
+
+import json
+import os
+import sys
+import threading
+import time
+
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from titiler.core.middleware import (
+    ProfilerMiddleware,
+    _profile_session,
+    _ProfileSession,
+    profile_thread,
+)
+from titiler.core.routing import add_route_profiling
+
+
+def slow_function():
+    """Do nothing, slowly."""
+    time.sleep(0.1)
+
+
+def other_function(event):
+    """Do nothing, until the event is set."""
+    event.wait()
+
+
+def test_profiler_middleware(tmp_path):
+    """Create App."""
+    app = FastAPI()
+
+    @app.get("/slow/{value}")
+    def slow(value: str):
+        """slow."""
+        slow_function()
+        return value
+
+    @app.get("/fast")
+    def fast():
+        """fast."""
+        return "yo"
+
+    add_route_profiling(app.routes)
+    app.add_middleware(
+        ProfilerMiddleware,
+        output_dir=str(tmp_path),
+        threshold=0.05,
+        sample_rate=1,
+        interval=0.002,
+    )
+
+    with TestClient(app) as client:
+        response = client.get("/fast")
+        assert response.status_code == 200
+        assert not os.listdir(tmp_path)
+
+        response = client.get("/slow/yo", params={"a": "b"})
+        assert response.status_code == 200
+
+    files = os.listdir(tmp_path)
+    assert len(files) == 1
+    assert "-slow-" in files[0]
+    assert files[0].endswith(".speedscope.json")
+
+    with open(tmp_path / files[0]) as f:
+        profile = json.load(f)
+
+    assert profile["name"].startswith("GET /slow/{value}?a=b")
+    assert profile["profiles"]
+    assert "slow_function" in [frame["name"] for frame in profile["shared"]["frames"]]
+    for p in profile["profiles"]:
+        assert p["type"] == "sampled"
+        assert len(p["samples"]) == len(p["weights"])
+
+
+def test_profiler_middleware_options(tmp_path):
+    """Test sample rate and collapsed output."""
+    app = FastAPI()
+
+    @app.get("/slow")
+    def slow():
+        """slow."""
+        slow_function()
+        return "yo"
+
+    add_route_profiling(app.routes)
+    app.add_middleware(
+        ProfilerMiddleware,
+        output_dir=str(tmp_path),
+        threshold=0.05,
+        sample_rate=2,
+        interval=0.002,
+        output_format="collapsed",
+    )
+
+    with TestClient(app) as client:
+        for _ in range(4):
+            response = client.get("/slow")
+            assert response.status_code == 200
+
+    files = sorted(os.listdir(tmp_path))
+    assert len(files) == 2
+    assert all(f.endswith(".txt") for f in files)
+
+    with open(tmp_path / files[0]) as f:
+        lines = f.read().splitlines()
+
+    assert all(line.startswith("GET /slow;") for line in lines)
+    assert any("slow_function (test_profiler_middleware.py" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_profiler_middleware_threads(tmp_path):
+    """Only sample the threads processing the profiled request."""
+    app = FastAPI()
+
+    @app.get("/slow")
+    def slow():
+        """slow."""
+        slow_function()
+        return "yo"
+
+    add_route_profiling(app.routes)
+    app.add_middleware(
+        ProfilerMiddleware,
+        output_dir=str(tmp_path),
+        threshold=0.05,
+        sample_rate=1,
+        interval=0.002,
+        max_samples=20,
+    )
+
+    event = threading.Event()
+    thread = threading.Thread(target=other_function, args=(event,))
+    thread.start()
+    try:
+        with TestClient(app) as client:
+            response = client.get("/slow")
+            assert response.status_code == 200
+    finally:
+        event.set()
+        thread.join()
+
+    files = os.listdir(tmp_path)
+    assert len(files) == 1
+
+    with open(tmp_path / files[0]) as f:
+        profile = json.load(f)
+
+    names = [frame["name"] for frame in profile["shared"]["frames"]]
+    assert "slow_function" in names
+    assert "other_function" not in names
+    assert sum(len(p["samples"]) for p in profile["profiles"]) <= 20
+
+
+def test_profile_thread():
+    """Register the current thread with the profiled request."""
+    ident = threading.get_ident()
+
+    # no profiled request
+    with profile_thread():
+        pass
+
+    session = _ProfileSession(sys._getframe(), 10)
+    token = _profile_session.set(session)
+    try:
+        with profile_thread():
+            assert session.threads == {ident}
+            with profile_thread():
+                assert session.threads == {ident}
+            assert session.threads == {ident}
+        assert not session.threads
+    finally:
+        _profile_session.reset(token)
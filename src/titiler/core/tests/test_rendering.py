@@ -1,15 +1,21 @@
 """test titiler rendering function."""
 
+import os
 import warnings
 
 import numpy
 import pytest
+from rasterio.crs import CRS
 from rasterio.io import MemoryFile
 from rio_tiler.errors import InvalidDatatypeWarning
+from rio_tiler.io import Reader
 from rio_tiler.models import ImageData
 
-from titiler.core.resources.enums import ImageType
-from titiler.core.utils import render_image
+from titiler.core.arrays import decode_array
+from titiler.core.resources.enums import ArrayCompression, ImageType
+from titiler.core.utils import read_part_strips, render_geotiff, render_image
+
+from .conftest import DATA_DIR
 
 
 def test_rendering():
@@ -103,3 +109,96 @@ def test_rendering():
             assert dst.read()[:, 0, 0].tolist() == [100, 100, 100, 50]
             assert dst.read()[:, 11, 11].tolist() == [255, 255, 255, 255]
             assert dst.read()[:, 30, 30].tolist() == [0, 0, 0, 0]
+
+
+def test_render_geotiff_strips():
+    """Read and write GeoTIFF by strips."""
+    bbox = [-56.228, 72.715, -54.547, 73.188]
+    with Reader(os.path.join(DATA_DIR, "cog.tif")) as src:
+        image = src.part(bbox, width=301, height=203, dst_crs=CRS.from_epsg(3857))
+
+        strips = list(
+            read_part_strips(
+                src,
+                bbox,
+                width=301,
+                height=203,
+                bounds_crs=CRS.from_epsg(4326),
+                dst_crs=CRS.from_epsg(3857),
+                max_pixels=301 * 50,
+            )
+        )
+        assert [s.height for s in strips] == [50, 50, 50, 50, 3]
+        assert all(s.width == 301 for s in strips)
+
+        output = render_geotiff(iter(strips), width=301, height=203)
+
+    with output:
+        with MemoryFile(output.read()) as mem:
+            with mem.open() as dst:
+                assert dst.count == 2
+                assert dst.crs == CRS.from_epsg(3857)
+                assert dst.transform.almost_equals(image.transform)
+                numpy.testing.assert_array_equal(dst.read(1), image.data[0])
+                numpy.testing.assert_array_equal(dst.read(2), image.mask)
+
+    # pixels outside the shape are masked
+    shape = {
+        "type": "Polygon",
+        "coordinates": [[[-56.0, 72.8], [-55.0, 72.8], [-55.0, 73.1], [-56.0, 72.8]]],
+    }
+    with Reader(os.path.join(DATA_DIR, "cog.tif")) as src:
+        image = src.feature(shape, width=100, height=80)
+        strips = list(
+            read_part_strips(
+                src,
+                [-56.0, 72.8, -55.0, 73.1],
+                width=100,
+                height=80,
+                bounds_crs=CRS.from_epsg(4326),
+                shape=shape,
+                max_pixels=1000,
+            )
+        )
+        assert len(strips) == 8
+
+    numpy.testing.assert_array_equal(
+        numpy.concatenate([s.mask for s in strips]), image.mask
+    )
+    assert not image.mask.all()
+
+
+def test_rendering_bin():
+    """Render binary array."""
+    data = numpy.ma.MaskedArray(
+        numpy.arange(2 * 256 * 256, dtype="float32").reshape((2, 256, 256)),
+        mask=False,
+    )
+    data.mask[:, 0:10, 0:10] = True
+    im = ImageData(data)
+
+    content, media = render_image(im, output_format=ImageType.bin)
+    assert media == "application/octet-stream"
+    arr, mask = decode_array(content)
+    assert arr.dtype == "float32"
+    numpy.testing.assert_array_equal(arr, im.data)
+    numpy.testing.assert_array_equal(mask, im.mask)
+
+    content, _ = render_image(
+        im,
+        output_format=ImageType.bin,
+        add_mask=False,
+        compression=ArrayCompression.zlib,
+    )
+    arr, mask = decode_array(content)
+    numpy.testing.assert_array_equal(arr, im.data)
+    assert mask is None
+
+    # with colormap
+    im = ImageData(numpy.zeros((1, 256, 256), dtype="uint8"))
+    content, _ = render_image(
+        im, output_format=ImageType.bin, colormap={0: (255, 0, 0, 255)}
+    )
+    arr, mask = decode_array(content)
+    assert arr.shape == (3, 256, 256)
+    assert arr[0].all()
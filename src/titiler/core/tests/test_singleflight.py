@@ -0,0 +1,74 @@
+"""Test titiler.core.singleflight."""
+
+import asyncio
+import threading
+
+import anyio.to_thread
+import pytest
+
+from titiler.core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_SingleFlight():
+    """Test SingleFlight."""
+    flights = SingleFlight()
+    event = threading.Event()
+    calls = []
+
+    def _fail():
+        calls.append(1)
+        event.wait(1)
+        raise ValueError("nope")
+
+    async def _call():
+        try:
+            await flights.do("key", _fail)
+        except ValueError as e:
+            return str(e)
+
+    tasks = [asyncio.ensure_future(_call()) for _ in range(3)]
+    await asyncio.sleep(0.1)
+    event.set()
+
+    # errors are shared too
+    assert await asyncio.gather(*tasks) == ["nope", "nope", "nope"]
+    assert len(calls) == 1
+
+    assert await flights.do("key", lambda: 1) == (1, False)
+    assert await flights.do("other", lambda: 2) == (2, False)
+    assert not flights._flights
+
+
+@pytest.mark.asyncio
+async def test_SingleFlight_threadpool():
+    """Waiting calls do not hold threadpool workers."""
+    flights = SingleFlight()
+    event = threading.Event()
+    calls = []
+
+    def _slow():
+        calls.append(1)
+        event.wait(5)
+        return "slow"
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    total_tokens = limiter.total_tokens
+    limiter.total_tokens = 2
+    try:
+        tasks = [asyncio.ensure_future(flights.do("slow", _slow)) for _ in range(10)]
+        await asyncio.sleep(0.1)
+
+        # One worker is left for other calls
+        assert await asyncio.wait_for(flights.do("other", lambda: 1), 1) == (1, False)
+
+        # Cancelling a waiting call does not cancel the in-flight call
+        tasks[0].cancel()
+        event.set()
+        results = await asyncio.gather(*tasks[1:])
+    finally:
+        limiter.total_tokens = total_tokens
+
+    assert len(calls) == 1
+    assert results == [("slow", True)] * 9
+    assert not flights._flights
@@ -1,8 +1,12 @@
 """titiler.core.algorithm."""
 
+import importlib
+import itertools
 import json
 from copy import copy
-from typing import Dict, List, Literal, Optional, Type
+from functools import lru_cache
+from importlib import metadata as importlib_metadata
+from typing import Dict, Iterable, List, Literal, Optional, Type, Union
 
 import attr
 from fastapi import HTTPException, Query
@@ -10,12 +14,28 @@ from pydantic import ValidationError
 from typing_extensions import Annotated
 
 from titiler.core.algorithm.base import AlgorithmMetadata  # noqa
-from titiler.core.algorithm.base import BaseAlgorithm
-from titiler.core.algorithm.dem import Contours, HillShade, TerrainRGB, Terrarium
+from titiler.core.algorithm.base import (  # noqa
+    BaseAlgorithm,
+    ElementwiseAlgorithm,
+    with_halo,
+)
+from titiler.core.algorithm.dem import (
+    Aspect,
+    Contours,
+    HillShade,
+    MultiHillShade,
+    Slope,
+    TerrainRGB,
+    Terrarium,
+)
 from titiler.core.algorithm.index import NormalizedIndex
+from titiler.core.algorithm.pipeline import AlgorithmPipeline  # noqa
 
 default_algorithms: Dict[str, Type[BaseAlgorithm]] = {
     "hillshade": HillShade,
+    "multiHillshade": MultiHillShade,
+    "slope": Slope,
+    "aspect": Aspect,
     "contours": Contours,
     "normalizedIndex": NormalizedIndex,
     "terrarium": Terrarium,
@@ -23,18 +43,68 @@ default_algorithms: Dict[str, Type[BaseAlgorithm]] = {
 }
 
 
+ALGORITHMS_ENTRY_POINT = "titiler.algorithms"
+
+# Algorithm class or its import path (`module:attribute`), imported on first use
+AlgorithmType = Union[Type[BaseAlgorithm], str]
+
+
+@lru_cache(maxsize=None)
+def load_algorithm(path: str) -> Type[BaseAlgorithm]:
+    """Import algorithm class from its `module:attribute` path."""
+    module, _, attribute = path.partition(":")
+    algorithm = importlib.import_module(module)
+    for name in attribute.split(".") if attribute else []:
+        algorithm = getattr(algorithm, name)
+
+    if not (isinstance(algorithm, type) and issubclass(algorithm, BaseAlgorithm)):
+        raise TypeError(f"`{path}` is not a BaseAlgorithm subclass")
+
+    return algorithm
+
+
+def entry_point_algorithms(group: str = ALGORITHMS_ENTRY_POINT) -> Dict[str, str]:
+    """Algorithms registered by installed packages entry points (not imported).
+
+    ```toml
+    [project.entry-points."titiler.algorithms"]
+    flood = "my_package.algorithms:FloodMapping"
+    ```
+
+    """
+    entry_points = importlib_metadata.entry_points()
+
+    selected: Iterable[importlib_metadata.EntryPoint]
+    if hasattr(entry_points, "select"):
+        selected = entry_points.select(group=group)
+    else:  # pragma: nocover (python < 3.10, dict of entry points by group)
+        groups: Dict[str, List[importlib_metadata.EntryPoint]] = entry_points  # type: ignore
+        selected = groups.get(group, [])
+
+    return {entry_point.name: entry_point.value for entry_point in selected}
+
+
 @attr.s(frozen=True)
 class Algorithms:
-    """Algorithms."""
+    """Algorithms.
+
+    Algorithms can be registered as classes or as import paths (`module:attribute`),
+    which are only imported when the algorithm is first used.
 
-    data: Dict[str, Type[BaseAlgorithm]] = attr.ib()
+    """
 
-    def get(self, name: str) -> BaseAlgorithm:
-        """Fetch a TMS."""
+    data: Dict[str, AlgorithmType] = attr.ib()
+
+    def get(self, name: str) -> Type[BaseAlgorithm]:
+        """Fetch an Algorithm (imported on first use)."""
         if name not in self.data:
             raise KeyError(f"Invalid name: {name}")
 
-        return self.data[name]
+        algorithm = self.data[name]
+        if isinstance(algorithm, str):
+            return load_algorithm(algorithm)
+
+        return algorithm
 
     def list(self) -> List[str]:
         """List registered Algorithm."""
@@ -42,7 +112,7 @@ class Algorithms:
 
     def register(
         self,
-        algorithms: Dict[str, BaseAlgorithm],
+        algorithms: Dict[str, AlgorithmType],
         overwrite: bool = False,
     ) -> "Algorithms":
         """Register Algorithm(s)."""
@@ -58,26 +128,53 @@ class Algorithms:
 
         def post_process(
             algorithm: Annotated[
-                Literal[tuple(self.data.keys())],
-                Query(description="Algorithm name"),
+                Optional[List[Literal[tuple(self.data.keys())]]],
+                Query(
+                    description="Algorithm name. Repeat the parameter to apply a pipeline of algorithms (in order)."
+                ),
             ] = None,
             algorithm_params: Annotated[
-                Optional[str],
-                Query(description="Algorithm parameter"),
+                Optional[List[str]],
+                Query(
+                    description="Algorithm parameter. When using a pipeline, one parameter per algorithm (in order)."
+                ),
             ] = None,
         ) -> Optional[BaseAlgorithm]:
             """Data Post-Processing options."""
-            kwargs = json.loads(algorithm_params) if algorithm_params else {}
-            if algorithm:
-                try:
-                    return self.get(algorithm)(**kwargs)
+            if not algorithm:
+                return None
+
+            params = algorithm_params or []
+            if params and len(params) != len(algorithm):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Expected {len(algorithm)} `algorithm_params`, got {len(params)}",
+                )
+
+            try:
+                steps = [
+                    self.get(name)(**(json.loads(p) if p else {}))
+                    for name, p in itertools.zip_longest(algorithm, params)
+                ]
+                if len(steps) == 1:
+                    return steps[0]
 
-                except ValidationError as e:
-                    raise HTTPException(status_code=400, detail=str(e)) from e
+                return AlgorithmPipeline(steps=steps)
 
-            return None
+            except ValidationError as e:
+                raise HTTPException(status_code=400, detail=str(e)) from e
 
         return post_process
 
 
-algorithms = Algorithms(copy(default_algorithms))  # noqa
+# Default algorithms and algorithms from installed plugins (`titiler.algorithms` entry points)
+algorithms = Algorithms(  # noqa
+    {
+        **copy(default_algorithms),
+        **{
+            name: path
+            for name, path in entry_point_algorithms().items()
+            if name not in default_algorithms
+        },
+    }
+)
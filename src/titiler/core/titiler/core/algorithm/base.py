@@ -1,11 +1,14 @@
 """Algorithm base class."""
 
 import abc
-from typing import Dict, Optional, Sequence
+from typing import Any, Dict, List, Optional, Sequence
 
+import numpy
 from pydantic import BaseModel
 from rio_tiler.models import ImageData
 
+from titiler.core.errors import BadRequestError
+
 
 class BaseAlgorithm(BaseModel, metaclass=abc.ABCMeta):
     """Algorithm baseclass.
@@ -23,12 +26,77 @@ class BaseAlgorithm(BaseModel, metaclass=abc.ABCMeta):
 
     model_config = {"extra": "allow"}
 
+    def check_input(self, img: ImageData) -> None:
+        """Raise a `BadRequestError` if the image doesn't have `input_nbands` bands."""
+        if self.input_nbands is not None and img.count != self.input_nbands:
+            raise BadRequestError(
+                f"`{type(self).__name__}` expects {self.input_nbands} band(s), got {img.count}"
+            )
+
+    @property
+    def halo(self) -> int:
+        """Number of pixels needed on each side of the output (cropped by the algorithm)."""
+        return 0
+
     @abc.abstractmethod
     def __call__(self, img: ImageData) -> ImageData:
         """Apply algorithm"""
         ...
 
 
+class ElementwiseAlgorithm(BaseAlgorithm):
+    """Per-pixel algorithm baseclass.
+
+    Elementwise algorithms only implement `apply` on the (count, height, width) data
+    array. Each output pixel must only depend on the input pixel at the same location,
+    so consecutive elementwise algorithms can be fused in a pipeline
+    (see `titiler.core.algorithm.pipeline.AlgorithmPipeline`).
+
+    """
+
+    @abc.abstractmethod
+    def apply(self, data: numpy.ma.MaskedArray) -> numpy.ma.MaskedArray:
+        """Apply algorithm to a masked data array."""
+        ...
+
+    def output_band_names(self, band_names: List[str]) -> Optional[List[str]]:
+        """Output band names (`None` for default names)."""
+        return None
+
+    def __call__(self, img: ImageData) -> ImageData:
+        """Apply algorithm"""
+        self.check_input(img)
+
+        kwargs: Dict[str, Any] = {}
+        if band_names := self.output_band_names(img.band_names or []):
+            kwargs["band_names"] = band_names
+
+        return ImageData(
+            self.apply(img.array),
+            assets=img.assets,
+            crs=img.crs,
+            bounds=img.bounds,
+            **kwargs,
+        )
+
+
+def with_halo(
+    options: Dict[str, Any], algorithm: Optional[BaseAlgorithm] = None
+) -> Dict[str, Any]:
+    """Expand the `buffer` read option to cover the algorithm's halo.
+
+    Neighborhood algorithms (e.g `hillshade`) crop `halo` pixels on each side of their
+    output, so the data has to be read with (at least) a `halo` pixels buffer.
+
+    """
+    # custom `post_process` functions have no halo
+    halo = getattr(algorithm, "halo", 0)
+    if halo and (options.get("buffer") or 0) < halo:
+        return {**options, "buffer": halo}
+
+    return options
+
+
 class AlgorithmMetadata(BaseModel):
     """Algorithm metadata."""
 
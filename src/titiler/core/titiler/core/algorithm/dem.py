@@ -1,67 +1,302 @@
 """titiler.core.algorithm DEM."""
 
+import math
+from typing import Literal, Optional, Sequence, Tuple
+
 import numpy
 from pydantic import Field
 from rasterio import windows
 from rio_tiler.colormap import apply_cmap, cmap
+from rio_tiler.constants import WEB_MERCATOR_CRS
 from rio_tiler.models import ImageData
 from rio_tiler.utils import linear_rescale
 
-from titiler.core.algorithm.base import BaseAlgorithm
+from titiler.core.algorithm.base import BaseAlgorithm, ElementwiseAlgorithm
+from titiler.core.algorithm.expression import evaluate
 
+EARTH_RADIUS = 6378137.0
+METERS_PER_DEGREE = 2 * math.pi * EARTH_RADIUS / 360.0
 
-class HillShade(BaseAlgorithm):
-    """Hillshade."""
 
-    title: str = "Hillshade"
-    description: str = "Create hillshade from DEM dataset."
+def cellsize(img: ImageData) -> Tuple[float, float]:
+    """Pixel size (x, y) in meters.
+
+    Geographic and Web Mercator pixel sizes are converted to ground distance at the
+    image center. Without CRS or bounds, pixel size is 1.
+
+    """
+    if img.crs is None or img.bounds is None:
+        return 1.0, 1.0
+
+    xres, yres = abs(img.transform.a), abs(img.transform.e)
+    if img.crs.is_geographic:
+        lat = math.radians((img.bounds[1] + img.bounds[3]) / 2)
+        return (
+            xres * METERS_PER_DEGREE * math.cos(lat),
+            yres * METERS_PER_DEGREE,
+        )
+
+    if img.crs == WEB_MERCATOR_CRS:
+        # Web Mercator scale factor is 1 / cos(lat)
+        y = (img.bounds[1] + img.bounds[3]) / 2
+        scale = math.cos(math.atan(math.sinh(y / EARTH_RADIUS)))
+        return xres * scale, yres * scale
+
+    return xres, yres
+
+
+class DEMAlgorithm(BaseAlgorithm):
+    """DEM (neighborhood) algorithm baseclass.
+
+    Elevation gradients are computed with central differences (float32), scaled by the
+    pixel size (see `cellsize`) and `z_factor`. Outputs are cropped by `buffer` pixels.
+
+    """
 
     # parameters
-    azimuth: int = Field(45, ge=0, le=360)
-    angle_altitude: float = Field(45.0, ge=-90.0, le=90.0)
     buffer: int = Field(3, ge=0, le=99)
+    z_factor: float = Field(1.0, gt=0.0, le=99999.0)
 
     # metadata
     input_nbands: int = 1
     output_nbands: int = 1
-    output_dtype: str = "uint8"
 
-    def __call__(self, img: ImageData) -> ImageData:
-        """Create hillshade from DEM dataset."""
-        x, y = numpy.gradient(img.array[0])
-        slope = numpy.pi / 2.0 - numpy.arctan(numpy.sqrt(x * x + y * y))
-        aspect = numpy.arctan2(-x, y)
-        azimuth = 360.0 - self.azimuth
-        azimuthrad = azimuth * numpy.pi / 180.0
-        altituderad = self.angle_altitude * numpy.pi / 180.0
-        shaded = numpy.sin(altituderad) * numpy.sin(slope) + numpy.cos(
-            altituderad
-        ) * numpy.cos(slope) * numpy.cos(azimuthrad - aspect)
-        data = 255 * (shaded + 1) / 2
-        data[data < 0] = 0  # set hillshade values to min of 0.
+    @property
+    def halo(self) -> int:
+        """Output is cropped by `buffer` pixels."""
+        return self.buffer
+
+    def gradient(
+        self, img: ImageData
+    ) -> Tuple[numpy.ndarray, numpy.ndarray, Optional[numpy.ndarray]]:
+        """Elevation gradients along rows (southward) and columns (eastward).
+
+        Gradients and mask are computed for the output (cropped) window only. A pixel is
+        masked when itself or one of its 4 neighbors is masked.
+
+        """
+        self.check_input(img)
+
+        data = img.array[0]
+        z = numpy.ma.getdata(data)
+        mask = numpy.ma.getmask(data)
+
+        buffer = self.buffer
+        if not buffer:
+            z = numpy.pad(z, 1, mode="edge")
+            if mask is not numpy.ma.nomask:
+                mask = numpy.pad(mask, 1, mode="edge")
+            buffer = 1
+
+        shape: Tuple[int, ...] = z.shape
+        height, width = shape
+        rows = slice(buffer, height - buffer)
+        cols = slice(buffer, width - buffer)
+        north = (slice(buffer - 1, height - buffer - 1), cols)
+        south = (slice(buffer + 1, height - buffer + 1), cols)
+        west = (rows, slice(buffer - 1, width - buffer - 1))
+        east = (rows, slice(buffer + 1, width - buffer + 1))
+
+        xres, yres = cellsize(img)
+        x = evaluate(
+            "(s - n) * k",
+            dtype="float32",
+            s=z[south],
+            n=z[north],
+            k=numpy.float32(self.z_factor / (2 * yres)),
+        )
+        y = evaluate(
+            "(e - w) * k",
+            dtype="float32",
+            e=z[east],
+            w=z[west],
+            k=numpy.float32(self.z_factor / (2 * xres)),
+        )
 
+        out_mask = None
+        if mask is not numpy.ma.nomask and mask.any():
+            out_mask = evaluate(
+                "c | n | s | e | w",
+                c=mask[rows, cols],
+                n=mask[north],
+                s=mask[south],
+                e=mask[east],
+                w=mask[west],
+            )
+
+        return x, y, out_mask
+
+    def output(
+        self,
+        img: ImageData,
+        data: numpy.ndarray,
+        mask: Optional[numpy.ndarray],
+        band_name: str,
+    ) -> ImageData:
+        """Create output ImageData (cropped by `buffer` pixels)."""
         bounds = img.bounds
         if self.buffer:
-            data = data[self.buffer : -self.buffer, self.buffer : -self.buffer]
-
             window = windows.Window(
                 col_off=self.buffer,
                 row_off=self.buffer,
-                width=data.shape[1],
-                height=data.shape[0],
+                width=numpy.shape(data)[1],
+                height=numpy.shape(data)[0],
             )
             bounds = windows.bounds(window, img.transform)
 
+        if mask is None:
+            mask = numpy.zeros(data.shape, dtype="bool")
+
         return ImageData(
-            data.astype(self.output_dtype),
+            numpy.ma.MaskedArray(data[numpy.newaxis], mask=mask[numpy.newaxis]),
             assets=img.assets,
             crs=img.crs,
             bounds=bounds,
-            band_names=["hillshade"],
+            band_names=[band_name],
+        )
+
+
+class HillShade(DEMAlgorithm):
+    """Hillshade."""
+
+    title: str = "Hillshade"
+    description: str = "Create hillshade from DEM dataset."
+
+    # parameters
+    azimuth: int = Field(45, ge=0, le=360)
+    angle_altitude: float = Field(45.0, ge=-90.0, le=90.0)
+
+    # metadata
+    output_dtype: str = "uint8"
+
+    def __call__(self, img: ImageData) -> ImageData:
+        """Create hillshade from DEM dataset."""
+        x, y, mask = self.gradient(img)
+        azimuth = math.radians(360.0 - self.azimuth)
+        altitude = math.radians(self.angle_altitude)
+
+        # sin(slope) * sin(altitude) + cos(slope) * cos(altitude) * cos(azimuth - aspect)
+        # with slope = pi / 2 - arctan(sqrt(x² + y²)) and aspect = arctan2(-x, y)
+        data = evaluate(
+            "255 * ((a + b * y - c * x) / sqrt(1 + x * x + y * y) + 1) / 2",
+            dtype=self.output_dtype,
+            x=x,
+            y=y,
+            a=numpy.float32(math.sin(altitude)),
+            b=numpy.float32(math.cos(altitude) * math.cos(azimuth)),
+            c=numpy.float32(math.cos(altitude) * math.sin(azimuth)),
+        )
+
+        return self.output(img, data, mask, "hillshade")
+
+
+class MultiHillShade(DEMAlgorithm):
+    """Multidirectional Hillshade.
+
+    Combination of hillshades illuminated from 225, 270, 315 and 360 degrees azimuths,
+    weighted by the alignment of the slope aspect with each light direction.
+
+    """
+
+    title: str = "Multidirectional Hillshade"
+    description: str = "Create multidirectional hillshade from DEM dataset."
+
+    # parameters
+    angle_altitude: float = Field(45.0, ge=-90.0, le=90.0)
+
+    # metadata
+    output_dtype: str = "uint8"
+
+    def __call__(self, img: ImageData) -> ImageData:
+        """Create multidirectional hillshade from DEM dataset."""
+        x, y, mask = self.gradient(img)
+        altitude = math.radians(self.angle_altitude)
+
+        # light direction: `d = p * y - q * x`
+        # weight: `d² / (x² + y²)` (weights of the 4 directions sum to 2)
+        # shade: `max(0, sin(altitude) + cos(altitude) * d) / sqrt(1 + x² + y²)`
+        terms = []
+        operands = {}
+        for idx, azimuth in enumerate([225, 270, 315, 360]):
+            az = math.radians(360.0 - azimuth)
+            operands[f"p{idx}"] = numpy.float32(math.cos(az))
+            operands[f"q{idx}"] = numpy.float32(math.sin(az))
+            d = f"(p{idx} * y - q{idx} * x)"
+            terms.append(f"{d} ** 2 * where(a + b * {d} > 0, a + b * {d}, 0)")
+
+        data = evaluate(
+            f"255 * where(x * x + y * y > 0, ({' + '.join(terms)}) / (2 * (x * x + y * y)), f) / sqrt(1 + x * x + y * y)",
+            dtype=self.output_dtype,
+            x=x,
+            y=y,
+            a=numpy.float32(math.sin(altitude)),
+            b=numpy.float32(math.cos(altitude)),
+            f=numpy.float32(max(0.0, math.sin(altitude))),
+            **operands,
+        )
+
+        return self.output(img, data, mask, "hillshade")
+
+
+class Slope(DEMAlgorithm):
+    """Slope."""
+
+    title: str = "Slope"
+    description: str = "Compute slope (in degrees or percent) from DEM dataset."
+
+    # parameters
+    buffer: int = Field(1, ge=0, le=99)
+    units: Literal["degrees", "percent"] = "degrees"
+
+    # metadata
+    output_dtype: str = "float32"
+    output_min: Sequence[float] = [0.0]
+    output_max: Sequence[float] = [90.0]
+
+    def __call__(self, img: ImageData) -> ImageData:
+        """Compute slope from DEM dataset."""
+        x, y, mask = self.gradient(img)
+
+        expression = (
+            "arctan(sqrt(x * x + y * y)) * 57.29577951308232"
+            if self.units == "degrees"
+            else "sqrt(x * x + y * y) * 100"
+        )
+        data = evaluate(expression, dtype=self.output_dtype, x=x, y=y)
+
+        return self.output(img, data, mask, "slope")
+
+
+class Aspect(DEMAlgorithm):
+    """Aspect."""
+
+    title: str = "Aspect"
+    description: str = "Compute aspect (downslope direction, in degrees clockwise from north) from DEM dataset. Flat areas are masked."
+
+    # parameters
+    buffer: int = Field(1, ge=0, le=99)
+
+    # metadata
+    output_dtype: str = "float32"
+    output_min: Sequence[float] = [0.0]
+    output_max: Sequence[float] = [360.0]
+
+    def __call__(self, img: ImageData) -> ImageData:
+        """Compute aspect from DEM dataset."""
+        x, y, mask = self.gradient(img)
+
+        data = evaluate(
+            "arctan2(-y, x) * 57.29577951308232", dtype=self.output_dtype, x=x, y=y
         )
+        numpy.mod(data, 360.0, out=data)
 
+        flat = evaluate("(x == 0) & (y == 0)", x=x, y=y)
+        mask = flat if mask is None else numpy.logical_or(mask, flat, out=mask)
 
-class Contours(BaseAlgorithm):
+        return self.output(img, data, mask, "aspect")
+
+
+class Contours(ElementwiseAlgorithm):
     """Contours.
 
     Original idea from https://custom-scripts.sentinel-hub.com/dem/contour-lines/
@@ -81,31 +316,24 @@ class Contours(BaseAlgorithm):
     output_nbands: int = 3
     output_dtype: str = "uint8"
 
-    def __call__(self, img: ImageData) -> ImageData:
+    def apply(self, data: numpy.ma.MaskedArray) -> numpy.ma.MaskedArray:
         """Add contours."""
-        data = img.data.astype("float64")
+        values = data.data.astype("float64")
 
         # Apply rescaling for minz,maxz to 1->255 and apply Terrain colormap
-        arr = linear_rescale(data, (self.minz, self.maxz), (1, 255)).astype(
+        arr = linear_rescale(values, (self.minz, self.maxz), (1, 255)).astype(
             self.output_dtype
         )
         arr, _ = apply_cmap(arr, cmap.get("terrain"))
 
         # set black (0) for contour lines
-        arr = numpy.where(data % self.increment < self.thickness, 0, arr)
+        arr = numpy.where(values % self.increment < self.thickness, 0, arr)
 
-        data = numpy.ma.MaskedArray(arr)
-        data.mask = ~img.mask
-
-        return ImageData(
-            data,
-            assets=img.assets,
-            crs=img.crs,
-            bounds=img.bounds,
-        )
+        mask = numpy.logical_or.reduce(numpy.ma.getmaskarray(data), axis=0)
+        return numpy.ma.MaskedArray(arr, mask=numpy.broadcast_to(mask, arr.shape))
 
 
-class Terrarium(BaseAlgorithm):
+class Terrarium(ElementwiseAlgorithm):
     """Encode DEM into RGB (Mapzen Terrarium)."""
 
     title: str = "Terrarium"
@@ -116,19 +344,14 @@ class Terrarium(BaseAlgorithm):
     output_nbands: int = 3
     output_dtype: str = "uint8"
 
-    def __call__(self, img: ImageData) -> ImageData:
+    def apply(self, data: numpy.ma.MaskedArray) -> numpy.ma.MaskedArray:
         """Encode DEM into RGB."""
-        data = numpy.clip(img.array[0] + 32768.0, 0.0, 65535.0)
+        data = numpy.ma.clip(data[0] + 32768.0, 0.0, 65535.0)
         r = data / 256
         g = data % 256
         b = (data * 256) % 256
 
-        return ImageData(
-            numpy.ma.stack([r, g, b]).astype(self.output_dtype),
-            assets=img.assets,
-            crs=img.crs,
-            bounds=img.bounds,
-        )
+        return numpy.ma.asarray(numpy.ma.stack([r, g, b]), dtype=self.output_dtype)
 
 
 class TerrainRGB(BaseAlgorithm):
@@ -152,6 +375,7 @@ class TerrainRGB(BaseAlgorithm):
         Code from https://github.com/mapbox/rio-rgbify/blob/master/rio_rgbify/encoders.py (MIT)
 
         """
+        self.check_input(img)
 
         def _range_check(datarange):
             """
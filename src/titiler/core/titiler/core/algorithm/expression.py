@@ -0,0 +1,168 @@
+"""titiler.core.algorithm expression evaluation.
+
+Elementwise expressions are evaluated with `numexpr` (optional dependency): the arrays
+are processed by blocks (fitting in the CPU cache), using multiple threads, without a
+temporary array per operator. Compiled expressions are cached by expression and input
+types. Without `numexpr`, expressions are evaluated with numpy.
+
+"""
+
+from functools import lru_cache
+from types import CodeType
+from typing import Any, Dict, Optional, Tuple, Type, Union
+
+import numpy
+
+try:
+    import numexpr
+except ImportError:  # pragma: nocover
+    numexpr = None  # type: ignore
+
+Operand = Union[numpy.ndarray, numpy.generic, float, int]
+
+# numexpr `bool` and `float` types
+_NUMPY_TYPES = {bool: numpy.bool_, float: numpy.float32}
+
+# numexpr functions, used to evaluate expressions with numpy
+NUMPY_FUNCTIONS = {
+    name: getattr(numpy, name)
+    for name in [
+        "where",
+        "sin",
+        "cos",
+        "tan",
+        "arcsin",
+        "arccos",
+        "arctan",
+        "arctan2",
+        "sinh",
+        "cosh",
+        "tanh",
+        "arcsinh",
+        "arccosh",
+        "arctanh",
+        "log",
+        "log10",
+        "log1p",
+        "exp",
+        "expm1",
+        "sqrt",
+        "abs",
+        "conj",
+        "real",
+        "imag",
+        "floor",
+        "ceil",
+    ]
+}
+
+
+def _numexpr_type(dtype: numpy.dtype) -> Type:
+    """numexpr type for a numpy dtype (`bool` and `float` are numexpr's bool and float32)."""
+    if dtype.kind == "b":
+        return bool
+
+    if dtype.kind in "iu":
+        if dtype.itemsize > 4 or (dtype.kind == "u" and dtype.itemsize == 4):
+            return numpy.int64
+
+        return numpy.int32
+
+    if dtype.kind == "f":
+        return float if dtype.itemsize <= 4 else numpy.float64
+
+    raise ValueError(f"Unsupported data type: {dtype}")
+
+
+@lru_cache(maxsize=256)
+def compile_expression(
+    expression: str, signature: Tuple[Tuple[str, Type], ...]
+) -> "numexpr.NumExpr":
+    """Compile expression (cached)."""
+    return numexpr.NumExpr(expression, signature=list(signature))
+
+
+@lru_cache(maxsize=256)
+def _compile_numpy(expression: str) -> CodeType:
+    """Compile expression as python code (cached)."""
+    return compile(expression, "<expression>", "eval")
+
+
+def _evaluate_numpy(
+    expression: str, dtype: Optional[str], operands: Dict[str, numpy.ndarray]
+) -> numpy.ndarray:
+    """Evaluate an elementwise expression with numpy."""
+    namespace: Dict[str, Any] = {"__builtins__": {}, **NUMPY_FUNCTIONS}
+    # like numexpr, do not warn on invalid values or division by zero
+    with numpy.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        data = numpy.asarray(eval(_compile_numpy(expression), namespace, operands))
+
+    if dtype:
+        shape = numpy.broadcast_shapes(*[value.shape for value in operands.values()])
+        data = numpy.broadcast_to(data, shape).astype(dtype)
+
+    return data
+
+
+def evaluate(
+    expression: str,
+    dtype: Optional[str] = None,
+    **operands: Operand,
+) -> numpy.ndarray:
+    """Evaluate an elementwise expression.
+
+    Args:
+        expression (str): numexpr expression (e.g `(b2 - b1) / (b2 + b1)`), evaluated with numpy when `numexpr` is not installed.
+        dtype (str, optional): Output data type. Defaults to the expression type.
+        operands: Arrays or scalars referenced in the expression.
+
+    """
+    values = [numpy.asarray(value) for value in operands.values()]
+    signature = tuple(
+        (name, _numexpr_type(value.dtype)) for name, value in zip(operands, values)
+    )
+    if numexpr is None:
+        # same operand types as numexpr (e.g unsigned integers as signed)
+        arrays = {
+            name: value.astype(_NUMPY_TYPES.get(kind, kind), copy=False)
+            for (name, kind), value in zip(signature, values)
+        }
+        return _evaluate_numpy(expression, dtype, arrays)
+
+    func = compile_expression(expression, signature)
+
+    out = None
+    if dtype:
+        shape = numpy.broadcast_shapes(*[value.shape for value in values])
+        out = numpy.empty(shape, dtype=dtype)
+
+    return func(*values, out=out, casting="unsafe", ex_uses_vml=numexpr.use_vml)
+
+
+def evaluate_masked(
+    expression: str,
+    dtype: Optional[str] = None,
+    **operands: Operand,
+) -> numpy.ma.MaskedArray:
+    """Evaluate an elementwise expression on masked arrays.
+
+    Output pixels are masked when masked in any of the input arrays or when the result
+    is not finite (e.g division by zero).
+
+    """
+    data = evaluate(
+        expression,
+        dtype=dtype,
+        **{name: numpy.ma.getdata(value) for name, value in operands.items()},
+    )
+
+    mask = numpy.zeros(data.shape, dtype="bool")
+    for value in operands.values():
+        if numpy.ma.is_masked(value):
+            mask |= numpy.ma.getmaskarray(value)
+
+    out_dtype: numpy.dtype = data.dtype
+    if out_dtype.kind == "f":
+        mask |= ~numpy.isfinite(data)
+
+    return numpy.ma.MaskedArray(data, mask=mask)
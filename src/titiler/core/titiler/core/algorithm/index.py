@@ -1,14 +1,14 @@
 """titiler.core.algorithm Normalized Index."""
 
-from typing import Sequence
+from typing import List, Sequence
 
 import numpy
-from rio_tiler.models import ImageData
 
-from titiler.core.algorithm.base import BaseAlgorithm
+from titiler.core.algorithm.base import ElementwiseAlgorithm
+from titiler.core.algorithm.expression import evaluate_masked
 
 
-class NormalizedIndex(BaseAlgorithm):
+class NormalizedIndex(ElementwiseAlgorithm):
     """Normalized Difference Index."""
 
     title: str = "Normalized Difference Index"
@@ -21,16 +21,17 @@ class NormalizedIndex(BaseAlgorithm):
     output_min: Sequence[float] = [-1.0]
     output_max: Sequence[float] = [1.0]
 
-    def __call__(self, img: ImageData) -> ImageData:
+    def apply(self, data: numpy.ma.MaskedArray) -> numpy.ma.MaskedArray:
         """Normalized difference."""
-        b1 = img.array[0].astype("float32")
-        b2 = img.array[1].astype("float32")
-        arr = numpy.ma.MaskedArray((b2 - b1) / (b2 + b1), dtype=self.output_dtype)
-        bnames = img.band_names
-        return ImageData(
-            arr,
-            assets=img.assets,
-            crs=img.crs,
-            bounds=img.bounds,
-            band_names=[f"({bnames[1]} - {bnames[0]}) / ({bnames[1]} + {bnames[0]})"],
+        return evaluate_masked(
+            "(b2 - b1) / (b2 + b1)",
+            dtype=self.output_dtype,
+            b1=data[0:1],
+            b2=data[1:2],
         )
+
+    def output_band_names(self, band_names: List[str]) -> List[str]:
+        """Index expression."""
+        return [
+            f"({band_names[1]} - {band_names[0]}) / ({band_names[1]} + {band_names[0]})"
+        ]
@@ -0,0 +1,143 @@
+"""titiler.core.algorithm Pipeline."""
+
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy
+from pydantic import Field, PrivateAttr, model_validator
+from rio_tiler.models import ImageData
+
+from titiler.core.algorithm.base import BaseAlgorithm, ElementwiseAlgorithm
+
+
+class FusedAlgorithm(BaseAlgorithm):
+    """Consecutive elementwise algorithms applied in one pass.
+
+    The input array is processed by blocks of rows (`block_size` pixels): each block goes
+    through all the steps before the next block is read, so intermediate arrays stay
+    small and only the output array is allocated.
+
+    """
+
+    steps: List[ElementwiseAlgorithm]
+    block_size: int = Field(65536, gt=0)
+
+    def apply(self, data: numpy.ma.MaskedArray) -> numpy.ma.MaskedArray:
+        """Apply all the steps to a masked data array."""
+        for step in self.steps:
+            data = step.apply(data)
+
+        return data
+
+    def check_input(self, img: ImageData) -> None:
+        """Check the image against the first step."""
+        self.steps[0].check_input(img)
+
+    def __call__(self, img: ImageData) -> ImageData:
+        """Apply algorithms."""
+        self.check_input(img)
+
+        array = img.array
+        shape: Tuple[int, ...] = array.shape
+        _, height, width = shape
+        rows = max(1, self.block_size // width)
+
+        block = self.apply(array[:, :rows])
+        count = numpy.shape(block)[0]
+        data = numpy.empty((count, height, width), dtype=block.dtype)
+        mask = numpy.zeros((count, height, width), dtype="bool")
+        for row in range(0, height, rows):
+            if row:
+                block = self.apply(array[:, row : row + rows])
+
+            data[:, row : row + rows] = numpy.ma.getdata(block)
+            mask[:, row : row + rows] = numpy.ma.getmaskarray(block)
+
+        band_names: List[str] = img.band_names or []
+        for step in self.steps:
+            band_names = step.output_band_names(band_names) or []
+
+        kwargs: Dict[str, Any] = {"band_names": band_names} if band_names else {}
+        return ImageData(
+            numpy.ma.MaskedArray(data, mask=mask),
+            assets=img.assets,
+            crs=img.crs,
+            bounds=img.bounds,
+            **kwargs,
+        )
+
+
+class AlgorithmPipeline(BaseAlgorithm):
+    """Ordered list of algorithms.
+
+    When created, the pipeline checks that each algorithm `input_nbands` matches the
+    previous algorithm `output_nbands` and fuses consecutive elementwise algorithms
+    (see `FusedAlgorithm`).
+
+    """
+
+    title: str = "Pipeline"
+    description: str = "Apply a list of algorithms."
+
+    steps: List[BaseAlgorithm] = Field(min_length=1)
+
+    _stages: List[BaseAlgorithm] = PrivateAttr(default_factory=list)
+
+    @model_validator(mode="after")
+    def plan(self):
+        """Check bands compatibility and fuse elementwise algorithms."""
+        for previous, step in zip(self.steps[:-1], self.steps[1:]):
+            if (
+                previous.output_nbands is not None
+                and step.input_nbands is not None
+                and previous.output_nbands != step.input_nbands
+            ):
+                raise ValueError(
+                    f"`{type(step).__name__}` expects {step.input_nbands} band(s) but `{type(previous).__name__}` returns {previous.output_nbands} band(s)"
+                )
+
+        stages: List[Union[BaseAlgorithm, List[ElementwiseAlgorithm]]] = []
+        for step in self.steps:
+            if isinstance(step, ElementwiseAlgorithm):
+                if stages and isinstance(stages[-1], list):
+                    stages[-1].append(step)
+                else:
+                    stages.append([step])
+            else:
+                stages.append(step)
+
+        self._stages = [
+            (FusedAlgorithm(steps=stage) if len(stage) > 1 else stage[0])
+            if isinstance(stage, list)
+            else stage
+            for stage in stages
+        ]
+
+        first, last = self.steps[0], self.steps[-1]
+        self.input_nbands = first.input_nbands
+        self.output_nbands = last.output_nbands
+        self.output_dtype = last.output_dtype
+        self.output_min = last.output_min
+        self.output_max = last.output_max
+
+        return self
+
+    @property
+    def halo(self) -> int:
+        """Sum of the algorithms halos."""
+        return sum(stage.halo for stage in self._stages)
+
+    @property
+    def stages(self) -> List[BaseAlgorithm]:
+        """Execution plan."""
+        return self._stages
+
+    def check_input(self, img: ImageData) -> None:
+        """Check the image against the first algorithm."""
+        self.steps[0].check_input(img)
+
+    def __call__(self, img: ImageData) -> ImageData:
+        """Apply algorithms."""
+        for stage in self._stages:
+            img = stage(img)
+
+        return img
@@ -0,0 +1,744 @@
+"""titiler.core tile archives (PMTiles and MBTiles).
+
+PMTiles v3 specification: https://github.com/protomaps/PMTiles/blob/main/spec/v3/spec.md
+MBTiles 1.3 specification: https://github.com/mapbox/mbtiles-spec/blob/master/1.3/spec.md
+
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+import urllib.request
+import zlib
+from collections import OrderedDict
+from enum import IntEnum
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+from titiler.core.cache import RangeCache
+
+logger = logging.getLogger(__name__)
+
+PMTILES_HEADER_SIZE = 127
+PMTILES_ROOT_SIZE = 16384
+
+# Errors raised when opening or reading invalid, missing or unreachable archives
+ARCHIVE_ERRORS = (OSError, ValueError, struct.error, zlib.error)
+
+
+class Compression(IntEnum):
+    """PMTiles compression."""
+
+    unknown = 0
+    none = 1
+    gzip = 2
+    brotli = 3
+    zstd = 4
+
+
+class TileType(IntEnum):
+    """PMTiles tile type."""
+
+    unknown = 0
+    mvt = 1
+    png = 2
+    jpeg = 3
+    webp = 4
+    avif = 5
+
+
+# titiler.core.resources.enums.ImageType names to PMTiles tile type
+tile_types = {
+    "png": TileType.png,
+    "pngraw": TileType.png,
+    "jpeg": TileType.jpeg,
+    "jpg": TileType.jpeg,
+    "webp": TileType.webp,
+}
+
+# PMTiles tile type to media type
+tile_media_types = {
+    TileType.mvt: "application/vnd.mapbox-vector-tile",
+    TileType.png: "image/png",
+    TileType.jpeg: "image/jpeg",
+    TileType.webp: "image/webp",
+    TileType.avif: "image/avif",
+}
+
+
+class Entry(NamedTuple):
+    """PMTiles directory entry (`run_length=0` for leaf directories)."""
+
+    tile_id: int
+    offset: int
+    length: int
+    run_length: int
+
+
+class Header(NamedTuple):
+    """PMTiles header."""
+
+    root_offset: int
+    root_length: int
+    metadata_offset: int
+    metadata_length: int
+    leaf_directory_offset: int
+    leaf_directory_length: int
+    tile_data_offset: int
+    tile_data_length: int
+    addressed_tiles_count: int
+    tile_entries_count: int
+    tile_contents_count: int
+    clustered: bool
+    internal_compression: Compression
+    tile_compression: Compression
+    tile_type: TileType
+    min_zoom: int
+    max_zoom: int
+    min_lon_e7: int
+    min_lat_e7: int
+    max_lon_e7: int
+    max_lat_e7: int
+    center_zoom: int
+    center_lon_e7: int
+    center_lat_e7: int
+
+
+_HEADER_FORMAT = "<7sB11QBBBBBBiiiiBii"
+
+
+def zxy_to_tileid(z: int, x: int, y: int) -> int:
+    """Return PMTiles tile id (position on the Hilbert curve, all zooms)."""
+    if x < 0 or y < 0 or x >= 1 << z or y >= 1 << z:
+        raise ValueError(f"Tile({x}, {y}, {z}) is not a valid tile")
+
+    tile_id = ((1 << (2 * z)) - 1) // 3
+    s = (1 << z) >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        tile_id += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x, y = s - 1 - x, s - 1 - y
+            x, y = y, x
+        s >>= 1
+
+    return tile_id
+
+
+def serialize_header(header: Header) -> bytes:
+    """Encode PMTiles header."""
+    return struct.pack(_HEADER_FORMAT, b"PMTiles", 3, *header)
+
+
+def deserialize_header(data: bytes) -> Header:
+    """Decode PMTiles header."""
+    magic, version, *values = struct.unpack(_HEADER_FORMAT, data[:PMTILES_HEADER_SIZE])
+    if magic != b"PMTiles" or version != 3:
+        raise ValueError("Invalid PMTiles archive (only version 3 is supported)")
+
+    header = Header(*values)
+    return header._replace(
+        clustered=bool(header.clustered),
+        internal_compression=Compression(header.internal_compression),
+        tile_compression=Compression(header.tile_compression),
+        tile_type=TileType(header.tile_type),
+    )
+
+
+def _decompress(data: bytes, compression: Compression) -> bytes:
+    """Decompress PMTiles directory, metadata or tile."""
+    if compression == Compression.gzip:
+        return gzip.decompress(data)
+
+    if compression not in [Compression.none, Compression.unknown]:
+        raise ValueError(f"Unsupported PMTiles compression: {compression}")
+
+    return data
+
+
+def _write_varint(buf: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def serialize_directory(entries: List[Entry]) -> bytes:
+    """Encode (gzip compressed) PMTiles directory."""
+    buf = bytearray()
+    _write_varint(buf, len(entries))
+
+    last_id = 0
+    for entry in entries:
+        _write_varint(buf, entry.tile_id - last_id)
+        last_id = entry.tile_id
+
+    for entry in entries:
+        _write_varint(buf, entry.run_length)
+
+    for entry in entries:
+        _write_varint(buf, entry.length)
+
+    for i, entry in enumerate(entries):
+        if i > 0 and entry.offset == entries[i - 1].offset + entries[i - 1].length:
+            _write_varint(buf, 0)
+        else:
+            _write_varint(buf, entry.offset + 1)
+
+    return gzip.compress(bytes(buf), mtime=0)
+
+
+def deserialize_directory(
+    data: bytes, compression: Compression = Compression.gzip
+) -> List[Entry]:
+    """Decode PMTiles directory."""
+    data = _decompress(data, compression)
+
+    n, pos = _read_varint(data, 0)
+
+    tile_ids = []
+    last_id = 0
+    for _ in range(n):
+        delta, pos = _read_varint(data, pos)
+        last_id += delta
+        tile_ids.append(last_id)
+
+    run_lengths = []
+    for _ in range(n):
+        value, pos = _read_varint(data, pos)
+        run_lengths.append(value)
+
+    lengths = []
+    for _ in range(n):
+        value, pos = _read_varint(data, pos)
+        lengths.append(value)
+
+    entries: List[Entry] = []
+    for i in range(n):
+        value, pos = _read_varint(data, pos)
+        if value == 0 and i > 0:
+            offset = entries[i - 1].offset + entries[i - 1].length
+        else:
+            offset = value - 1
+
+        entries.append(Entry(tile_ids[i], offset, lengths[i], run_lengths[i]))
+
+    return entries
+
+
+def find_tile(entries: List[Entry], tile_id: int) -> Optional[Entry]:
+    """Find the directory entry for `tile_id` (tile or leaf directory)."""
+    lo, hi = 0, len(entries) - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if entries[mid].tile_id < tile_id:
+            lo = mid + 1
+        elif entries[mid].tile_id > tile_id:
+            hi = mid - 1
+        else:
+            return entries[mid]
+
+    # `lo - 1` is the last entry with a lower tile_id
+    if lo > 0:
+        entry = entries[lo - 1]
+        if entry.run_length == 0 or tile_id - entry.tile_id < entry.run_length:
+            return entry
+
+    return None
+
+
+def _build_directories(entries: List[Entry]) -> Tuple[bytes, bytes]:
+    """Create root and leaf directories (root must fit in the first 16kB)."""
+    root = serialize_directory(entries)
+    if len(root) <= PMTILES_ROOT_SIZE - PMTILES_HEADER_SIZE:
+        return root, b""
+
+    leaf_size = 4096
+    while True:
+        root_entries = []
+        leaves = bytearray()
+        for i in range(0, len(entries), leaf_size):
+            leaf = serialize_directory(entries[i : i + leaf_size])
+            root_entries.append(Entry(entries[i].tile_id, len(leaves), len(leaf), 0))
+            leaves += leaf
+
+        root = serialize_directory(root_entries)
+        if len(root) <= PMTILES_ROOT_SIZE - PMTILES_HEADER_SIZE:
+            return root, bytes(leaves)
+
+        leaf_size = int(leaf_size * 1.2)
+
+
+class PMTilesWriter:
+    """Write PMTiles archive.
+
+    Tiles are spooled to a temporary file (on disk) until the archive is finalized;
+    identical tiles are stored once. Tiles written in ascending tile id (Hilbert) order
+    produce a *clustered* archive.
+
+    """
+
+    def __init__(
+        self,
+        tile_type: TileType = TileType.png,
+        tile_compression: Compression = Compression.none,
+        directory: Optional[str] = None,
+    ):
+        """Init writer."""
+        self.tile_type = tile_type
+        self.tile_compression = tile_compression
+        self._data = tempfile.TemporaryFile(dir=directory)
+        self._size = 0
+        self._entries: List[Entry] = []
+        self._contents: Dict[bytes, Tuple[int, int]] = {}
+        self._clustered = True
+        self._zooms: Tuple[int, int] = (255, 0)
+
+    def __enter__(self):
+        """Support using with Context Managers."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Support using with Context Managers."""
+        self.close()
+
+    def close(self):
+        """Remove spooled tiles."""
+        self._data.close()
+
+    def write_tile(self, z: int, x: int, y: int, data: bytes) -> None:
+        """Add a tile to the archive."""
+        tile_id = zxy_to_tileid(z, x, y)
+        self._zooms = (min(self._zooms[0], z), max(self._zooms[1], z))
+
+        if self._entries and tile_id <= self._entries[-1].tile_id:
+            self._clustered = False
+
+        key = hashlib.sha256(data).digest()
+        if key in self._contents:
+            offset, length = self._contents[key]
+        else:
+            offset, length = self._size, len(data)
+            self._data.write(data)
+            self._size += length
+            self._contents[key] = (offset, length)
+
+        self._entries.append(Entry(tile_id, offset, length, 1))
+
+    def _entries_runs(self) -> List[Entry]:
+        """Sort entries and merge consecutive identical tiles."""
+        entries: List[Entry] = []
+        for entry in sorted(self._entries, key=lambda e: e.tile_id):
+            if entries:
+                last = entries[-1]
+                if last.tile_id == entry.tile_id:
+                    raise ValueError(f"Duplicated tile (tile id: {entry.tile_id})")
+
+                if (
+                    last.offset == entry.offset
+                    and last.tile_id + last.run_length == entry.tile_id
+                ):
+                    entries[-1] = last._replace(run_length=last.run_length + 1)
+                    continue
+
+            entries.append(entry)
+
+        return entries
+
+    def finalize(
+        self,
+        bounds: Tuple[float, float, float, float] = (
+            -180,
+            -85.05112878,
+            180,
+            85.05112878,
+        ),
+        center: Optional[Tuple[float, float, int]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        chunk_size: int = 1024 * 1024,
+    ) -> Iterator[bytes]:
+        """Yield archive bytes."""
+        entries = self._entries_runs()
+        root, leaves = _build_directories(entries)
+        meta = gzip.compress(json.dumps(metadata or {}).encode(), mtime=0)
+
+        minzoom, maxzoom = self._zooms if entries else (0, 0)
+        if center is None:
+            center = ((bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2, minzoom)
+
+        root_offset = PMTILES_HEADER_SIZE
+        metadata_offset = root_offset + len(root)
+        leaves_offset = metadata_offset + len(meta)
+        data_offset = leaves_offset + len(leaves)
+
+        header = Header(
+            root_offset=root_offset,
+            root_length=len(root),
+            metadata_offset=metadata_offset,
+            metadata_length=len(meta),
+            leaf_directory_offset=leaves_offset,
+            leaf_directory_length=len(leaves),
+            tile_data_offset=data_offset,
+            tile_data_length=self._size,
+            addressed_tiles_count=len(self._entries),
+            tile_entries_count=len(entries),
+            tile_contents_count=len(self._contents),
+            clustered=self._clustered,
+            internal_compression=Compression.gzip,
+            tile_compression=self.tile_compression,
+            tile_type=self.tile_type,
+            min_zoom=minzoom,
+            max_zoom=maxzoom,
+            min_lon_e7=int(bounds[0] * 10_000_000),
+            min_lat_e7=int(bounds[1] * 10_000_000),
+            max_lon_e7=int(bounds[2] * 10_000_000),
+            max_lat_e7=int(bounds[3] * 10_000_000),
+            center_zoom=int(center[2]),
+            center_lon_e7=int(center[0] * 10_000_000),
+            center_lat_e7=int(center[1] * 10_000_000),
+        )
+
+        yield serialize_header(header) + root + meta + leaves
+
+        self._data.seek(0)
+        while chunk := self._data.read(chunk_size):
+            yield chunk
+
+    def write_to(self, fileobj: BinaryIO, **kwargs: Any) -> None:
+        """Write the archive to a file object."""
+        for chunk in self.finalize(**kwargs):
+            fileobj.write(chunk)
+
+
+class MBTilesWriter:
+    """Write (or update) MBTiles archive.
+
+    Note: MBTiles use the `WebMercatorQuad` TileMatrixSet and TMS tile rows (origin at the bottom left).
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        commit_every: int = 256,
+    ):
+        """Create/Open archive (tiles are committed every `commit_every` writes)."""
+        self.path = path
+        self.commit_every = commit_every
+        self._writes = 0
+        self.db = sqlite3.connect(path)
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS metadata (name TEXT, value TEXT);
+            CREATE UNIQUE INDEX IF NOT EXISTS name ON metadata (name);
+            CREATE TABLE IF NOT EXISTS tiles (
+                zoom_level INTEGER,
+                tile_column INTEGER,
+                tile_row INTEGER,
+                tile_data BLOB
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS tile_index
+                ON tiles (zoom_level, tile_column, tile_row);
+            """
+        )
+        if metadata:
+            self.set_metadata(metadata)
+
+    def __enter__(self):
+        """Support using with Context Managers."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Support using with Context Managers."""
+        self.close()
+
+    def close(self):
+        """Commit and close the database."""
+        self.db.commit()
+        self.db.close()
+
+    def set_metadata(self, metadata: Dict[str, Any]) -> None:
+        """Set metadata values."""
+        self.db.executemany(
+            "INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+            [
+                (k, v if isinstance(v, str) else json.dumps(v))
+                for k, v in metadata.items()
+            ],
+        )
+
+    def has_tile(self, z: int, x: int, y: int) -> bool:
+        """Check if the tile is in the archive."""
+        row = self.db.execute(
+            "SELECT 1 FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+            (z, x, (1 << z) - 1 - y),
+        ).fetchone()
+        return row is not None
+
+    def write_tile(self, z: int, x: int, y: int, data: bytes) -> None:
+        """Add a tile to the archive."""
+        self.db.execute(
+            "INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data) VALUES (?, ?, ?, ?)",
+            (z, x, (1 << z) - 1 - y, sqlite3.Binary(data)),
+        )
+        self._writes += 1
+        if self._writes % self.commit_every == 0:
+            self.db.commit()
+
+    def tiles(self) -> Iterator[Tuple[int, int, int, bytes]]:
+        """Iterate over the archive tiles (z, x, y, data)."""
+        for z, x, row, data in self.db.execute(
+            "SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles"
+        ):
+            yield z, x, (1 << z) - 1 - row, data
+
+
+def mbtiles_to_pmtiles(
+    src_path: str,
+    dst_path: str,
+    tile_type: TileType = TileType.png,
+    **kwargs: Any,
+) -> None:
+    """Convert a MBTiles archive to a (clustered) PMTiles archive."""
+    with MBTilesWriter(src_path) as src:
+        ordered = sorted(
+            (zxy_to_tileid(z, x, y), z, x, y) for z, x, y, _ in src.tiles()
+        )
+        with PMTilesWriter(
+            tile_type=tile_type, directory=os.path.dirname(dst_path) or None
+        ) as writer:
+            for _, z, x, y in ordered:
+                (data,) = src.db.execute(
+                    "SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                    (z, x, (1 << z) - 1 - y),
+                ).fetchone()
+                writer.write_tile(z, x, y, data)
+
+            tmp = f"{dst_path}.tmp"
+            with open(tmp, "wb") as f:
+                writer.write_to(f, **kwargs)
+
+            shutil.move(tmp, dst_path)
+
+
+class PMTilesReader:
+    """Read tiles from a PMTiles archive (local file or `http(s)://` URL).
+
+    The header, metadata and root directory are read when the archive is opened and
+    leaf directories are kept in memory (LRU), so reading a tile is usually a single
+    range request. Remote archives are read through `cache` (a `titiler.core.cache.RangeCache`)
+    when set.
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        cache: Optional[RangeCache] = None,
+        max_directories: int = 64,
+    ):
+        """Open archive."""
+        self.path = path
+        self.cache = cache
+        self.max_directories = max_directories
+        self._remote = urlparse(path).scheme in ["http", "https"]
+        self._fd = None if self._remote else os.open(path, os.O_RDONLY)
+        self._directories: "OrderedDict[int, List[Entry]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        try:
+            # Header and root directory are in the first 16kB
+            data = self._read(0, PMTILES_ROOT_SIZE)
+            self.header = deserialize_header(data)
+            h = self.header
+            self.root = deserialize_directory(
+                data[h.root_offset : h.root_offset + h.root_length],
+                h.internal_compression,
+            )
+            self.metadata: Dict[str, Any] = (
+                json.loads(
+                    _decompress(
+                        self._read(h.metadata_offset, h.metadata_length),
+                        h.internal_compression,
+                    )
+                )
+                if h.metadata_length
+                else {}
+            )
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        """Support using with Context Managers."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Support using with Context Managers."""
+        self.close()
+
+    def __del__(self):
+        """Close archive."""
+        self.close()
+
+    def close(self):
+        """Close archive."""
+        if getattr(self, "_fd", None) is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def media_type(self) -> Optional[str]:
+        """Tiles media type."""
+        return tile_media_types.get(self.header.tile_type)
+
+    def _read(self, offset: int, length: int) -> bytes:
+        """Read byte range."""
+        if self._fd is not None:
+            return os.pread(self._fd, length, offset)
+
+        if self.cache is not None:
+            return self.cache.read(self.cache.stat(self.path), offset, length)
+
+        request = urllib.request.Request(
+            self.path, headers={"Range": f"bytes={offset}-{offset + length - 1}"}
+        )
+        with urllib.request.urlopen(request, timeout=30) as response:
+            data = response.read()
+            if response.status == 200:
+                # Server ignored the Range header
+                data = data[offset : offset + length]
+
+        return data
+
+    def _leaf_directory(self, offset: int, length: int) -> List[Entry]:
+        """Read (and cache) leaf directory."""
+        with self._lock:
+            entries = self._directories.get(offset)
+            if entries is not None:
+                self._directories.move_to_end(offset)
+                return entries
+
+        h = self.header
+        entries = deserialize_directory(
+            self._read(h.leaf_directory_offset + offset, length),
+            h.internal_compression,
+        )
+        with self._lock:
+            self._directories[offset] = entries
+            while len(self._directories) > self.max_directories:
+                self._directories.popitem(last=False)
+
+        return entries
+
+    def get_tile(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """Return tile data or None if the tile is not in the archive."""
+        h = self.header
+        if z < h.min_zoom or z > h.max_zoom:
+            return None
+
+        if not (0 <= x < 1 << z and 0 <= y < 1 << z):
+            return None
+
+        tile_id = zxy_to_tileid(z, x, y)
+        entries = self.root
+        # PMTiles directories are at most 4 levels deep
+        for _ in range(4):
+            entry = find_tile(entries, tile_id)
+            if entry is None:
+                return None
+
+            if entry.run_length == 0:
+                entries = self._leaf_directory(entry.offset, entry.length)
+                continue
+
+            data = self._read(h.tile_data_offset + entry.offset, entry.length)
+            return _decompress(data, h.tile_compression)
+
+        return None
+
+
+@lru_cache(maxsize=64)
+def _cached_reader(
+    path: str, ttl_hash: int, cache: Optional[RangeCache]
+) -> PMTilesReader:
+    return PMTilesReader(path, cache=cache)
+
+
+def get_archive_reader(
+    path: str, ttl: int = 300, cache: Optional[RangeCache] = None
+) -> PMTilesReader:
+    """Get PMTiles archive reader (archives are re-opened every `ttl` seconds)."""
+    return _cached_reader(path, int(time.time() // ttl) if ttl else 0, cache)
+
+
+def read_archive_tile(
+    path: str,
+    z: int,
+    x: int,
+    y: int,
+    tilesize: int = 256,
+    format: Optional[str] = None,
+    cache: Optional[RangeCache] = None,
+) -> Optional[Tuple[bytes, str]]:
+    """Read a pre-rendered `WebMercatorQuad` tile from a PMTiles archive.
+
+    Return `(content, media type)` or None when the tile is not in the archive, when
+    the archive does not match the requested tile size (`tilesize` metadata, defaults
+    to 256) or format (`format` metadata or tile type) or when the archive cannot be
+    read (e.g missing or invalid file). Remote archives are read through `cache`.
+
+    """
+    try:
+        reader = get_archive_reader(path, cache=cache)
+    except ARCHIVE_ERRORS as e:
+        logger.warning(f"Could not open tile archive {path}: {e}")
+        return None
+
+    if int(reader.metadata.get("tilesize", 256)) != tilesize:
+        return None
+
+    if format:
+        archive_format = reader.metadata.get("format")
+        if archive_format and archive_format != format:
+            return None
+
+        if tile_types.get(format) != reader.header.tile_type:
+            return None
+
+    if reader.media_type is None:
+        return None
+
+    try:
+        content = reader.get_tile(z, x, y)
+    except ARCHIVE_ERRORS as e:
+        logger.warning(f"Could not read tile from archive {path}: {e}")
+        return None
+
+    if content is None:
+        return None
+
+    return content, reader.media_type
@@ -0,0 +1,184 @@
+"""titiler.core compact binary array format.
+
+Arrays are encoded as a 24 bytes header followed by the (optionally compressed) payload:
+
+    magic (4 bytes, `TIAR`) | version (uint8) | compression (uint8) | flags (uint8)
+    | reserved (1 byte) | dtype (4 bytes, numpy dtype string e.g `<f4`, padded with spaces)
+    | count (uint32) | height (uint32) | width (uint32)
+
+The payload is the little-endian, band-sequential (C order) data array followed, when
+`flags & 1`, by the `uint8` mask (`0` for masked pixels, `255` for valid pixels).
+Integers are little-endian.
+
+Buffers are written directly from the arrays memory (no intermediate copies when not
+compressed). `zlib` compression is always available, `zstd` and `lz4` require the
+`zstandard` and `lz4` modules (`titiler.core[compression]`).
+
+"""
+
+import struct
+import zlib
+from typing import Any, Optional, Tuple
+
+import numpy
+
+from titiler.core.errors import BadRequestError
+from titiler.core.resources.enums import ArrayCompression
+
+try:
+    import zstandard
+except ImportError:  # pragma: nocover
+    zstandard = None  # type: ignore
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: nocover
+    lz4_frame = None  # type: ignore
+
+MAGIC = b"TIAR"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sBBBx4sIII")
+
+FLAG_MASK = 1
+
+
+_compression_ids = {
+    ArrayCompression.none: 0,
+    ArrayCompression.zlib: 1,
+    ArrayCompression.zstd: 2,
+    ArrayCompression.lz4: 3,
+}
+
+
+def _compressor(compression: ArrayCompression) -> Any:
+    """Streaming compressor (with `compress` and `flush` methods)."""
+    if compression == ArrayCompression.zlib:
+        return zlib.compressobj(level=1)
+
+    if compression == ArrayCompression.zstd:
+        if zstandard is None:
+            raise BadRequestError(
+                "`zstd` compression requires `zstandard` module (`titiler.core[compression]`)"
+            )
+        return zstandard.ZstdCompressor(level=1).compressobj()
+
+    if compression == ArrayCompression.lz4:
+        if lz4_frame is None:
+            raise BadRequestError(
+                "`lz4` compression requires `lz4` module (`titiler.core[compression]`)"
+            )
+
+        compressor = lz4_frame.LZ4FrameCompressor()
+        begin = compressor.begin()
+
+        class _LZ4:
+            def compress(self, data) -> bytes:
+                nonlocal begin
+                content, begin = begin + compressor.compress(data), b""
+                return content
+
+            def flush(self) -> bytes:
+                return begin + compressor.flush()
+
+        return _LZ4()
+
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def _decompress(data: memoryview, compression: ArrayCompression) -> bytes:
+    if compression == ArrayCompression.zlib:
+        return zlib.decompress(data)
+
+    if compression == ArrayCompression.zstd:
+        if zstandard is None:
+            raise ValueError("`zstd` compression requires `zstandard` module")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    if compression == ArrayCompression.lz4:
+        if lz4_frame is None:
+            raise ValueError("`lz4` compression requires `lz4` module")
+        return lz4_frame.decompress(data)
+
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def encode_array(
+    data: numpy.ndarray,
+    mask: Optional[numpy.ndarray] = None,
+    compression: ArrayCompression = ArrayCompression.none,
+) -> bytes:
+    """Encode data array (count, height, width) and mask (height, width)."""
+    if data.ndim == 2:
+        data = data[numpy.newaxis]
+
+    shape: Tuple[int, ...] = data.shape
+    count, height, width = shape
+
+    # Only non little-endian or non-contiguous arrays are copied
+    dtype: numpy.dtype = data.dtype
+    dtype = dtype.newbyteorder("<")
+    data = numpy.ascontiguousarray(data, dtype=dtype)
+
+    buffers = [memoryview(data.data).cast("B")]
+    flags = 0
+    if mask is not None:
+        flags |= FLAG_MASK
+        mask = numpy.ascontiguousarray(mask, dtype="uint8")
+        buffers.append(memoryview(mask.data).cast("B"))
+
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        _compression_ids[compression],
+        flags,
+        dtype.str.ljust(4).encode(),
+        count,
+        height,
+        width,
+    )
+
+    if compression == ArrayCompression.none:
+        return b"".join([header, *buffers])
+
+    compressor = _compressor(compression)
+    chunks = [header]
+    for buffer in buffers:
+        chunks.append(compressor.compress(buffer))
+    chunks.append(compressor.flush())
+
+    return b"".join(chunks)
+
+
+def decode_array(content: bytes) -> Tuple[numpy.ndarray, Optional[numpy.ndarray]]:
+    """Decode binary array (return data and mask)."""
+    (
+        magic,
+        version,
+        compression_id,
+        flags,
+        dtype,
+        count,
+        height,
+        width,
+    ) = _HEADER.unpack_from(content)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Invalid binary array")
+
+    compression = {v: k for k, v in _compression_ids.items()}[compression_id]
+    payload: Any = memoryview(content)[_HEADER.size :]
+    if compression != ArrayCompression.none:
+        payload = _decompress(payload, compression)
+
+    dtype = numpy.dtype(dtype.decode().strip())
+    size = count * height * width * dtype.itemsize
+    data = numpy.frombuffer(payload, dtype=dtype, count=count * height * width)
+    data = data.reshape((count, height, width))
+
+    mask = None
+    if flags & FLAG_MASK:
+        mask = numpy.frombuffer(
+            payload, dtype="uint8", count=height * width, offset=size
+        ).reshape((height, width))
+
+    return data, mask
@@ -0,0 +1,493 @@
+"""titiler.core caches.
+
+`RangeCache` is a shared, on-disk, content-addressed cache of HTTP range responses.
+Remote files are read by fixed size blocks, each block being stored in a file named
+after `sha256(url + etag + byte range)`. Because the cache lives on disk, it is shared
+between all the workers (processes) of a node, and a remote byte range is fetched once.
+
+Readers route through the cache using rasterio's `opener` option (see `CachedReader`).
+
+`ImageCache` is an in-memory (per process) LRU cache of post-processed images.
+
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import attr
+import numpy
+import rasterio
+from rio_tiler.io import Reader
+from rio_tiler.models import ImageData
+
+from titiler.core.algorithm.base import BaseAlgorithm
+
+try:
+    import fcntl
+except ImportError:  # pragma: nocover
+    fcntl = None  # type: ignore
+
+try:
+    from titiler.core.metrics import SOURCE_BYTES
+except ImportError:  # pragma: nocover
+    SOURCE_BYTES = None  # type: ignore
+
+
+class RemoteFile(NamedTuple):
+    """Remote file metadata."""
+
+    url: str
+    size: int
+    etag: str
+
+
+def _head(url: str) -> Union[RemoteFile, str]:
+    """Get remote file size and validator (or the error message)."""
+    try:
+        request = urllib.request.Request(url, method="HEAD")
+        with urllib.request.urlopen(request, timeout=10) as response:
+            headers = response.headers
+    except (urllib.error.URLError, ValueError) as e:
+        return f"Could not access {url}: {e}"
+
+    size = headers.get("Content-Length")
+    if size is None:
+        return f"Could not get the size of {url}"
+
+    # Files without ETag are identified by their size and modification date
+    etag = headers.get("ETag") or f"{headers.get('Last-Modified')}-{size}"
+    return RemoteFile(url=url, size=int(size), etag=etag)
+
+
+@lru_cache(maxsize=512)
+def _cached_head(url: str, ttl_hash: int) -> Union[RemoteFile, str]:
+    """Get remote file metadata (cached for the time bucket defined by `ttl_hash`).
+
+    Errors are cached too because GDAL looks for (usually missing) sidecar files each time a dataset is opened.
+
+    """
+    return _head(url)
+
+
+@attr.s(eq=False)
+class RangeCache:
+    """On-disk, content-addressed cache of HTTP range responses.
+
+    Attributes:
+        directory (str): Cache directory (shared between workers).
+        maxsize (int): Maximum cache size in bytes. Least recently used blocks are removed when the cache grows above this size. Defaults to 1GB.
+        blocksize (int): Size (in bytes) of the cached blocks. Reads are aligned to blocks. Defaults to 256KB.
+        ttl (int): Number of seconds the remote files metadata (size, etag) are cached in memory. Defaults to 60.
+        lock_stripes (int): Number of lock files shared by the blocks (a block is locked while fetched). Defaults to 64.
+
+    """
+
+    directory: str = attr.ib()
+    maxsize: int = attr.ib(default=1024**3)
+    blocksize: int = attr.ib(default=256 * 1024)
+    ttl: int = attr.ib(default=60)
+    lock_stripes: int = attr.ib(default=64)
+
+    # Cache size estimate: blocks written by other workers are only seen when the
+    # size is synced from disk (after `maxsize / 10` bytes written by this worker).
+    _size: Optional[int] = attr.ib(init=False, default=None)
+    _written: int = attr.ib(init=False, default=0)
+    _size_lock: threading.Lock = attr.ib(init=False, factory=threading.Lock)
+
+    def __attrs_post_init__(self):
+        """Create cache directory."""
+        os.makedirs(self.directory, exist_ok=True)
+
+    def stat(self, url: str) -> RemoteFile:
+        """Get remote file metadata."""
+        remote = (
+            _cached_head(url, int(time.time() // self.ttl)) if self.ttl else _head(url)
+        )
+        if isinstance(remote, str):
+            raise FileNotFoundError(remote)
+
+        return remote
+
+    def key(self, remote: RemoteFile, start: int, end: int) -> str:
+        """Block cache key (`sha256(url + etag + byte range)`)."""
+        return hashlib.sha256(
+            f"{remote.url}\n{remote.etag}\n{start}-{end}".encode()
+        ).hexdigest()
+
+    def path(self, key: str) -> str:
+        """Block path in the cache directory."""
+        return os.path.join(self.directory, key[:2], key)
+
+    def _stripe(self, key: str) -> str:
+        """Lock file name of a block."""
+        return f"block-{int(key[:8], 16) % self.lock_stripes}"
+
+    @contextlib.contextmanager
+    def _lock(self, name: str) -> Iterator[None]:
+        """Inter-process (file) lock."""
+        if fcntl is None:  # pragma: nocover
+            yield
+            return
+
+        lockdir = os.path.join(self.directory, ".locks")
+        os.makedirs(lockdir, exist_ok=True)
+        with open(os.path.join(lockdir, name), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_block(self, path: str, offset: int, size: int) -> Optional[bytes]:
+        """Read bytes from a cached block (memory mapped)."""
+        try:
+            with open(path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    data = m[offset : offset + size]
+        except (FileNotFoundError, ValueError):
+            return None
+
+        # Update modification time for LRU eviction
+        with contextlib.suppress(OSError):
+            os.utime(path)
+
+        return data
+
+    def _write_block(self, path: str, data: bytes) -> None:
+        """Atomically write a block in the cache."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+
+        with self._size_lock:
+            self._written += len(data)
+            if self._size is None or self._written >= self.maxsize // 10:
+                self._size = self.disk_usage()
+                self._written = 0
+            else:
+                self._size += len(data)
+
+            evict = self._size > self.maxsize
+
+        if evict:
+            self.evict()
+
+    def _fetch(self, remote: RemoteFile, start: int, end: int) -> bytes:
+        """Fetch byte range from the remote file."""
+        request = urllib.request.Request(
+            remote.url, headers={"Range": f"bytes={start}-{end}"}
+        )
+        with urllib.request.urlopen(request, timeout=30) as response:
+            if response.status != 206:
+                # Do not download the whole file when the server ignores the Range header
+                raise OSError(
+                    f"Range requests not supported for {remote.url} (status {response.status})"
+                )
+
+            data = response.read()
+
+        if len(data) != end - start + 1:
+            raise OSError(
+                f"Invalid range response for {remote.url} ({start}-{end}): got {len(data)} bytes"
+            )
+
+        if SOURCE_BYTES is not None:
+            SOURCE_BYTES.labels(urlparse(remote.url).scheme).inc(len(data))
+
+        return data
+
+    def blocks(self, remote: RemoteFile, start: int, end: int) -> List[Tuple[int, int]]:
+        """Aligned blocks covering the byte range."""
+        first, last = start // self.blocksize, end // self.blocksize
+        return [
+            (i * self.blocksize, min((i + 1) * self.blocksize, remote.size) - 1)
+            for i in range(first, last + 1)
+        ]
+
+    def read(self, remote: RemoteFile, offset: int, size: int) -> bytes:
+        """Read `size` bytes at `offset` from the remote file, through the cache."""
+        end = min(offset + size, remote.size) - 1
+        if end < offset:
+            return b""
+
+        blocks = self.blocks(remote, offset, end)
+        data: List[Optional[bytes]] = [
+            self._read_block(self.path(self.key(remote, bs, be)), 0, be - bs + 1)
+            for bs, be in blocks
+        ]
+
+        missing = [i for i, d in enumerate(data) if d is None]
+        if missing:
+            keys = [self.key(remote, *blocks[i]) for i in missing]
+            with contextlib.ExitStack() as stack:
+                # Lock (in a deterministic order) the missing blocks stripes so other
+                # workers wait for them instead of fetching them
+                for name in sorted({self._stripe(key) for key in keys}):
+                    stack.enter_context(self._lock(name))
+
+                # Fetch consecutive missing blocks (not written in the meantime) in one request
+                runs: List[List[int]] = []
+                for i, key in zip(missing, keys):
+                    data[i] = self._read_block(
+                        self.path(key), 0, blocks[i][1] - blocks[i][0] + 1
+                    )
+                    if data[i] is not None:
+                        continue
+
+                    if runs and runs[-1][-1] == i - 1:
+                        runs[-1].append(i)
+                    else:
+                        runs.append([i])
+
+                for run in runs:
+                    run_start, run_end = blocks[run[0]][0], blocks[run[-1]][1]
+                    content = self._fetch(remote, run_start, run_end)
+                    for i in run:
+                        bs, be = blocks[i]
+                        block = content[bs - run_start : be - run_start + 1]
+                        self._write_block(self.path(self.key(remote, bs, be)), block)
+                        data[i] = block
+
+        content = b"".join(data)  # type: ignore
+        skip = offset - blocks[0][0]
+        return content[skip : skip + (end - offset + 1)]
+
+    def disk_usage(self) -> int:
+        """Cache size on disk (in bytes)."""
+        total = 0
+        for entry in self._entries():
+            total += entry[2]
+
+        return total
+
+    def _entries(self) -> Iterator[Tuple[str, float, int]]:
+        """List cached blocks (path, mtime, size)."""
+        for root, dirs, files in os.walk(self.directory):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+
+                path = os.path.join(root, name)
+                with contextlib.suppress(FileNotFoundError):
+                    stat = os.stat(path)
+                    yield path, stat.st_mtime, stat.st_size
+
+    def evict(self) -> None:
+        """Remove least recently used blocks until the cache is below 90% of `maxsize`.
+
+        The cache size is computed from disk (blocks are written by all the workers).
+
+        """
+        with self._lock("evict"):
+            entries = sorted(self._entries(), key=lambda e: e[1])
+            total = sum(e[2] for e in entries)
+            target = int(self.maxsize * 0.9)
+            for path, _, size in entries:
+                if total <= target:
+                    break
+
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+                    total -= size
+
+        with self._size_lock:
+            self._size = total
+            self._written = 0
+
+    def open(self, url: str, mode: str = "rb") -> "CachedRangeFile":
+        """Open remote file (rasterio `opener`)."""
+        if "w" in mode or "a" in mode or "+" in mode:
+            raise ValueError("RangeCache only supports reading files")
+
+        return CachedRangeFile(self, self.stat(url))
+
+
+class CachedRangeFile(io.RawIOBase):
+    """Read-only file-like object reading remote file through a `RangeCache`."""
+
+    def __init__(self, cache: RangeCache, remote: RemoteFile):
+        """Init file."""
+        self.cache = cache
+        self.remote = remote
+        self._position = 0
+
+    def readable(self) -> bool:
+        """File is readable."""
+        return True
+
+    def seekable(self) -> bool:
+        """File is seekable."""
+        return True
+
+    def tell(self) -> int:
+        """Current position."""
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Change position."""
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self.remote.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        """Read bytes."""
+        if size is None or size < 0:
+            size = self.remote.size - self._position
+
+        data = self.cache.read(self.remote, self._position, size)
+        self._position += len(data)
+        return data
+
+    def readinto(self, b) -> int:
+        """Read bytes into a pre-allocated buffer."""
+        data = self.read(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+
+@attr.s
+class CachedReader(Reader):
+    """Rasterio Reader routing HTTP(S) reads through a shared `RangeCache`.
+
+    Other datasets (local files, `s3://`...) and readers without cache (default) are
+    opened as with `rio_tiler.io.Reader`.
+
+    """
+
+    cache: Optional[RangeCache] = attr.ib(default=None)
+
+    def __attrs_post_init__(self):
+        """Open dataset through the cache."""
+        if (
+            not self.dataset
+            and self.cache is not None
+            and isinstance(self.input, str)
+            and urlparse(self.input).scheme in ["http", "https"]
+        ):
+            self.dataset = self._ctx_stack.enter_context(
+                rasterio.open(self.input, opener=self.cache.open)
+            )
+
+        super().__attrs_post_init__()
+
+
+def _key_value(value: Any) -> Any:
+    """JSON representation of a non JSON serializable cache key value."""
+    if isinstance(value, BaseAlgorithm):
+        # algorithm class and parameters (nested algorithms are serialized the same way)
+        name = f"{type(value).__module__}.{type(value).__qualname__}"
+        return [name, dict(value)]
+
+    if isinstance(value, (numpy.ndarray, numpy.generic)):
+        return value.tolist()
+
+    raise TypeError(f"{type(value).__name__} is not a valid cache key value")
+
+
+class ImageCache:
+    """In-memory LRU cache of processed images (*after* `post_process`).
+
+    Images are cached with a metadata object (e.g the dataset colormap) and evicted,
+    least recently used first, when the cache grows above `maxsize` bytes or when
+    older than `ttl` seconds. Cached images are returned as copies, so the rendering
+    steps (rescaling, color formula...) can modify them.
+
+    """
+
+    def __init__(self, maxsize: int = 256 * 1024**2, ttl: Optional[float] = 300):
+        """Init cache."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.size = 0
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, Tuple[ImageData, Any, int, float]]" = (
+            OrderedDict()
+        )
+
+    @staticmethod
+    def key(*values: Any) -> Optional[str]:
+        """Cache key from the values defining an image (e.g path, tile index, parameters).
+
+        Values must be JSON serializable, algorithms (`BaseAlgorithm`) or numpy values.
+        Returns None (the image must not be cached) for other values (e.g a custom
+        `post_process` function), which have no stable representation.
+
+        """
+        try:
+            return json.dumps(values, sort_keys=True, default=_key_value)
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, key: str) -> Optional[Tuple[ImageData, Any]]:
+        """Get image (copy) and metadata."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+
+            image, metadata, size, created = item
+            if self.ttl is not None and time.monotonic() - created > self.ttl:
+                del self._items[key]
+                self.size -= size
+                return None
+
+            self._items.move_to_end(key)
+
+        return attr.evolve(image, array=image.array.copy()), metadata
+
+    def set(self, key: str, image: ImageData, metadata: Any = None) -> None:
+        """Cache image (copy) and metadata."""
+        array = image.array
+        size = array.data.nbytes + numpy.ma.getmaskarray(array).nbytes
+        if size > self.maxsize:
+            return
+
+        image = attr.evolve(image, array=array.copy())
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.size -= previous[2]
+
+            self._items[key] = (image, metadata, size, time.monotonic())
+            self.size += size
+            while self.size > self.maxsize:
+                _, (_, _, evicted, _) = self._items.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self) -> None:
+        """Remove all images."""
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def __len__(self) -> int:
+        """Number of cached images."""
+        return len(self._items)
@@ -0,0 +1,182 @@
+"""titiler.core pixels coverage of geometries.
+
+`exact` coverage computes, for each pixel, the fraction of its area covered by the
+polygons. Polygon edges are split at the pixels boundaries and each piece adds the
+signed area between itself and the right side of the image to its pixel (and a full
+pixel to all the pixels on its right in the same row, accumulated with a cumulative
+sum). All the edges are processed at once with numpy, without rasterizing the
+geometry at a finer resolution.
+
+`centroid` coverage is `1` for pixels whose center is inside the geometry, `0` otherwise.
+
+"""
+
+from typing import Dict, Iterator, List, Tuple
+
+import numpy
+from affine import Affine
+from rasterio.crs import CRS
+from rasterio.features import rasterize
+from rasterio.warp import transform_geom
+from rio_tiler.constants import WGS84_CRS
+from rio_tiler.models import ImageData
+
+from titiler.core.resources.enums import CoverageMethod
+
+
+def _polygons(geometry: Dict) -> Iterator[List]:
+    """Polygons (list of rings) of a geometry."""
+    if geometry["type"] == "Polygon":
+        yield geometry["coordinates"]
+
+    elif geometry["type"] == "MultiPolygon":
+        yield from geometry["coordinates"]
+
+    elif geometry["type"] == "GeometryCollection":
+        for geom in geometry["geometries"]:
+            yield from _polygons(geom)
+
+
+def _edges(
+    geometry: Dict, transform: Affine
+) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """Polygons edges in pixel coordinates.
+
+    Returns the edges start and end points `(n, 2)` and their weight (`1` for edges of
+    clockwise exterior rings and counter-clockwise interior rings, `-1` otherwise).
+
+    """
+    inverse = ~transform
+    starts, ends, weights = [], [], []
+    for polygon in _polygons(geometry):
+        for idx, ring in enumerate(polygon):
+            coords = numpy.asarray(ring, dtype="float64")[:, :2]
+            if len(coords) < 3:
+                continue
+
+            cols = inverse.a * coords[:, 0] + inverse.b * coords[:, 1] + inverse.c
+            rows = inverse.d * coords[:, 0] + inverse.e * coords[:, 1] + inverse.f
+            points = numpy.stack([cols, rows], axis=1)
+            if not numpy.array_equal(points[0], points[-1]):
+                points = numpy.vstack([points, points[:1]])
+
+            # Shoelace formula (pixel coordinates, rows going down)
+            area = float(
+                numpy.sum(
+                    points[:-1, 0] * points[1:, 1] - points[1:, 0] * points[:-1, 1]
+                )
+            )
+            if area == 0:
+                continue
+
+            sign = -numpy.sign(area) if idx == 0 else numpy.sign(area)
+            starts.append(points[:-1])
+            ends.append(points[1:])
+            weights.append(numpy.full(len(points) - 1, sign))
+
+    if not starts:
+        empty = numpy.empty((0, 2))
+        return empty, empty, numpy.empty(0)
+
+    return (
+        numpy.concatenate(starts),
+        numpy.concatenate(ends),
+        numpy.concatenate(weights),
+    )
+
+
+def _crossings(
+    start: numpy.ndarray, end: numpy.ndarray, size: int
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Edges ids and parameters (0-1) where the edges cross integer values in [0, size]."""
+    low = numpy.minimum(start, end)
+    high = numpy.maximum(start, end)
+    first = numpy.maximum(numpy.floor(low) + 1, 0)
+    last = numpy.minimum(numpy.ceil(high) - 1, size)
+    count = numpy.maximum(last - first + 1, 0).astype("int64")
+
+    ids = numpy.repeat(numpy.arange(len(start)), count)
+    offsets = numpy.repeat(numpy.cumsum(count) - count, count)
+    values = first[ids] + (numpy.arange(len(ids)) - offsets)
+
+    return ids, (values - start[ids]) / (end[ids] - start[ids])
+
+
+def exact_coverage(
+    geometry: Dict, transform: Affine, width: int, height: int
+) -> numpy.ndarray:
+    """Fraction of each pixel area covered by a (Multi)Polygon geometry."""
+    starts, ends, weights = _edges(geometry, transform)
+    if not len(weights):
+        return numpy.zeros((height, width), dtype="float32")
+
+    # Split the edges where they cross columns and rows boundaries
+    n = len(weights)
+    xids, xt = _crossings(starts[:, 0], ends[:, 0], width)
+    yids, yt = _crossings(starts[:, 1], ends[:, 1], height)
+    ids = numpy.concatenate([numpy.arange(n), numpy.arange(n), xids, yids])
+    t = numpy.concatenate([numpy.zeros(n), numpy.ones(n), xt, yt])
+    order = numpy.lexsort((t, ids))
+    ids, t = ids[order], t[order]
+
+    same = ids[:-1] == ids[1:]
+    edge, t0, t1 = ids[:-1][same], t[:-1][same], t[1:][same]
+    delta = ends[edge] - starts[edge]
+    p0 = starts[edge] + delta * t0[:, numpy.newaxis]
+    p1 = starts[edge] + delta * t1[:, numpy.newaxis]
+
+    # Pieces left (right) of the image are projected on its left (right) side
+    x0, x1 = numpy.clip(p0[:, 0], 0, width), numpy.clip(p1[:, 0], 0, width)
+    dy = (p1[:, 1] - p0[:, 1]) * weights[edge]
+    xmid = (x0 + x1) / 2
+    row = numpy.floor((p0[:, 1] + p1[:, 1]) / 2).astype("int64")
+
+    inside = (dy != 0) & (row >= 0) & (row < height)
+    dy, xmid, row = dy[inside], xmid[inside], row[inside]
+    col = numpy.clip(numpy.floor(xmid).astype("int64"), 0, width - 1)
+
+    index = row * width + col
+    area = numpy.bincount(index, dy * (col + 1 - xmid), minlength=height * width)
+    cover = numpy.bincount(index, dy, minlength=height * width).reshape(height, width)
+
+    coverage = area.reshape(height, width) + numpy.cumsum(cover, axis=1) - cover
+    return numpy.clip(coverage, 0, 1).astype("float32")
+
+
+def centroid_coverage(
+    geometry: Dict, transform: Affine, width: int, height: int
+) -> numpy.ndarray:
+    """`1` for pixels whose center is inside the geometry, `0` otherwise."""
+    return rasterize(
+        [(geometry, 1)],
+        out_shape=(height, width),
+        transform=transform,
+        all_touched=False,
+        fill=0,
+        dtype="uint8",
+    ).astype("float32")
+
+
+def get_coverage_array(
+    image: ImageData,
+    shape: Dict,
+    shape_crs: CRS = WGS84_CRS,
+    method: CoverageMethod = CoverageMethod.exact,
+) -> numpy.ndarray:
+    """Get the pixels coverage array of a GeoJSON geometry or Feature for an image.
+
+    Geometries without polygons (e.g points or lines) fall back to rio-tiler's
+    `ImageData.get_coverage_array` when using the `exact` method.
+
+    """
+    geometry = shape["geometry"] if shape.get("type") == "Feature" else shape
+    if image.crs != shape_crs:
+        geometry = transform_geom(shape_crs, image.crs, geometry)
+
+    if method == CoverageMethod.centroid:
+        return centroid_coverage(geometry, image.transform, image.width, image.height)
+
+    if not any(_polygons(geometry)):
+        return image.get_coverage_array(geometry, shape_crs=image.crs)
+
+    return exact_coverage(geometry, image.transform, image.width, image.height)
@@ -1,20 +1,39 @@
 """Common dependency."""
 
+import hashlib
 import json
+import logging
 import warnings
 from dataclasses import dataclass
-from typing import Callable, Dict, List, Literal, Optional, Sequence, Tuple, Union
+from email.utils import format_datetime
+from typing import (
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import numpy
-from fastapi import HTTPException, Query
+from fastapi import Depends, HTTPException, Query
 from rasterio.crs import CRS
 from rio_tiler.colormap import ColorMaps
 from rio_tiler.colormap import cmap as default_cmap
 from rio_tiler.colormap import parse_color
 from rio_tiler.errors import MissingAssets, MissingBands
 from rio_tiler.types import RIOResampling, WarpResampling
+from starlette.requests import Request
 from typing_extensions import Annotated
 
+from titiler.core.resources.enums import ArrayCompression, CoverageMethod
+from titiler.core.utils import Timings, get_source_validator, parse_http_date
+
+timings_logger = logging.getLogger("titiler.timings")
+
 
 def create_colormap_dependency(cmap: ColorMaps) -> Callable:
     """Create Colormap Dependency."""
@@ -63,6 +82,137 @@ def DatasetPathParams(url: Annotated[str, Query(description="Dataset URL")]) ->
     return url
 
 
+def ArchiveParams(
+    archive: Annotated[
+        Optional[str],
+        Query(
+            description="Pre-rendered tiles archive (PMTiles) URL. Tiles missing from the archive are rendered from the dataset."
+        ),
+    ] = None,
+) -> Optional[str]:
+    """Pre-rendered tiles archive path."""
+    return archive
+
+
+def TimingsParams(request: Request) -> Generator[Timings, None, None]:
+    """Processing stages timer.
+
+    The timer is stored in `request.state.timings` and stages are logged
+    (as JSON) to the `titiler.timings` logger at DEBUG level.
+
+    Note: should be the first dependency of the endpoint so the first lap covers the other dependencies resolution.
+
+    """
+    timings = Timings()
+    request.state.timings = timings
+
+    yield timings
+
+    if timings_logger.isEnabledFor(logging.DEBUG):
+        route = request.scope.get("route")
+        timings_logger.debug(
+            json.dumps(
+                {
+                    "route": getattr(route, "name", None),
+                    "path": request.url.path,
+                    "query": str(request.query_params),
+                    "timings": timings.as_dict(),
+                }
+            )
+        )
+
+
+def RequestKeyParams(request: Request) -> str:
+    """Normalized request key (path and sorted query parameters)."""
+    return json.dumps([request.url.path, sorted(request.query_params.multi_items())])
+
+
+def _etag_match(if_none_match: str, etag: str) -> bool:
+    """Check `If-None-Match` header value against an ETag (weak comparison)."""
+    if if_none_match.strip() == "*":
+        return True
+
+    for value in if_none_match.split(","):
+        value = value.strip()
+        if value.startswith("W/"):
+            value = value[2:]
+
+        if value == etag:
+            return True
+
+    return False
+
+
+def create_conditional_dependency(path_dependency: Callable) -> Callable:
+    """Create HTTP conditional requests dependency.
+
+    The dependency computes a strong `ETag` from the dataset validator (file stat or
+    object's etag/last-modified) and the normalized request parameters, without reading
+    any data. If the request `If-None-Match` (or `If-Modified-Since`) header matches,
+    a `304 Not Modified` response is returned before any pixel is read.
+
+    """
+
+    def deps(
+        request: Request,
+        src_path=Depends(path_dependency),
+    ) -> Dict[str, str]:
+        """Return ETag/Last-Modified headers or raise `304 Not Modified`."""
+        validator = get_source_validator(src_path)
+        if not validator:
+            return {}
+
+        key = json.dumps(
+            [
+                validator.etag,
+                validator.last_modified.isoformat()
+                if validator.last_modified
+                else None,
+                request.url.path,
+                sorted(request.query_params.multi_items()),
+            ]
+        )
+        etag = f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+        headers = {"ETag": etag}
+        if validator.last_modified:
+            headers["Last-Modified"] = format_datetime(
+                validator.last_modified, usegmt=True
+            )
+
+        if if_none_match := request.headers.get("if-none-match"):
+            if _etag_match(if_none_match, etag):
+                raise HTTPException(status_code=304, headers=headers)
+
+        # `If-Modified-Since` is ignored when `If-None-Match` is present (RFC 9110)
+        elif validator.last_modified and (
+            if_modified_since := parse_http_date(
+                request.headers.get("if-modified-since")
+            )
+        ):
+            if validator.last_modified.replace(microsecond=0) <= if_modified_since:
+                raise HTTPException(status_code=304, headers=headers)
+
+        return headers
+
+    return deps
+
+
+def content_conditional_headers(request: Request, content: bytes) -> Dict[str, str]:
+    """Return `ETag` header computed from a response content or raise `304 Not Modified`.
+
+    Used for responses not derived from the dataset (e.g tiles served from an archive).
+
+    """
+    etag = f'"{hashlib.sha1(content).hexdigest()}"'
+    headers = {"ETag": etag}
+    if if_none_match := request.headers.get("if-none-match"):
+        if _etag_match(if_none_match, etag):
+            raise HTTPException(status_code=304, headers=headers)
+
+    return headers
+
+
 @dataclass
 class DefaultDependency:
     """Dataclass with dict unpacking"""
@@ -432,6 +582,10 @@ class ImageRenderingParams(DefaultDependency):
             description="Add mask to the output data. Defaults to `True`",
         ),
     ] = None
+    compression: Annotated[
+        Optional[ArrayCompression],
+        Query(description="Compression of the `bin` output format."),
+    ] = None
 
 
 RescaleType = List[Tuple[float, ...]]
@@ -502,6 +656,18 @@ class StatisticsParams(DefaultDependency):
             self.percentiles = [2, 98]
 
 
+def CoverageParams(
+    coverage_method: Annotated[
+        CoverageMethod,
+        Query(
+            description="Pixels coverage method for feature statistics: `exact` (fraction of the pixel area covered by the feature) or `centroid` (pixels whose center is inside the feature). Defaults to `exact`.",
+        ),
+    ] = CoverageMethod.exact,
+) -> CoverageMethod:
+    """Coverage method Parameter."""
+    return coverage_method
+
+
 @dataclass
 class HistogramParams(DefaultDependency):
     """Numpy Histogram options."""
@@ -1,10 +1,12 @@
 """TiTiler Router factories."""
 
 import abc
+import warnings
 from typing import (
     Any,
     Callable,
     Dict,
+    Iterator,
     List,
     Literal,
     Optional,
@@ -23,11 +25,12 @@ from fastapi import APIRouter, Body, Depends, Path, Query
 from fastapi.dependencies.utils import get_parameterless_sub_dependant
 from fastapi.params import Depends as DependsFunc
 from geojson_pydantic.features import Feature, FeatureCollection
-from geojson_pydantic.geometries import MultiPolygon, Polygon
+from geojson_pydantic.geometries import LineString, MultiPolygon, Polygon
 from morecantile import TileMatrixSet
 from morecantile import tms as morecantile_tms
 from morecantile.defaults import TileMatrixSets
 from pydantic import Field
+from rasterio.features import bounds as geometry_bounds
 from rio_tiler.colormap import ColorMaps
 from rio_tiler.colormap import cmap as default_cmap
 from rio_tiler.constants import WGS84_CRS
@@ -35,14 +38,23 @@ from rio_tiler.io import BaseReader, MultiBandReader, MultiBaseReader, Reader
 from rio_tiler.models import Bounds, ImageData, Info
 from rio_tiler.types import ColorMapType
 from rio_tiler.utils import CRS_to_uri
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
-from starlette.responses import HTMLResponse, Response
+from starlette.responses import HTMLResponse, Response, StreamingResponse
 from starlette.routing import Match, NoMatchFound, compile_path, replace_params
 from starlette.templating import Jinja2Templates
 from typing_extensions import Annotated
 
-from titiler.core.algorithm import AlgorithmMetadata, Algorithms, BaseAlgorithm
+from titiler.core.algorithm import (
+    AlgorithmMetadata,
+    Algorithms,
+    BaseAlgorithm,
+)
 from titiler.core.algorithm import algorithms as available_algorithms
+from titiler.core.algorithm import with_halo
+from titiler.core.archives import read_archive_tile
+from titiler.core.cache import ImageCache, RangeCache
+from titiler.core.coverage import get_coverage_array
 from titiler.core.dependencies import (
     AssetsBidxExprParams,
     AssetsBidxExprParamsOptional,
@@ -55,6 +67,7 @@ from titiler.core.dependencies import (
     ColorFormulaParams,
     ColorMapParams,
     CoordCRSParams,
+    CoverageParams,
     CRSParams,
     DatasetParams,
     DatasetPathParams,
@@ -64,13 +77,20 @@ from titiler.core.dependencies import (
     ImageRenderingParams,
     PartFeatureParams,
     PreviewParams,
+    RequestKeyParams,
     RescaleType,
     RescalingParams,
     StatisticsParams,
     TileParams,
+    TimingsParams,
+    content_conditional_headers,
+    create_conditional_dependency,
 )
+from titiler.core.errors import BadRequestError
+from titiler.core.middleware import profiled
 from titiler.core.models.mapbox import TileJSON
 from titiler.core.models.OGC import TileMatrixSetList, TileSet, TileSetList
+from titiler.core.models.requests import PointsBody, ProfileBody
 from titiler.core.models.responses import (
     ColorMapsList,
     InfoGeoJSON,
@@ -79,19 +99,69 @@ from titiler.core.models.responses import (
     MultiBaseStatistics,
     MultiBaseStatisticsGeoJSON,
     Point,
+    Points,
+    Profile,
     Statistics,
     StatisticsGeoJSON,
 )
-from titiler.core.resources.enums import ImageType
+from titiler.core.points import (
+    points_coordinates,
+    read_points,
+    render_points,
+    sample_line,
+)
+from titiler.core.resources.enums import (
+    ArrayCompression,
+    CoverageMethod,
+    ImageType,
+    MediaType,
+    OptionalHeader,
+    PointsFormat,
+)
 from titiler.core.resources.responses import GeoJSONResponse, JSONResponse, XMLResponse
 from titiler.core.routing import EndpointScope
-from titiler.core.utils import render_image
+from titiler.core.singleflight import SingleFlight
+from titiler.core.utils import (
+    iter_file,
+    read_part_strips,
+    render_geotiff,
+    render_image,
+)
+
+try:
+    from titiler.core.metrics import count_reader_open
+except ImportError:  # pragma: nocover
+
+    def count_reader_open() -> None:  # type: ignore
+        """Count readers opened by the endpoints (requires `prometheus-client`)."""
+
 
 jinja2_env = jinja2.Environment(
     loader=jinja2.ChoiceLoader([jinja2.PackageLoader(__package__, "templates")])
 )
 DEFAULT_TEMPLATES = Jinja2Templates(env=jinja2_env)
 
+
+def _process_strips(
+    images: Iterator[ImageData],
+    post_process: Optional[BaseAlgorithm] = None,
+    rescale: Optional[Sequence[Tuple[float, float]]] = None,
+    color_formula: Optional[str] = None,
+) -> Iterator[ImageData]:
+    """Apply post-processing, rescaling and color formula to image strips."""
+    for image in images:
+        if post_process:
+            image = post_process(image)
+
+        if rescale:
+            image.rescale(rescale)
+
+        if color_formula:
+            image.apply_color_formula(color_formula)
+
+        yield image
+
+
 img_endpoint_params: Dict[str, Any] = {
     "responses": {
         200: {
@@ -232,6 +302,7 @@ class TilerFactory(BaseFactory):
         tile_dependency (titiler.core.dependencies.DefaultDependency): Endpoint dependency defining tile options (e.g buffer, padding).
         stats_dependency (titiler.core.dependencies.DefaultDependency): Endpoint dependency defining options for rio-tiler's statistics method.
         histogram_dependency (titiler.core.dependencies.DefaultDependency): Endpoint dependency defining options for numpy's histogram method.
+        coverage_dependency (Callable[..., CoverageMethod]): Endpoint dependency defining the pixels coverage method for feature statistics.
         img_preview_dependency (titiler.core.dependencies.DefaultDependency): Endpoint dependency defining options for rio-tiler's preview method.
         img_part_dependency (titiler.core.dependencies.DefaultDependency): Endpoint dependency defining options for rio-tiler's part/feature methods.
         process_dependency (titiler.core.dependencies.DefaultDependency): Endpoint dependency defining image post-processing options (e.g rescaling, color-formula).
@@ -242,9 +313,16 @@ class TilerFactory(BaseFactory):
         environment_dependency (Callable): Endpoint dependency to define GDAL environment at runtime.
         supported_tms (morecantile.defaults.TileMatrixSets): TileMatrixSets object holding the supported TileMatrixSets.
         templates (Jinja2Templates): Jinja2 templates.
+        optional_headers (list): Optional headers to add to image responses (`OptionalHeader.server_timing` adds a per-stage `Server-Timing` header).
         add_preview (bool): add `/preview` endpoints. Defaults to True.
         add_part (bool): add `/bbox` and `/feature` endpoints. Defaults to True.
         add_viewer (bool): add `/map` endpoints. Defaults to True.
+        conditional_requests (bool): add `ETag`/`Last-Modified` headers to `/tiles`, `/preview` and `/bbox` responses and answer conditional requests with `304 Not Modified`. Defaults to False.
+        single_flight (bool): coalesce concurrent identical `/tiles` requests (same path and query parameters) so they share one render. Defaults to False.
+        archive_dependency (Callable[..., Optional[str]]): Endpoint dependency returning the PMTiles archive of pre-rendered tiles (e.g `titiler.core.dependencies.ArchiveParams`). `WebMercatorQuad` tiles found in the archive are returned as is (for requests without rendering options), other tiles are rendered from the dataset.
+        archive_cache (titiler.core.cache.RangeCache, optional): Range-request cache for remote archives. Defaults to None.
+        image_cache (titiler.core.cache.ImageCache, optional): Cache `/tiles` images after post-processing (before rescaling, color formula and rendering), so tiles re-styled with other rendering options are not read nor post-processed again. Defaults to None.
+        stream_threshold (int, optional): `/bbox` and `/feature` GeoTIFF outputs (with `width` and `height`) larger than this number of pixels are read and written by strips to a temporary file which is then streamed, so memory usage does not depend on the output size. Defaults to 16777216 (4096x4096), `None` to disable.
 
     """
 
@@ -269,6 +347,7 @@ class TilerFactory(BaseFactory):
     # Statistics/Histogram Dependencies
     stats_dependency: Type[DefaultDependency] = StatisticsParams
     histogram_dependency: Type[DefaultDependency] = HistogramParams
+    coverage_dependency: Callable[..., CoverageMethod] = CoverageParams
 
     # Crop/Preview endpoints Dependencies
     img_preview_dependency: Type[DefaultDependency] = PreviewParams
@@ -293,11 +372,61 @@ class TilerFactory(BaseFactory):
 
     templates: Jinja2Templates = DEFAULT_TEMPLATES
 
+    optional_headers: List[OptionalHeader] = field(factory=list)
+
     # Add/Remove some endpoints
     add_preview: bool = True
     add_part: bool = True
     add_viewer: bool = True
 
+    # HTTP Conditional requests (ETag/Last-Modified)
+    conditional_requests: bool = False
+
+    # Concurrent identical tile requests coalescing
+    single_flight: bool = False
+    flights: SingleFlight = field(init=False, factory=SingleFlight)
+
+    # Pre-rendered tiles (PMTiles archive) dependency
+    archive_dependency: Callable[..., Optional[str]] = field(default=lambda: None)
+    archive_cache: Optional[RangeCache] = None
+
+    # Processed images (after post-processing) cache
+    image_cache: Optional[ImageCache] = None
+
+    # GeoTIFF outputs larger than this number of pixels are written by strips and streamed
+    stream_threshold: Optional[int] = 4096 * 4096
+
+    # Maximum number of points for `/points` requests
+    max_points: Optional[int] = 10000
+
+    def _stream_part(self, format: Optional[ImageType], image_params) -> bool:
+        """Check if `/bbox` or `/feature` output should be streamed."""
+        width = getattr(image_params, "width", None)
+        height = getattr(image_params, "height", None)
+        return bool(
+            self.stream_threshold is not None
+            and format in [ImageType.tif, ImageType.cog]
+            and width
+            and height
+            and width * height > self.stream_threshold
+        )
+
+    @property
+    def conditional_dependency(self) -> Callable[..., Dict[str, str]]:
+        """HTTP Conditional requests dependency."""
+        if self.conditional_requests:
+            return create_conditional_dependency(self.path_dependency)
+
+        return lambda: {}
+
+    @property
+    def single_flight_dependency(self) -> Callable[..., Optional[str]]:
+        """Request coalescing key dependency."""
+        if self.single_flight:
+            return RequestKeyParams
+
+        return lambda: None
+
     def register_routes(self):
         """
         This Method register routes to the router.
@@ -347,6 +476,7 @@ class TilerFactory(BaseFactory):
             """Return the bounds of the COG."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     crs = crs or WGS84_CRS
                     return {
                         "bounds": src_dst.get_geographic_bounds(crs or WGS84_CRS),
@@ -374,6 +504,7 @@ class TilerFactory(BaseFactory):
             """Return dataset's basic info."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     return src_dst.info()
 
         @self.router.get(
@@ -397,6 +528,7 @@ class TilerFactory(BaseFactory):
             """Return dataset's basic info as a GeoJSON feature."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     bounds = src_dst.get_geographic_bounds(crs or WGS84_CRS)
                     if bounds[0] > bounds[2]:
                         pl = Polygon.from_bounds(-180, bounds[1], bounds[2], bounds[3])
@@ -447,6 +579,7 @@ class TilerFactory(BaseFactory):
             """Get Dataset statistics."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     image = src_dst.preview(
                         **layer_params.as_dict(),
                         **image_params.as_dict(),
@@ -489,6 +622,7 @@ class TilerFactory(BaseFactory):
             post_process=Depends(self.process_dependency),
             stats_params=Depends(self.stats_dependency),
             histogram_params=Depends(self.histogram_dependency),
+            coverage_method=Depends(self.coverage_dependency),
             env=Depends(self.environment_dependency),
         ):
             """Get Statistics from a geojson feature or featureCollection."""
@@ -498,6 +632,7 @@ class TilerFactory(BaseFactory):
 
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     for feature in fc:
                         shape = feature.model_dump(exclude_none=True)
                         image = src_dst.feature(
@@ -511,9 +646,11 @@ class TilerFactory(BaseFactory):
                         )
 
                         # Get the coverage % array
-                        coverage_array = image.get_coverage_array(
+                        coverage_array = get_coverage_array(
+                            image,
                             shape,
                             shape_crs=coord_crs or WGS84_CRS,
+                            method=coverage_method,
                         )
 
                         if post_process:
@@ -560,6 +697,7 @@ class TilerFactory(BaseFactory):
             """Retrieve a list of available raster tilesets for the specified dataset."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     bounds = src_dst.get_geographic_bounds(crs or WGS84_CRS)
 
             collection_bbox = {
@@ -653,6 +791,7 @@ class TilerFactory(BaseFactory):
                 with self.reader(
                     src_path, tms=tms, **reader_params.as_dict()
                 ) as src_dst:
+                    count_reader_open()
                     bounds = src_dst.get_geographic_bounds(tms.rasterio_geographic_crs)
                     minzoom = src_dst.minzoom
                     maxzoom = src_dst.maxzoom
@@ -770,7 +909,8 @@ class TilerFactory(BaseFactory):
             r"/tiles/{tileMatrixSetId}/{z}/{x}/{y}@{scale}x.{format}",
             **img_endpoint_params,
         )
-        def tile(
+        async def tile(  # noqa: C901
+            request: Request,
             z: Annotated[
                 int,
                 Path(
@@ -805,6 +945,7 @@ class TilerFactory(BaseFactory):
                 ImageType,
                 "Default will be automatically defined if the output image needs a mask (png) or not (jpeg).",
             ] = None,
+            timings=Depends(TimingsParams),
             src_path=Depends(self.path_dependency),
             reader_params=Depends(self.reader_dependency),
             tile_params=Depends(self.tile_dependency),
@@ -815,42 +956,133 @@ class TilerFactory(BaseFactory):
             color_formula=Depends(self.color_formula_dependency),
             colormap=Depends(self.colormap_dependency),
             render_params=Depends(self.render_dependency),
+            cache_headers=Depends(self.conditional_dependency),
+            flight_key=Depends(self.single_flight_dependency),
+            archive=Depends(self.archive_dependency),
             env=Depends(self.environment_dependency),
         ):
             """Create map tile from a dataset."""
-            tms = self.supported_tms.get(tileMatrixSetId)
-            with rasterio.Env(**env):
-                with self.reader(
-                    src_path, tms=tms, **reader_params.as_dict()
-                ) as src_dst:
-                    image = src_dst.tile(
+            timings.lap("dependencies")
+
+            def _read() -> Tuple[ImageData, Optional[ColorMapType]]:
+                tms = self.supported_tms.get(tileMatrixSetId)
+                with rasterio.Env(**env):
+                    with self.reader(
+                        src_path, tms=tms, **reader_params.as_dict()
+                    ) as src_dst:
+                        count_reader_open()
+                        timings.lap("open")
+
+                        image = src_dst.tile(
+                            x,
+                            y,
+                            z,
+                            tilesize=scale * 256,
+                            **with_halo(tile_params.as_dict(), post_process),
+                            **layer_params.as_dict(),
+                            **dataset_params.as_dict(),
+                        )
+                        dst_colormap = getattr(src_dst, "colormap", None)
+
+                timings.lap("read")
+
+                if post_process:
+                    image = post_process(image)
+                    timings.lap("postprocess")
+
+                return image, dst_colormap
+
+            def _render() -> Tuple[bytes, str]:
+                if self.image_cache is None:
+                    image, dst_colormap = _read()
+
+                else:
+                    key = ImageCache.key(
+                        src_path,
+                        tileMatrixSetId,
+                        z,
                         x,
                         y,
-                        z,
-                        tilesize=scale * 256,
-                        **tile_params.as_dict(),
-                        **layer_params.as_dict(),
-                        **dataset_params.as_dict(),
+                        scale,
+                        reader_params.as_dict(),
+                        tile_params.as_dict(),
+                        layer_params.as_dict(),
+                        dataset_params.as_dict(),
+                        post_process,
+                        env,
                     )
-                    dst_colormap = getattr(src_dst, "colormap", None)
-
-            if post_process:
-                image = post_process(image)
+                    cached = self.image_cache.get(key) if key else None
+                    if cached:
+                        image, dst_colormap = cached
+                        timings.lap("cache")
+                    else:
+                        image, dst_colormap = _read()
+                        if key:
+                            self.image_cache.set(key, image, dst_colormap)
+
+                if rescale:
+                    image.rescale(rescale)
+                    timings.lap("rescale")
+
+                if color_formula:
+                    image.apply_color_formula(color_formula)
+                    timings.lap("color_formula")
+
+                return render_image(
+                    image,
+                    output_format=format,
+                    colormap=colormap or dst_colormap,
+                    timings=timings,
+                    **render_params.as_dict(),
+                )
 
-            if rescale:
-                image.rescale(rescale)
+            # Archive tiles are pre-rendered: only used without rendering options
+            rendering_options = [
+                post_process,
+                rescale,
+                color_formula,
+                colormap,
+                layer_params.as_dict(),
+                dataset_params.as_dict(),
+                tile_params.as_dict(),
+                render_params.as_dict(),
+            ]
+            archive_tile = None
+            if (
+                archive
+                and tileMatrixSetId == "WebMercatorQuad"
+                and not any(rendering_options)
+            ):
+                archive_tile = await run_in_threadpool(
+                    profiled(read_archive_tile),
+                    archive,
+                    z,
+                    x,
+                    y,
+                    tilesize=scale * 256,
+                    format=format.value if format else None,
+                    cache=self.archive_cache,
+                )
 
-            if color_formula:
-                image.apply_color_formula(color_formula)
+            if archive_tile:
+                content, media_type = archive_tile
+                timings.lap("archive")
+                if cache_headers:
+                    cache_headers = content_conditional_headers(request, content)
+            elif flight_key:
+                (content, media_type), shared = await self.flights.do(
+                    flight_key, profiled(_render)
+                )
+                if shared:
+                    timings.lap("singleflight")
+            else:
+                content, media_type = await run_in_threadpool(profiled(_render))
 
-            content, media_type = render_image(
-                image,
-                output_format=format,
-                colormap=colormap or dst_colormap,
-                **render_params.as_dict(),
-            )
+            headers: Dict[str, str] = {**cache_headers}
+            if OptionalHeader.server_timing in self.optional_headers:
+                headers["Server-Timing"] = str(timings)
 
-            return Response(content, media_type=media_type)
+            return Response(content, media_type=media_type, headers=headers)
 
     def tilejson(self):  # noqa: C901
         """Register /tilejson.json endpoint."""
@@ -933,6 +1165,7 @@ class TilerFactory(BaseFactory):
                 with self.reader(
                     src_path, tms=tms, **reader_params.as_dict()
                 ) as src_dst:
+                    count_reader_open()
                     return {
                         "bounds": src_dst.get_geographic_bounds(
                             tms.rasterio_geographic_crs
@@ -1087,6 +1320,7 @@ class TilerFactory(BaseFactory):
                 with self.reader(
                     src_path, tms=tms, **reader_params.as_dict()
                 ) as src_dst:
+                    count_reader_open()
                     bounds = src_dst.get_geographic_bounds(tms.rasterio_geographic_crs)
                     minzoom = minzoom if minzoom is not None else src_dst.minzoom
                     maxzoom = maxzoom if maxzoom is not None else src_dst.maxzoom
@@ -1168,6 +1402,7 @@ class TilerFactory(BaseFactory):
 
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     pts = src_dst.point(
                         lon,
                         lat,
@@ -1182,6 +1417,149 @@ class TilerFactory(BaseFactory):
                 "band_names": pts.band_names,
             }
 
+        @self.router.post(
+            r"/points",
+            response_model=Points,
+            response_class=JSONResponse,
+            responses={
+                200: {
+                    "content": {
+                        "application/json": {},
+                        MediaType.bin.value: {},
+                    },
+                    "description": "Return values for multiple points",
+                }
+            },
+        )
+        @self.router.post(
+            r"/points.{format}",
+            response_model=Points,
+            response_class=JSONResponse,
+            responses={
+                200: {
+                    "content": {
+                        "application/json": {},
+                        MediaType.bin.value: {},
+                    },
+                    "description": "Return values for multiple points",
+                }
+            },
+        )
+        def points(
+            body: Annotated[
+                PointsBody,
+                Body(
+                    description="GeoJSON (Multi)Point, Feature, FeatureCollection or `lon`/`lat` arrays."
+                ),
+            ],
+            format: Annotated[
+                PointsFormat,
+                "Output format (JSON or binary array). Default to JSON.",
+            ] = PointsFormat.json,
+            compression: Annotated[
+                Optional[ArrayCompression],
+                Query(description="Binary array compression."),
+            ] = None,
+            src_path=Depends(self.path_dependency),
+            reader_params=Depends(self.reader_dependency),
+            coord_crs=Depends(CoordCRSParams),
+            layer_params=Depends(self.layer_dependency),
+            dataset_params=Depends(self.dataset_dependency),
+            env=Depends(self.environment_dependency),
+        ):
+            """Get values for multiple points of a dataset."""
+            coordinates = points_coordinates(body)
+            if self.max_points and len(coordinates) > self.max_points:
+                raise BadRequestError(
+                    f"Too many points: {len(coordinates)} (maximum: {self.max_points})"
+                )
+
+            with rasterio.Env(**env):
+                with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
+                    pts = read_points(
+                        src_dst,
+                        coordinates,
+                        coord_crs=coord_crs or WGS84_CRS,
+                        **layer_params.as_dict(),
+                        **dataset_params.as_dict(),
+                    )
+
+            output = render_points(pts, format, coordinates, compression)
+            if isinstance(output, tuple):
+                content, media_type = output
+                return Response(content, media_type=media_type)
+
+            return output
+
+        @self.router.post(
+            r"/profile",
+            response_model=Profile,
+            response_class=JSONResponse,
+            responses={200: {"description": "Return values along a line"}},
+        )
+        def profile(
+            body: Annotated[
+                ProfileBody,
+                Body(description="GeoJSON LineString or Feature (LineString)."),
+            ],
+            samples: Annotated[
+                Optional[int],
+                Query(
+                    gt=1,
+                    le=self.max_points,
+                    description="Number of samples along the line (including both ends). Defaults to 100.",
+                ),
+            ] = None,
+            spacing: Annotated[
+                Optional[float],
+                Query(
+                    gt=0,
+                    description="Distance between samples (meters for geographic coordinates, `coord_crs` units otherwise).",
+                ),
+            ] = None,
+            src_path=Depends(self.path_dependency),
+            reader_params=Depends(self.reader_dependency),
+            coord_crs=Depends(CoordCRSParams),
+            layer_params=Depends(self.layer_dependency),
+            dataset_params=Depends(self.dataset_dependency),
+            env=Depends(self.environment_dependency),
+        ):
+            """Get values along a line (e.g elevation profile)."""
+            geometry = body.geometry if isinstance(body, Feature) else body
+            if not isinstance(geometry, LineString):
+                raise BadRequestError("Only LineString geometries are supported")
+
+            if samples and spacing:
+                raise BadRequestError("`samples` and `spacing` are mutually exclusive")
+
+            coord_crs = coord_crs or WGS84_CRS
+            coordinates, distances = sample_line(
+                geometry.coordinates,
+                samples=samples or (None if spacing else 100),
+                spacing=spacing,
+                geographic=coord_crs.is_geographic,
+                max_samples=self.max_points,
+            )
+
+            with rasterio.Env(**env):
+                with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
+                    pts = read_points(
+                        src_dst,
+                        coordinates.tolist(),
+                        coord_crs=coord_crs,
+                        **layer_params.as_dict(),
+                        **dataset_params.as_dict(),
+                    )
+
+            return {
+                "coordinates": coordinates.tolist(),
+                "distances": distances.tolist(),
+                "values": pts.values.T.tolist(),
+                "band_names": pts.band_names,
+            }
+
     ############################################################################
     # /preview (Optional)
     ############################################################################
@@ -1195,6 +1573,7 @@ class TilerFactory(BaseFactory):
                 ImageType,
                 "Default will be automatically defined if the output image needs a mask (png) or not (jpeg).",
             ] = None,
+            timings=Depends(TimingsParams),
             src_path=Depends(self.path_dependency),
             reader_params=Depends(self.reader_dependency),
             layer_params=Depends(self.layer_dependency),
@@ -1206,11 +1585,17 @@ class TilerFactory(BaseFactory):
             color_formula=Depends(self.color_formula_dependency),
             colormap=Depends(self.colormap_dependency),
             render_params=Depends(self.render_dependency),
+            cache_headers=Depends(self.conditional_dependency),
             env=Depends(self.environment_dependency),
         ):
             """Create preview of a dataset."""
+            timings.lap("dependencies")
+
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
+                    timings.lap("open")
+
                     image = src_dst.preview(
                         **layer_params.as_dict(),
                         **image_params.as_dict(),
@@ -1219,23 +1604,33 @@ class TilerFactory(BaseFactory):
                     )
                     dst_colormap = getattr(src_dst, "colormap", None)
 
+            timings.lap("read")
+
             if post_process:
                 image = post_process(image)
+                timings.lap("postprocess")
 
             if rescale:
                 image.rescale(rescale)
+                timings.lap("rescale")
 
             if color_formula:
                 image.apply_color_formula(color_formula)
+                timings.lap("color_formula")
 
             content, media_type = render_image(
                 image,
                 output_format=format,
                 colormap=colormap or dst_colormap,
+                timings=timings,
                 **render_params.as_dict(),
             )
 
-            return Response(content, media_type=media_type)
+            headers: Dict[str, str] = {**cache_headers}
+            if OptionalHeader.server_timing in self.optional_headers:
+                headers["Server-Timing"] = str(timings)
+
+            return Response(content, media_type=media_type, headers=headers)
 
     ############################################################################
     # /bbox and /feature (Optional)
@@ -1261,6 +1656,7 @@ class TilerFactory(BaseFactory):
                 ImageType,
                 "Default will be automatically defined if the output image needs a mask (png) or not (jpeg).",
             ] = None,
+            timings=Depends(TimingsParams),
             src_path=Depends(self.path_dependency),
             reader_params=Depends(self.reader_dependency),
             layer_params=Depends(self.layer_dependency),
@@ -1273,38 +1669,94 @@ class TilerFactory(BaseFactory):
             color_formula=Depends(self.color_formula_dependency),
             colormap=Depends(self.colormap_dependency),
             render_params=Depends(self.render_dependency),
+            cache_headers=Depends(self.conditional_dependency),
             env=Depends(self.environment_dependency),
         ):
             """Create image from a bbox."""
+            timings.lap("dependencies")
+
+            headers: Dict[str, str] = {**cache_headers}
+
+            if self._stream_part(format, image_params):
+                with rasterio.Env(**env):
+                    with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                        count_reader_open()
+                        timings.lap("open")
+
+                        image_options = with_halo(image_params.as_dict(), post_process)
+                        strips = read_part_strips(
+                            src_dst,
+                            [minx, miny, maxx, maxy],
+                            width=image_options.pop("width"),
+                            height=image_options.pop("height"),
+                            bounds_crs=coord_crs or WGS84_CRS,
+                            dst_crs=dst_crs,
+                            **layer_params.as_dict(),
+                            **image_options,
+                            **dataset_params.as_dict(),
+                        )
+                        output = render_geotiff(
+                            _process_strips(
+                                strips, post_process, rescale, color_formula
+                            ),
+                            width=image_params.width,
+                            height=image_params.height,
+                            colormap=colormap or getattr(src_dst, "colormap", None),
+                            cog=format == ImageType.cog,
+                            **render_params.as_dict(),
+                        )
+
+                timings.lap("encode")
+                if OptionalHeader.server_timing in self.optional_headers:
+                    headers["Server-Timing"] = str(timings)
+
+                return StreamingResponse(
+                    iter_file(output),
+                    media_type=format.mediatype,
+                    headers=headers,
+                )
+
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
+                    timings.lap("open")
+
                     image = src_dst.part(
                         [minx, miny, maxx, maxy],
                         dst_crs=dst_crs,
                         bounds_crs=coord_crs or WGS84_CRS,
                         **layer_params.as_dict(),
-                        **image_params.as_dict(),
+                        **with_halo(image_params.as_dict(), post_process),
                         **dataset_params.as_dict(),
                     )
                     dst_colormap = getattr(src_dst, "colormap", None)
 
+            timings.lap("read")
+
             if post_process:
                 image = post_process(image)
+                timings.lap("postprocess")
 
             if rescale:
                 image.rescale(rescale)
+                timings.lap("rescale")
 
             if color_formula:
                 image.apply_color_formula(color_formula)
+                timings.lap("color_formula")
 
             content, media_type = render_image(
                 image,
                 output_format=format,
                 colormap=colormap or dst_colormap,
+                timings=timings,
                 **render_params.as_dict(),
             )
 
-            return Response(content, media_type=media_type)
+            if OptionalHeader.server_timing in self.optional_headers:
+                headers["Server-Timing"] = str(timings)
+
+            return Response(content, media_type=media_type, headers=headers)
 
         # POST endpoints
         @self.router.post(
@@ -1325,6 +1777,7 @@ class TilerFactory(BaseFactory):
                 ImageType,
                 "Default will be automatically defined if the output image needs a mask (png) or not (jpeg).",
             ] = None,
+            timings=Depends(TimingsParams),
             src_path=Depends(self.path_dependency),
             reader_params=Depends(self.reader_dependency),
             layer_params=Depends(self.layer_dependency),
@@ -1340,35 +1793,92 @@ class TilerFactory(BaseFactory):
             env=Depends(self.environment_dependency),
         ):
             """Create image from a geojson feature."""
+            timings.lap("dependencies")
+
+            headers: Dict[str, str] = {}
+
+            if self._stream_part(format, image_params):
+                shape = geojson.model_dump(exclude_none=True)["geometry"]
+                with rasterio.Env(**env):
+                    with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                        count_reader_open()
+                        timings.lap("open")
+
+                        image_options = with_halo(image_params.as_dict(), post_process)
+                        strips = read_part_strips(
+                            src_dst,
+                            geometry_bounds(shape),
+                            width=image_options.pop("width"),
+                            height=image_options.pop("height"),
+                            bounds_crs=coord_crs or WGS84_CRS,
+                            dst_crs=dst_crs,
+                            shape=shape,
+                            **layer_params.as_dict(),
+                            **image_options,
+                            **dataset_params.as_dict(),
+                        )
+                        output = render_geotiff(
+                            _process_strips(
+                                strips, post_process, rescale, color_formula
+                            ),
+                            width=image_params.width,
+                            height=image_params.height,
+                            colormap=colormap or getattr(src_dst, "colormap", None),
+                            cog=format == ImageType.cog,
+                            **render_params.as_dict(),
+                        )
+
+                timings.lap("encode")
+                if OptionalHeader.server_timing in self.optional_headers:
+                    headers["Server-Timing"] = str(timings)
+
+                return StreamingResponse(
+                    iter_file(output),
+                    media_type=format.mediatype,
+                    headers=headers,
+                )
+
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
+                    timings.lap("open")
+
                     image = src_dst.feature(
                         geojson.model_dump(exclude_none=True),
                         shape_crs=coord_crs or WGS84_CRS,
                         dst_crs=dst_crs,
                         **layer_params.as_dict(),
-                        **image_params.as_dict(),
+                        **with_halo(image_params.as_dict(), post_process),
                         **dataset_params.as_dict(),
                     )
                     dst_colormap = getattr(src_dst, "colormap", None)
 
+            timings.lap("read")
+
             if post_process:
                 image = post_process(image)
+                timings.lap("postprocess")
 
             if rescale:
                 image.rescale(rescale)
+                timings.lap("rescale")
 
             if color_formula:
                 image.apply_color_formula(color_formula)
+                timings.lap("color_formula")
 
             content, media_type = render_image(
                 image,
                 output_format=format,
                 colormap=colormap or dst_colormap,
+                timings=timings,
                 **render_params.as_dict(),
             )
 
-            return Response(content, media_type=media_type)
+            if OptionalHeader.server_timing in self.optional_headers:
+                headers["Server-Timing"] = str(timings)
+
+            return Response(content, media_type=media_type, headers=headers)
 
 
 @define(kw_only=True)
@@ -1418,6 +1928,7 @@ class MultiBaseTilerFactory(TilerFactory):
             """Return dataset's basic info or the list of available assets."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     return src_dst.info(**asset_params.as_dict())
 
         @self.router.get(
@@ -1442,6 +1953,7 @@ class MultiBaseTilerFactory(TilerFactory):
             """Return dataset's basic info as a GeoJSON feature."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     bounds = src_dst.get_geographic_bounds(crs or WGS84_CRS)
                     if bounds[0] > bounds[2]:
                         pl = Polygon.from_bounds(-180, bounds[1], bounds[2], bounds[3])
@@ -1478,6 +1990,7 @@ class MultiBaseTilerFactory(TilerFactory):
             """Return a list of supported assets."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     return src_dst.assets
 
     # Overwrite the `/statistics` endpoint because the MultiBaseReader output model is different (Dict[str, Dict[str, BandStatistics]])
@@ -1510,6 +2023,7 @@ class MultiBaseTilerFactory(TilerFactory):
             """Per Asset statistics"""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     return src_dst.statistics(
                         **asset_params.as_dict(),
                         **image_params.as_dict(),
@@ -1546,6 +2060,7 @@ class MultiBaseTilerFactory(TilerFactory):
             """Merged assets statistics."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     # Default to all available assets
                     if not layer_params.assets and not layer_params.expression:
                         layer_params.assets = src_dst.assets
@@ -1601,6 +2116,7 @@ class MultiBaseTilerFactory(TilerFactory):
 
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     # Default to all available assets
                     if not layer_params.assets and not layer_params.expression:
                         layer_params.assets = src_dst.assets
@@ -1676,6 +2192,7 @@ class MultiBandTilerFactory(TilerFactory):
             """Return dataset's basic info."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     return src_dst.info(**bands_params.as_dict())
 
         @self.router.get(
@@ -1700,6 +2217,7 @@ class MultiBandTilerFactory(TilerFactory):
             """Return dataset's basic info as a GeoJSON feature."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     bounds = src_dst.get_geographic_bounds(crs or WGS84_CRS)
                     if bounds[0] > bounds[2]:
                         pl = Polygon.from_bounds(-180, bounds[1], bounds[2], bounds[3])
@@ -1731,6 +2249,7 @@ class MultiBandTilerFactory(TilerFactory):
             """Return a list of supported bands."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     return src_dst.bands
 
     # Overwrite the `/statistics` endpoint because we need bands to default to the list of bands.
@@ -1763,6 +2282,7 @@ class MultiBandTilerFactory(TilerFactory):
             """Get Dataset statistics."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     # Default to all available bands
                     if not bands_params.bands and not bands_params.expression:
                         bands_params.bands = src_dst.bands
@@ -1818,6 +2338,7 @@ class MultiBandTilerFactory(TilerFactory):
 
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     # Default to all available bands
                     if not bands_params.bands and not bands_params.expression:
                         bands_params.bands = src_dst.bands
@@ -1934,7 +2455,7 @@ class AlgorithmFactory(BaseFactory):
     def register_routes(self):
         """Register Algorithm routes."""
 
-        def metadata(algorithm: BaseAlgorithm) -> AlgorithmMetadata:
+        def metadata(algorithm: Type[BaseAlgorithm]) -> AlgorithmMetadata:
             """Algorithm Metadata"""
             props = algorithm.model_json_schema()["properties"]
 
@@ -1986,7 +2507,23 @@ class AlgorithmFactory(BaseFactory):
         )
         def available_algorithms(request: Request):
             """Retrieve the list of available Algorithms."""
-            return {k: metadata(v) for k, v in self.supported_algorithm.data.items()}
+            algorithms: Dict[str, AlgorithmMetadata] = {}
+            for name in self.supported_algorithm.list():
+                # Algorithms which cannot be imported (e.g plugins with missing
+                # dependencies) are skipped instead of failing the whole listing
+                try:
+                    algorithm = self.supported_algorithm.get(name)
+                except (ImportError, AttributeError, TypeError) as e:
+                    warnings.warn(
+                        f"Could not load `{name}` algorithm: {e}",
+                        UserWarning,
+                        stacklevel=1,
+                    )
+                    continue
+
+                algorithms[name] = metadata(algorithm)
+
+            return algorithms
 
         @self.router.get(
             "/algorithms/{algorithmId}",
@@ -0,0 +1,204 @@
+"""Titiler Prometheus metrics.
+
+Note: requires `prometheus-client` (`python -m pip install "titiler.core[metrics]"`).
+
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from anyio import CapacityLimiter, to_thread
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from titiler.core.utils import Timings
+
+REQUEST_LATENCY = Histogram(
+    "titiler_request_duration_seconds",
+    "HTTP request latency (seconds), by route template.",
+    ["method", "route", "status"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+RESPONSE_SIZE = Histogram(
+    "titiler_response_size_bytes",
+    "HTTP response body size (bytes), by route template.",
+    ["method", "route"],
+    buckets=(1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+
+REQUESTS_IN_PROGRESS = Gauge(
+    "titiler_requests_in_progress",
+    "Number of HTTP requests being processed.",
+    ["method"],
+)
+
+CACHE_REQUESTS = Counter(
+    "titiler_cache_requests",
+    "HTTP cache results (`hit`: 304 or `X-Cache: HIT`, `miss`: validated response or `X-Cache: MISS`), by route template.",
+    ["route", "result"],
+)
+
+STAGE_LATENCY = Histogram(
+    "titiler_stage_duration_seconds",
+    "Image endpoints processing stages duration (seconds), by route template.",
+    ["route", "stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+READER_OPEN = Counter(
+    "titiler_reader_open",
+    "Number of readers (datasets or mosaic backends) opened by the endpoints, by route template.",
+    ["route"],
+)
+
+SOURCE_BYTES = Counter(
+    "titiler_source_bytes",
+    "Bytes fetched from data sources, by URL scheme.",
+    ["scheme"],
+)
+
+# Request being processed (copied to the threadpool workers)
+_request_scope: ContextVar[Optional[Scope]] = ContextVar(
+    "titiler_metrics_scope", default=None
+)
+
+
+class ThreadpoolCollector(Collector):
+    """Report the threadpool usage when the metrics are collected (scraped).
+
+    The threadpool limiter belongs to the event loop, it is registered by
+    `MetricsMiddleware` when processing requests.
+
+    """
+
+    def __init__(self) -> None:
+        """Init collector."""
+        self.limiter: Optional[CapacityLimiter] = None
+
+    def _metrics(self) -> Tuple[GaugeMetricFamily, GaugeMetricFamily]:
+        in_use = GaugeMetricFamily(
+            "titiler_threadpool_tokens_in_use",
+            "Number of worker threads in use (endpoints and dependencies running in the threadpool).",
+        )
+        size = GaugeMetricFamily(
+            "titiler_threadpool_tokens",
+            "Threadpool capacity (maximum number of worker threads).",
+        )
+        return in_use, size
+
+    def describe(self) -> Iterator[Metric]:
+        """Describe metrics."""
+        yield from self._metrics()
+
+    def collect(self) -> Iterator[Metric]:
+        """Collect metrics."""
+        if self.limiter is None:
+            return
+
+        in_use, size = self._metrics()
+        in_use.add_metric([], self.limiter.borrowed_tokens)
+        size.add_metric([], self.limiter.total_tokens)
+        yield in_use
+        yield size
+
+
+THREADPOOL = ThreadpoolCollector()
+REGISTRY.register(THREADPOOL)
+
+
+def get_route_template(scope: Scope) -> str:
+    """Return the matched route's path template (not the raw path, to keep metrics cardinality low)."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "unmatched"
+
+    return path
+
+
+def count_reader_open() -> None:
+    """Count a reader opened while processing the current request."""
+    scope = _request_scope.get()
+    route = get_route_template(scope) if scope is not None else "unmatched"
+    READER_OPEN.labels(route).inc()
+
+
+class MetricsMiddleware:
+    """MiddleWare to collect Prometheus metrics."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Init Middleware.
+
+        Args:
+            app (ASGIApp): starlette/FastAPI application.
+
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):  # noqa: C901
+        """Handle call."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start_time = time.perf_counter()
+        response: Dict = {"status": 500, "size": 0, "cache": None}
+
+        async def send_wrapper(message: Message):
+            """Send Message."""
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                headers = MutableHeaders(scope=message)
+                x_cache = headers.get("X-Cache", "").lower()
+                if message["status"] == 304 or x_cache == "hit":
+                    response["cache"] = "hit"
+                elif x_cache == "miss" or "ETag" in headers:
+                    response["cache"] = "miss"
+
+            elif message["type"] == "http.response.body":
+                response["size"] += len(message.get("body", b""))
+
+            await send(message)
+
+        THREADPOOL.limiter = to_thread.current_default_thread_limiter()
+        REQUESTS_IN_PROGRESS.labels(method).inc()
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_scope.reset(token)
+            REQUESTS_IN_PROGRESS.labels(method).dec()
+
+            route = get_route_template(scope)
+            REQUEST_LATENCY.labels(method, route, str(response["status"])).observe(
+                time.perf_counter() - start_time
+            )
+            RESPONSE_SIZE.labels(method, route).observe(response["size"])
+
+            if response["cache"]:
+                CACHE_REQUESTS.labels(route, response["cache"]).inc()
+
+            timings: Optional[Timings] = (scope.get("state") or {}).get("timings")
+            if timings is not None:
+                for stage, duration in timings.as_dict().items():
+                    STAGE_LATENCY.labels(route, stage).observe(duration / 1000)
+
+
+def metrics_endpoint(request: Request) -> Response:
+    """Return Prometheus metrics."""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
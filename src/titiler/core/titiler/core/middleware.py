@@ -1,17 +1,75 @@
 """Titiler middlewares."""
 
+import itertools
+import json
 import logging
+import os
 import re
+import sys
+import threading
 import time
 import urllib.parse
-from typing import Optional, Set
-
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import partial, wraps
+from types import FrameType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from anyio import to_thread
 from fastapi.logger import logger
 from starlette.datastructures import MutableHeaders
 from starlette.requests import Request
 from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 
+@dataclass
+class CachePolicy:
+    """Cache-Control policy.
+
+    Attributes:
+        max_age (int, optional): `max-age` directive (seconds).
+        s_maxage (int, optional): `s-maxage` directive (seconds), used by shared caches (CDN).
+        stale_while_revalidate (int, optional): `stale-while-revalidate` directive (seconds).
+        stale_if_error (int, optional): `stale-if-error` directive (seconds).
+        public (bool): add `public` directive. Defaults to `True`.
+
+    """
+
+    max_age: Optional[int] = None
+    s_maxage: Optional[int] = None
+    stale_while_revalidate: Optional[int] = None
+    stale_if_error: Optional[int] = None
+    public: bool = True
+
+    def __str__(self) -> str:
+        """Return Cache-Control header value."""
+        directives = ["public"] if self.public else []
+        for name, value in [
+            ("max-age", self.max_age),
+            ("s-maxage", self.s_maxage),
+            ("stale-while-revalidate", self.stale_while_revalidate),
+            ("stale-if-error", self.stale_if_error),
+        ]:
+            if value is not None:
+                directives.append(f"{name}={value}")
+
+        return ", ".join(directives)
+
+
 class CacheControlMiddleware:
     """MiddleWare to add CacheControl in response headers."""
 
@@ -21,6 +79,7 @@ class CacheControlMiddleware:
         cachecontrol: Optional[str] = None,
         cachecontrol_max_http_code: Optional[int] = 500,
         exclude_path: Optional[Set[str]] = None,
+        policies: Optional[Mapping[str, Union[str, CachePolicy, None]]] = None,
     ) -> None:
         """Init Middleware.
 
@@ -28,12 +87,35 @@ class CacheControlMiddleware:
             app (ASGIApp): starlette/FastAPI application.
             cachecontrol (str): Cache-Control string to add to the response.
             exclude_path (set): Set of regex expression to use to filter the path.
+            policies (dict): Route name to Cache-Control policy (`str` or `CachePolicy`) mapping. Policies take precedence over `cachecontrol`, a `None` policy disables the header for the route.
 
         """
         self.app = app
         self.cachecontrol = cachecontrol
         self.cachecontrol_max_http_code = cachecontrol_max_http_code
         self.exclude_path = exclude_path or set()
+        self.policies = {
+            name: str(policy) if policy is not None else None
+            for name, policy in (policies or {}).items()
+        }
+
+        self._exclude_regex = (
+            re.compile("|".join(f"(?:{path})" for path in sorted(self.exclude_path)))
+            if self.exclude_path
+            else None
+        )
+
+    def get_cachecontrol(self, scope: Scope) -> Optional[str]:
+        """Get Cache-Control value for the matched route."""
+        if self._exclude_regex and self._exclude_regex.match(scope["path"]):
+            return None
+
+        route = scope.get("route")
+        name = getattr(route, "name", None)
+        if name is not None and name in self.policies:
+            return self.policies[name]
+
+        return self.cachecontrol
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Handle call."""
@@ -45,18 +127,13 @@ class CacheControlMiddleware:
             """Send Message."""
             if message["type"] == "http.response.start":
                 response_headers = MutableHeaders(scope=message)
-                if self.cachecontrol and not response_headers.get("Cache-Control"):
-                    if (
-                        scope["method"] in ["HEAD", "GET"]
-                        and message["status"] < self.cachecontrol_max_http_code
-                        and not any(
-                            [
-                                re.match(path, scope["path"])
-                                for path in self.exclude_path
-                            ]
-                        )
-                    ):
-                        response_headers["Cache-Control"] = self.cachecontrol
+                if (
+                    scope["method"] in ["HEAD", "GET"]
+                    and message["status"] < self.cachecontrol_max_http_code
+                    and not response_headers.get("Cache-Control")
+                ):
+                    if cachecontrol := self.get_cachecontrol(scope):
+                        response_headers["Cache-Control"] = cachecontrol
 
             await send(message)
 
@@ -138,6 +215,323 @@ class LoggerMiddleware:
         await self.app(scope, receive, send)
 
 
+T = TypeVar("T")
+
+# (function name, filename, first line number)
+FrameKey = Tuple[str, str, int]
+
+_profile_session: ContextVar[Optional["_ProfileSession"]] = ContextVar(
+    "titiler_profile_session", default=None
+)
+
+
+class _ProfileSession:
+    """Stack samples of one profiled request."""
+
+    def __init__(self, frame: FrameType, max_samples: int) -> None:
+        self.frame = frame
+        self.max_samples = max_samples
+        self.samples: List[Tuple[int, Tuple[FrameKey, ...]]] = []
+        self.threads: Set[int] = set()
+
+
+@contextmanager
+def profile_thread() -> Iterator[None]:
+    """Attribute the current thread stacks to the profiled request of the current context.
+
+    Threadpool workers run in a copy of the request context, so a function running
+    in a worker can register the worker with the request being profiled (if any).
+
+    """
+    session = _profile_session.get()
+    ident = threading.get_ident()
+    if session is None or ident in session.threads:
+        yield
+        return
+
+    session.threads.add(ident)
+    try:
+        yield
+    finally:
+        session.threads.discard(ident)
+
+
+def profiled(func: Callable[..., T]) -> Callable[..., T]:
+    """Wrap a function to run in the threadpool with `profile_thread`."""
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        with profile_thread():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class _StackSampler(threading.Thread):
+    """Background thread sampling the Python stacks of the threads processing profiled requests.
+
+    One sampler is shared by all the requests profiled by a middleware and only samples
+    while at least one request is profiled. A stack is attributed to a request when it goes
+    through the request's middleware frame (event loop thread) or when the thread has been
+    registered with the request (threadpool workers, see `profile_thread`).
+
+    """
+
+    def __init__(self, interval: float) -> None:
+        super().__init__(name="titiler-profiler", daemon=True)
+        self.interval = interval
+        self.sessions: Set[_ProfileSession] = set()
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+
+    def add(self, session: _ProfileSession) -> None:
+        """Start sampling a request."""
+        with self._lock:
+            self.sessions.add(session)
+            self._active.set()
+
+    def remove(self, session: _ProfileSession) -> None:
+        """Stop sampling a request."""
+        with self._lock:
+            self.sessions.discard(session)
+            if not self.sessions:
+                self._active.clear()
+
+    def _owner(
+        self, thread_id: int, frames: List[FrameType], sessions: Set[_ProfileSession]
+    ) -> Optional[_ProfileSession]:
+        """Find the profiled request a thread stack (leaf -> root) belongs to."""
+        for session in sessions:
+            if thread_id in session.threads:
+                return session
+
+        request_frames = {session.frame: session for session in sessions}
+        for f in frames:
+            if f in request_frames:
+                return request_frames[f]
+
+        return None
+
+    def run(self) -> None:
+        """Sample stacks while requests are profiled."""
+        ident = threading.get_ident()
+        while self._active.wait():
+            time.sleep(self.interval)
+            with self._lock:
+                sessions = set(self.sessions)
+
+            if not sessions:
+                continue
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == ident:
+                    continue
+
+                frames: List[FrameType] = []
+                f: Optional[FrameType] = frame
+                while f is not None:
+                    frames.append(f)
+                    f = f.f_back
+
+                owner = self._owner(thread_id, frames, sessions)
+                if owner is None or len(owner.samples) >= owner.max_samples:
+                    continue
+
+                # root -> leaf
+                stack = tuple(
+                    (f.f_code.co_name, f.f_code.co_filename, f.f_code.co_firstlineno)
+                    for f in reversed(frames)
+                )
+                owner.samples.append((thread_id, stack))
+
+
+class ProfilerMiddleware:
+    """MiddleWare to profile slow requests using a sampling profiler.
+
+    Python stacks of the threads processing a profiled request (event loop and threadpool
+    workers registered with `profile_thread`, e.g. endpoints of routes passed to
+    `titiler.core.routing.add_route_profiling`) are sampled every `interval` seconds. If the request takes more than
+    `threshold` seconds, the profile is written to `output_dir` in `speedscope` (https://www.speedscope.app)
+    or `collapsed` (flamegraph.pl) format, tagged with the route and query parameters.
+
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        output_dir: str = ".",
+        threshold: float = 1.0,
+        sample_rate: int = 100,
+        interval: float = 0.005,
+        max_samples: int = 10000,
+        output_format: Literal["speedscope", "collapsed"] = "speedscope",
+    ) -> None:
+        """Init Middleware.
+
+        Args:
+            app (ASGIApp): starlette/FastAPI application.
+            output_dir (str): Directory where to write the profiles. Defaults to current directory.
+            threshold (float): Minimum request duration (in seconds) to write the profile. Defaults to 1.
+            sample_rate (int): Profile one request every `sample_rate` requests. Defaults to 100.
+            interval (float): Sampling interval (in seconds). Defaults to 0.005.
+            max_samples (int): Maximum number of stacks recorded per request. Defaults to 10000.
+            output_format (str): Profile format, `speedscope` or `collapsed`. Defaults to `speedscope`.
+
+        """
+        self.app = app
+        self.output_dir = output_dir
+        self.threshold = threshold
+        self.sample_rate = max(sample_rate, 1)
+        self.interval = interval
+        self.max_samples = max_samples
+        self.output_format = output_format
+        self._counter = itertools.count()
+        self._sampler: Optional[_StackSampler] = None
+        self._sampler_lock = threading.Lock()
+
+    @property
+    def sampler(self) -> _StackSampler:
+        """Shared stack sampler (started on first use)."""
+        with self._sampler_lock:
+            if self._sampler is None:
+                self._sampler = _StackSampler(self.interval)
+                self._sampler.start()
+
+            return self._sampler
+
+    def _speedscope(
+        self,
+        samples: List[Tuple[int, Tuple[FrameKey, ...]]],
+        name: str,
+        duration: float,
+    ) -> str:
+        """Create speedscope profile."""
+        frames: List[Dict] = []
+        frame_index: Dict[FrameKey, int] = {}
+        threads: Dict[int, List[List[int]]] = {}
+        for thread_id, stack in samples:
+            indexes = []
+            for key in stack:
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                indexes.append(frame_index[key])
+
+            threads.setdefault(thread_id, []).append(indexes)
+
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        interval = self.interval * 1000
+        profiles = [
+            {
+                "type": "sampled",
+                "name": f"{thread_names.get(thread_id, thread_id)}",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": len(stacks) * interval,
+                "samples": stacks,
+                "weights": [interval] * len(stacks),
+            }
+            for thread_id, stacks in threads.items()
+        ]
+
+        return json.dumps(
+            {
+                "$schema": "https://www.speedscope.app/file-format-schema.json",
+                "name": f"{name} ({duration * 1000:.0f} ms)",
+                "exporter": "titiler",
+                "activeProfileIndex": 0,
+                "shared": {"frames": frames},
+                "profiles": profiles,
+            }
+        )
+
+    def _collapsed(
+        self,
+        samples: List[Tuple[int, Tuple[FrameKey, ...]]],
+        name: str,
+    ) -> str:
+        """Create collapsed stacks profile (request name is used as root frame)."""
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        counts: Dict[str, int] = {}
+        for thread_id, stack in samples:
+            line = ";".join(
+                [name, str(thread_names.get(thread_id, thread_id))]
+                + [f"{n} ({os.path.basename(f)}:{ln})" for (n, f, ln) in stack]
+            )
+            counts[line] = counts.get(line, 0) + 1
+
+        return "\n".join(f"{line} {count}" for line, count in counts.items())
+
+    def _write(
+        self,
+        filename: str,
+        samples: List[Tuple[int, Tuple[FrameKey, ...]]],
+        name: str,
+        duration: float,
+    ) -> None:
+        """Create and write profile file."""
+        content = (
+            self._speedscope(samples, name, duration)
+            if self.output_format == "speedscope"
+            else self._collapsed(samples, name)
+        )
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, filename), "w") as f:
+            f.write(content)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """Handle call."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        count = next(self._counter)
+        if count % self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        sampler = self.sampler
+        session = _ProfileSession(sys._getframe(), self.max_samples)
+        token = _profile_session.set(session)
+        start_time = time.perf_counter()
+        sampler.add(session)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.remove(session)
+            _profile_session.reset(token)
+            duration = time.perf_counter() - start_time
+
+            if duration >= self.threshold and session.samples:
+                request = Request(scope)
+                route = scope.get("route")
+                route_name = getattr(route, "name", None) or "unmatched"
+                name = f"{request.method} {getattr(route, 'path', request.url.path)}"
+                if request.url.query:
+                    name += f"?{request.url.query}"
+
+                suffix = (
+                    "speedscope.json" if self.output_format == "speedscope" else "txt"
+                )
+                filename = f"{time.time():.0f}-{count}-{route_name}-{duration * 1000:.0f}ms.{suffix}"
+                await to_thread.run_sync(
+                    partial(self._write, filename, session.samples, name, duration)
+                )
+
+                logger.warning(
+                    json.dumps(
+                        {
+                            "message": "slow request profiled",
+                            "route": route_name,
+                            "path": request.url.path,
+                            "query": str(request.query_params),
+                            "duration": round(duration, 3),
+                            "profile": os.path.join(self.output_dir, filename),
+                        }
+                    )
+                )
+
+
 class LowerCaseQueryStringMiddleware:
     """Middleware to make URL parameters case-insensitive.
     taken from: https://github.com/tiangolo/fastapi/issues/826
@@ -0,0 +1,27 @@
+"""TiTiler request models."""
+
+from typing import List, Union
+
+from geojson_pydantic.features import Feature, FeatureCollection
+from geojson_pydantic.geometries import LineString, MultiPoint, Point
+from pydantic import BaseModel, Field, model_validator
+
+
+class PointsCoordinates(BaseModel):
+    """Points coordinates arrays."""
+
+    lon: List[float] = Field(min_length=1)
+    lat: List[float] = Field(min_length=1)
+
+    @model_validator(mode="after")
+    def check_length(self):
+        """Check arrays length."""
+        if len(self.lon) != len(self.lat):
+            raise ValueError("`lon` and `lat` must have the same length")
+
+        return self
+
+
+PointsBody = Union[FeatureCollection, Feature, MultiPoint, Point, PointsCoordinates]
+
+ProfileBody = Union[Feature, LineString]
@@ -23,6 +23,33 @@ class Point(BaseModel):
     band_names: List[str]
 
 
+class Points(BaseModel):
+    """
+    Points model.
+
+    response model for `/points` endpoints (`null` values for points outside the dataset)
+
+    """
+
+    coordinates: List[List[float]]
+    values: List[List[Optional[float]]]
+    band_names: List[str]
+
+
+class Profile(BaseModel):
+    """
+    Profile model.
+
+    response model for `/profile` endpoints (distances from the start of the line)
+
+    """
+
+    coordinates: List[List[float]]
+    distances: List[float]
+    values: List[List[Optional[float]]]
+    band_names: List[str]
+
+
 InfoGeoJSON = Feature[Union[Polygon, MultiPolygon], Info]
 Statistics = Dict[str, BandStatistics]
 
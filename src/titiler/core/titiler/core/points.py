@@ -0,0 +1,265 @@
+"""titiler.core points and line profile values."""
+
+import math
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy
+from geojson_pydantic.features import Feature, FeatureCollection
+from geojson_pydantic.geometries import MultiPoint, Point
+from rasterio.crs import CRS
+from rasterio.transform import rowcol
+from rasterio.warp import transform as transform_coords
+from rasterio.windows import Window
+from rio_tiler.constants import WGS84_CRS
+from rio_tiler.errors import PointOutsideBounds
+from rio_tiler.io import Reader
+
+from titiler.core.arrays import encode_array
+from titiler.core.errors import BadRequestError
+from titiler.core.models.requests import PointsBody, PointsCoordinates
+from titiler.core.resources.enums import ArrayCompression, MediaType, PointsFormat
+
+
+class PointsValues(NamedTuple):
+    """Values of multiple points.
+
+    Attributes:
+        values (numpy.ma.MaskedArray): Values array (bands, points). Points outside the dataset are masked.
+        band_names (list): Band names.
+        outside (numpy.ndarray): Points outside the dataset.
+
+    """
+
+    values: numpy.ma.MaskedArray
+    band_names: List[str]
+    outside: numpy.ndarray
+
+
+def read_points(
+    src_dst: Any,
+    coordinates: Sequence[Tuple[float, float]],
+    coord_crs: CRS = WGS84_CRS,
+    **kwargs: Any,
+) -> PointsValues:
+    """Read the values of multiple points.
+
+    With rasterio readers (`rio_tiler.io.Reader`), points are grouped by the dataset's
+    internal blocks and each block is read once (with the reader's `read` method, at
+    full resolution). Other readers (or interpolated values) read points one by one
+    with the reader's `point` method.
+
+    Raises `PointOutsideBounds` when all the points are outside the dataset.
+
+    """
+    if not isinstance(src_dst, Reader) or kwargs.get("interpolate"):
+        return _read_points_one_by_one(src_dst, coordinates, coord_crs, **kwargs)
+
+    dataset = src_dst.dataset
+    lons, lats = (numpy.asarray(v, dtype="float64") for v in zip(*coordinates))
+    xs, ys = lons, lats
+    if coord_crs != dataset.crs:
+        xs, ys = (
+            numpy.asarray(v)
+            for v in transform_coords(coord_crs, dataset.crs, lons, lats)
+        )
+
+    # Same rules as rio-tiler's `point` (strictly inside the bounds, nearest pixel)
+    left, bottom, right, top = dataset.bounds
+    bottom, top = min(bottom, top), max(bottom, top)
+    rows, cols = (
+        numpy.asarray(v, dtype="int64") for v in rowcol(dataset.transform, xs, ys)
+    )
+    outside = ~(
+        (left < xs)
+        & (xs < right)
+        & (bottom < ys)
+        & (ys < top)
+        & (rows >= 0)
+        & (rows < dataset.height)
+        & (cols >= 0)
+        & (cols < dataset.width)
+    )
+    inside = numpy.flatnonzero(~outside)
+    if not len(inside):
+        raise PointOutsideBounds("All points are outside dataset bounds")
+
+    block_height, block_width = dataset.block_shapes[0]
+    block_rows, block_cols = rows[inside] // block_height, cols[inside] // block_width
+    blocks = block_rows * (dataset.width // block_width + 1) + block_cols
+    order = numpy.argsort(blocks, kind="stable")
+    groups = numpy.split(order, numpy.flatnonzero(numpy.diff(blocks[order])) + 1)
+
+    values: Optional[numpy.ma.MaskedArray] = None
+    band_names: List[str] = []
+    for group in groups:
+        row_off = int(block_rows[group[0]]) * block_height
+        col_off = int(block_cols[group[0]]) * block_width
+        window = Window(
+            col_off,
+            row_off,
+            min(block_width, dataset.width - col_off),
+            min(block_height, dataset.height - row_off),
+        )
+        image = src_dst.read(window=window, **kwargs)
+        if values is None:
+            band_names = image.band_names or []
+            values = numpy.ma.masked_all(
+                (image.count, len(coordinates)), dtype=image.array.dtype
+            )
+
+        points = inside[group]
+        values[:, points] = image.array[
+            :, rows[points] - row_off, cols[points] - col_off
+        ]
+
+    return PointsValues(values, band_names, outside)  # type: ignore
+
+
+def _read_points_one_by_one(
+    src_dst: Any,
+    coordinates: Sequence[Tuple[float, float]],
+    coord_crs: CRS,
+    **kwargs: Any,
+) -> PointsValues:
+    """Read points with the reader's `point` method."""
+    points: List[Optional[numpy.ma.MaskedArray]] = []
+    band_names: List[str] = []
+    for lon, lat in coordinates:
+        try:
+            pt = src_dst.point(lon, lat, coord_crs=coord_crs, **kwargs)
+        except PointOutsideBounds:
+            points.append(None)
+            continue
+
+        band_names = pt.band_names
+        points.append(pt.array)
+
+    outside = numpy.array([pt is None for pt in points])
+    if outside.all():
+        raise PointOutsideBounds("All points are outside dataset bounds")
+
+    first = next(pt for pt in points if pt is not None)
+    values = numpy.ma.masked_all((len(first), len(points)), dtype=first.dtype)
+    for i, pt in enumerate(points):
+        if pt is not None:
+            values[:, i] = pt
+
+    return PointsValues(values, band_names, outside)
+
+
+def points_coordinates(body: PointsBody) -> List[Tuple[float, float]]:
+    """Points coordinates from a `/points` request body."""
+    if isinstance(body, PointsCoordinates):
+        return list(zip(body.lon, body.lat))
+
+    if isinstance(body, FeatureCollection):
+        geometries = [feature.geometry for feature in body.features]
+    elif isinstance(body, Feature):
+        geometries = [body.geometry]
+    else:
+        geometries = [body]
+
+    coordinates: List[Tuple[float, float]] = []
+    for geometry in geometries:
+        if isinstance(geometry, Point):
+            coordinates.append((geometry.coordinates[0], geometry.coordinates[1]))
+        elif isinstance(geometry, MultiPoint):
+            coordinates.extend((c[0], c[1]) for c in geometry.coordinates)
+        else:
+            raise BadRequestError("Only Point and MultiPoint geometries are supported")
+
+    if not coordinates:
+        raise BadRequestError("No point coordinates")
+
+    return coordinates
+
+
+def sample_line(
+    coordinates: Sequence[Sequence[float]],
+    samples: Optional[int] = None,
+    spacing: Optional[float] = None,
+    geographic: bool = True,
+    max_samples: Optional[int] = None,
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Sample positions along a line.
+
+    Args:
+        coordinates (sequence): Line vertices.
+        samples (int, optional): Number of samples (including both ends).
+        spacing (float, optional): Distance between samples (the last vertex is always added).
+        geographic (bool): Coordinates are longitude/latitude and distances are in meters
+            (great-circle distances); otherwise distances are in the coordinates units.
+        max_samples (int, optional): Maximum number of samples, checked before sampling
+            the line (raises a `BadRequestError`).
+
+    Returns:
+        tuple: Samples coordinates `(n, 2)` and distances from the start of the line `(n,)`.
+
+    """
+    vertices = numpy.asarray(coordinates, dtype="float64")[:, :2]
+    if geographic:
+        lon, lat = numpy.radians(vertices[:, 0]), numpy.radians(vertices[:, 1])
+        a = (
+            numpy.sin(numpy.diff(lat) / 2) ** 2
+            + numpy.cos(lat[:-1])
+            * numpy.cos(lat[1:])
+            * numpy.sin(numpy.diff(lon) / 2) ** 2
+        )
+        lengths = 2 * 6371008.8 * numpy.arcsin(numpy.sqrt(numpy.clip(a, 0, 1)))
+    else:
+        lengths = numpy.hypot(*numpy.diff(vertices, axis=0).T)
+
+    cumulative = numpy.concatenate([[0], numpy.cumsum(lengths)])
+    total = float(cumulative[-1])
+    count = math.ceil(total / spacing) + 1 if spacing else samples or 2
+    if max_samples and count > max_samples:
+        raise BadRequestError(f"Too many samples: {count} (maximum: {max_samples})")
+
+    if spacing:
+        distances = numpy.append(numpy.arange(0, total, spacing), total)
+    else:
+        distances = numpy.linspace(0, total, count)
+
+    segment = numpy.clip(
+        numpy.searchsorted(cumulative, distances, side="right") - 1,
+        0,
+        len(lengths) - 1,
+    )
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        ratio = numpy.where(
+            lengths[segment] > 0,
+            (distances - cumulative[segment]) / lengths[segment],
+            0,
+        )
+
+    start, end = vertices[segment], vertices[segment + 1]
+    return start + (end - start) * ratio[:, numpy.newaxis], distances
+
+
+def render_points(
+    points: PointsValues,
+    output_format: PointsFormat = PointsFormat.json,
+    coordinates: Optional[Sequence[Tuple[float, float]]] = None,
+    compression: Optional[ArrayCompression] = None,
+) -> Union[Dict, Tuple[bytes, str]]:
+    """Encode points values as a JSON document or as a binary array.
+
+    The `bin` format (see `titiler.core.arrays`) holds a `(bands, 1, points)` array and
+    a mask (`0` for points outside the dataset or masked in all the bands).
+
+    """
+    values = points.values
+    if output_format == PointsFormat.bin:
+        mask = ~numpy.ma.getmaskarray(values).all(axis=0)
+        content = encode_array(
+            numpy.ma.getdata(values)[:, numpy.newaxis, :],
+            (mask * 255).astype("uint8")[numpy.newaxis, :],
+            compression=compression or ArrayCompression.none,
+        )
+        return content, MediaType.bin.value
+
+    return {
+        "coordinates": [list(c) for c in coordinates or []],
+        "values": values.T.tolist(),
+        "band_names": points.band_names,
+    }
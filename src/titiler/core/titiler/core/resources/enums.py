@@ -5,11 +5,20 @@ from types import DynamicClassAttribute
 
 from rio_tiler.profiles import img_profiles
 
+# COG driver creation options (tiled, compressed, with internal overviews)
+cog_profile = {
+    "compress": "DEFLATE",
+    "blocksize": 512,
+    "overviews": "AUTO",
+    "bigtiff": "IF_SAFER",
+}
+
 
 class MediaType(str, Enum):
     """Responses Media types formerly known as MIME types."""
 
     tif = "image/tiff; application=geotiff"
+    cog = "image/tiff; application=geotiff; profile=cloud-optimized"
     jp2 = "image/jp2"
     png = "image/png"
     pngraw = "image/png"
@@ -17,6 +26,7 @@ class MediaType(str, Enum):
     jpg = "image/jpg"
     webp = "image/webp"
     npy = "application/x-binary"
+    bin = "application/octet-stream"
     xml = "application/xml"
     json = "application/json"
     geojson = "application/geo+json"
@@ -31,6 +41,8 @@ class MediaType(str, Enum):
     openapi30_json = "application/vnd.oai.openapi+json;version=3.0"
     openapi30_yaml = "application/vnd.oai.openapi;version=3.0"
     gif = "image/gif"
+    pmtiles = "application/vnd.pmtiles"
+    mbtiles = "application/vnd.sqlite3"
 
 
 class ImageDriver(str, Enum):
@@ -41,9 +53,11 @@ class ImageDriver(str, Enum):
     png = "PNG"
     pngraw = "PNG"
     tif = "GTiff"
+    cog = "COG"
     webp = "WEBP"
     jp2 = "JP2OpenJPEG"
     npy = "NPY"
+    bin = "BIN"
     gif = "GIF"
 
 
@@ -53,15 +67,20 @@ class ImageType(str, Enum):
     png = "png"
     npy = "npy"
     tif = "tif"
+    cog = "cog"
     jpeg = "jpeg"
     jpg = "jpg"
     jp2 = "jp2"
     webp = "webp"
     pngraw = "pngraw"
+    bin = "bin"
 
     @DynamicClassAttribute
     def profile(self):
         """Return rio-tiler image default profile."""
+        if self._name_ == "cog":
+            return cog_profile.copy()
+
         return img_profiles.get(self._name_, {})
 
     @DynamicClassAttribute
@@ -75,6 +94,29 @@ class ImageType(str, Enum):
         return MediaType[self._name_].value
 
 
+class CoverageMethod(str, Enum):
+    """Pixels coverage methods for feature statistics."""
+
+    exact = "exact"
+    centroid = "centroid"
+
+
+class PointsFormat(str, Enum):
+    """Available `/points` output formats."""
+
+    json = "json"
+    bin = "bin"
+
+
+class ArrayCompression(str, Enum):
+    """`bin` output format compression."""
+
+    none = "none"
+    zlib = "zlib"
+    zstd = "zstd"
+    lz4 = "lz4"
+
+
 class OptionalHeader(str, Enum):
     """Optional Header to add in responses."""
 
@@ -1,5 +1,6 @@
 """Custom routing classes."""
 
+import asyncio
 import warnings
 from typing import Callable, Dict, List, Optional, Type
 
@@ -12,6 +13,8 @@ from starlette.responses import Response
 from starlette.routing import BaseRoute, Match
 from typing_extensions import TypedDict
 
+from titiler.core.middleware import profiled
+
 
 def apiroute_factory(env: Optional[Dict] = None) -> Type[APIRoute]:
     """
@@ -91,3 +94,23 @@ def add_route_dependencies(
             # https://github.com/tiangolo/fastapi/blob/58ab733f19846b4875c5b79bfb1f4d1cb7f4823f/fastapi/applications.py#L337-L360
             # https://github.com/tiangolo/fastapi/blob/58ab733f19846b4875c5b79bfb1f4d1cb7f4823f/fastapi/routing.py#L677-L678
             route.dependencies.extend(dependencies)  # type: ignore
+
+
+def add_route_profiling(routes: List[BaseRoute]):
+    """Register the threadpool workers running the endpoints with `ProfilerMiddleware`.
+
+    FastAPI runs the synchronous endpoints in the threadpool. Wrapping the endpoints with
+    `titiler.core.middleware.profiled` attributes the workers' stacks to the profiled
+    request (asynchronous endpoints run in the event loop and are always profiled).
+
+    """
+    for route in routes:
+        if not isinstance(route, APIRoute):
+            continue
+
+        # The request handler calls `dependant.call` when the request is processed
+        call = route.dependant.call
+        if call is None or asyncio.iscoroutinefunction(call):
+            continue
+
+        route.dependant.call = profiled(call)
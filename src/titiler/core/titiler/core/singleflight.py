@@ -0,0 +1,56 @@
+"""titiler.core single-flight (coalescing of concurrent identical calls)."""
+
+import asyncio
+from typing import Callable, Dict, Hashable, Tuple, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent calls sharing the same key (*single-flight*).
+
+    While a call for a given key is in flight, other calls with the same key await
+    it and share its result (or exception) instead of running the function again.
+    Results are not cached: a call starting after the in-flight one has finished runs
+    the function again.
+
+    Coalescing happens in the event loop: the function runs once in the threadpool
+    and waiting calls do not hold a threadpool worker. Cancelling a waiting call
+    (e.g. client disconnection) does not cancel the in-flight call.
+
+    """
+
+    def __init__(self) -> None:
+        """Init in-flight calls registry."""
+        self._flights: Dict[
+            Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Future
+        ] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Call `fn` in the threadpool (or await the in-flight call for `key`).
+
+        Returns:
+            tuple: `fn` result and whether the result was shared with an in-flight call.
+
+        """
+        # Futures can only be awaited in their event loop
+        flight_key = (asyncio.get_running_loop(), key)
+
+        flight = self._flights.get(flight_key)
+        if flight is not None:
+            return await asyncio.shield(flight), True
+
+        flight = asyncio.ensure_future(run_in_threadpool(fn))
+        self._flights[flight_key] = flight
+
+        def _done(future: asyncio.Future) -> None:
+            del self._flights[flight_key]
+            # mark the exception as retrieved (all the callers may have been cancelled)
+            if not future.cancelled():
+                future.exception()
+
+        flight.add_done_callback(_done)
+
+        return await asyncio.shield(flight), False
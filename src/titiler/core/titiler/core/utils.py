@@ -1,17 +1,84 @@
 """titiler.core utilities."""
 
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.request
 import warnings
-from typing import Any, Optional, Sequence, Tuple, Union
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+from urllib.parse import urlparse
 
 import numpy
+import rasterio
+from rasterio.crs import CRS
 from rasterio.dtypes import dtype_ranges
+from rasterio.enums import ColorInterp
+from rasterio.errors import NotGeoreferencedWarning
+from rasterio.features import rasterize
+from rasterio.shutil import copy
+from rasterio.warp import transform_bounds, transform_geom
+from rasterio.windows import Window
 from rio_tiler.colormap import apply_cmap
 from rio_tiler.errors import InvalidDatatypeWarning
 from rio_tiler.models import ImageData
 from rio_tiler.types import ColorMapType, IntervalTuple
 from rio_tiler.utils import linear_rescale, render
 
-from titiler.core.resources.enums import ImageType
+from titiler.core.arrays import encode_array
+from titiler.core.resources.enums import ArrayCompression, ImageType
+
+
+class Timings:
+    """Processing stages timer (used to build `Server-Timing` header).
+
+    Stages are recorded as *laps*: each call to `lap(name)` records the time
+    elapsed since the previous lap (or since the timer creation).
+
+    """
+
+    def __init__(self) -> None:
+        """Start the timer."""
+        self.stages: List[Tuple[str, float]] = []
+        self._last = time.perf_counter()
+
+    def lap(self, name: str) -> float:
+        """Record duration (in ms) of stage `name` since the previous lap."""
+        now = time.perf_counter()
+        duration = round((now - self._last) * 1000, 2)
+        self.stages.append((name, duration))
+        self._last = now
+        return duration
+
+    def as_dict(self) -> Dict[str, float]:
+        """Return stages durations (in ms), duplicated stages are summed."""
+        stages: Dict[str, float] = {}
+        for name, duration in self.stages:
+            stages[name] = round(stages.get(name, 0) + duration, 2)
+
+        return stages
+
+    def __str__(self) -> str:
+        """Return `Server-Timing` header value."""
+        return ", ".join(
+            f"{name};dur={duration}" for name, duration in self.as_dict().items()
+        )
 
 
 def rescale_array(
@@ -44,17 +111,43 @@ def rescale_array(
     return array.astype(out_dtype)
 
 
-def render_image(
+def render_image(  # noqa: C901
     image: ImageData,
     output_format: Optional[ImageType] = None,
     colormap: Optional[ColorMapType] = None,
     add_mask: bool = True,
+    timings: Optional[Timings] = None,
+    compression: Optional[ArrayCompression] = None,
     **kwargs: Any,
 ) -> Tuple[bytes, str]:
     """convert image data to file.
 
     This is adapted from https://github.com/cogeotiff/rio-tiler/blob/066878704f841a332a53027b74f7e0a97f10f4b2/rio_tiler/models.py#L698-L764
+
+    When `timings` is provided, `colormap` and `encode` stages are recorded.
+
+    The `bin` format (see `titiler.core.arrays`) is encoded directly from the image
+    buffers, optionally compressed with `compression`.
+
     """
+    if output_format == ImageType.bin:
+        data, mask = image.data, image.mask
+        if colormap:
+            data, alpha_from_cmap = apply_cmap(data, colormap)
+            mask = numpy.bitwise_and(alpha_from_cmap, mask)
+            if timings is not None:
+                timings.lap("colormap")
+
+        content = encode_array(
+            data,
+            mask if add_mask else None,
+            compression=compression or ArrayCompression.none,
+        )
+        if timings is not None:
+            timings.lap("encode")
+
+        return content, output_format.mediatype
+
     data, mask = image.data.copy(), image.mask.copy()
     datatype_range = image.dataset_statistics or (dtype_ranges[str(data.dtype)],)
 
@@ -63,6 +156,8 @@ def render_image(
         # Combine both Mask from dataset and Alpha band from Colormap
         mask = numpy.bitwise_and(alpha_from_cmap, mask)
         datatype_range = (dtype_ranges[str(data.dtype)],)
+        if timings is not None:
+            timings.lap("colormap")
 
     # If output_format is not set, we choose between JPEG and PNG
     if not output_format:
@@ -98,7 +193,7 @@ def render_image(
         data = rescale_array(data, mask, in_range=datatype_range)
 
     creation_options = {**kwargs, **output_format.profile}
-    if output_format == ImageType.tif:
+    if output_format in [ImageType.tif, ImageType.cog]:
         if "transform" not in creation_options:
             creation_options.update({"transform": image.transform})
         if "crs" not in creation_options and image.crs:
@@ -107,12 +202,288 @@ def render_image(
     if not add_mask:
         mask = None
 
-    return (
-        render(
-            data,
-            mask,
-            img_format=output_format.driver,
-            **creation_options,
-        ),
-        output_format.mediatype,
+    content = render(
+        data,
+        mask,
+        img_format=output_format.driver,
+        **creation_options,
     )
+    if timings is not None:
+        timings.lap("encode")
+
+    return content, output_format.mediatype
+
+
+def read_part_strips(
+    src_dst: Any,
+    bbox: Sequence[float],
+    width: int,
+    height: int,
+    bounds_crs: CRS,
+    dst_crs: Optional[CRS] = None,
+    shape: Optional[Dict] = None,
+    max_pixels: int = 4 * 1024 * 1024,
+    **kwargs: Any,
+) -> Iterator[ImageData]:
+    """Read a `width x height` part of a dataset as horizontal strips (top to bottom).
+
+    Each strip is read with the reader's `part` method (at most `max_pixels` pixels per
+    strip) on the output grid so strips can be written next to each other. When `shape`
+    (GeoJSON geometry) is provided, pixels outside the geometry are masked (as in the
+    reader's `feature` method).
+
+    """
+    dst_crs = dst_crs or bounds_crs
+    if bounds_crs != dst_crs:
+        bbox = transform_bounds(bounds_crs, dst_crs, *bbox, densify_pts=21)
+
+    if shape and bounds_crs != dst_crs:
+        shape = transform_geom(bounds_crs, dst_crs, shape)
+
+    minx, miny, maxx, maxy = bbox
+    yres = (maxy - miny) / height
+    rows = max(1, max_pixels // width)
+
+    for row in range(0, height, rows):
+        strip_height = min(rows, height - row)
+        strip_bbox = (
+            minx,
+            maxy - (row + strip_height) * yres,
+            maxx,
+            maxy - row * yres,
+        )
+        image = src_dst.part(
+            strip_bbox,
+            dst_crs=dst_crs,
+            bounds_crs=dst_crs,
+            width=width,
+            height=strip_height,
+            **kwargs,
+        )
+
+        if shape:
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", category=NotGeoreferencedWarning)
+                cutline_mask = rasterize(
+                    [shape],
+                    out_shape=(image.height, image.width),
+                    transform=image.transform,
+                    all_touched=True,
+                    default_value=0,
+                    fill=1,
+                    dtype="uint8",
+                ).astype("bool")
+
+            image.cutline_mask = cutline_mask
+            image.array.mask = numpy.where(~cutline_mask, image.array.mask, True)
+
+        yield image
+
+
+def render_geotiff(
+    images: Iterable[ImageData],
+    width: int,
+    height: int,
+    colormap: Optional[ColorMapType] = None,
+    add_mask: bool = True,
+    directory: Optional[str] = None,
+    cog: bool = False,
+    compression: Optional[ArrayCompression] = None,
+    **kwargs: Any,
+) -> BinaryIO:
+    """Write image strips (from `read_part_strips`) to a GeoTIFF file.
+
+    Strips are written as they are read, so memory usage does not depend on the output
+    size. The file is written in `directory` (defaults to the system's temporary
+    directory) and returned opened (and already unlinked).
+
+    When `cog` is True, strips are written to a tiled GeoTIFF which is then translated
+    to a Cloud Optimized GeoTIFF (with internal overviews).
+
+    `compression` (`bin` format option) is ignored.
+
+    """
+    paths: List[str] = []
+
+    def _tempfile() -> str:
+        fd, path = tempfile.mkstemp(suffix=".tif", dir=directory)
+        os.close(fd)
+        paths.append(path)
+        return path
+
+    creation_options = kwargs
+    if cog:
+        # creation options are applied to the COG
+        creation_options = {
+            "tiled": True,
+            "blockxsize": 512,
+            "blockysize": 512,
+            "bigtiff": "IF_SAFER",
+        }
+
+    path = _tempfile()
+
+    try:
+        with ExitStack() as stack:
+            stack.enter_context(warnings.catch_warnings())
+            warnings.filterwarnings("ignore", category=NotGeoreferencedWarning)
+
+            dst = None
+            row = 0
+            for image in images:
+                data, mask = image.data, image.mask
+                if colormap:
+                    data, alpha = apply_cmap(data, colormap)
+                    mask = numpy.bitwise_and(alpha, mask)
+
+                count = numpy.shape(data)[0]
+                if dst is None:
+                    # Output grid and datatype are defined by the first strip
+                    dst = stack.enter_context(
+                        rasterio.open(
+                            path,
+                            "w",
+                            driver="GTiff",
+                            dtype=data.dtype,
+                            count=count + 1 if add_mask else count,
+                            height=height,
+                            width=width,
+                            crs=image.crs,
+                            transform=image.transform,
+                            **creation_options,
+                        )
+                    )
+                    if add_mask:
+                        dst.colorinterp = *dst.colorinterp[:-1], ColorInterp.alpha
+
+                window = Window(0, row, width, image.height)
+                dst.write(data, indexes=list(range(1, count + 1)), window=window)
+                if add_mask:
+                    dst.write(
+                        mask.astype(data.dtype)[numpy.newaxis],
+                        indexes=[count + 1],
+                        window=window,
+                    )
+
+                row += image.height
+
+        if cog:
+            src_path, path = path, _tempfile()
+            copy(src_path, path, driver="COG", **{**kwargs, **ImageType.cog.profile})
+
+        output = open(path, "rb")
+
+    finally:
+        for p in paths:
+            os.remove(p)
+
+    return output
+
+
+def iter_file(f: BinaryIO, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """Iterate over a file content (and close it)."""
+    with f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+class SourceValidator(NamedTuple):
+    """Cheap dataset validator (used to build HTTP ETag/Last-Modified headers)."""
+
+    etag: Optional[str]
+    last_modified: Optional[datetime]
+
+
+def parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse HTTP date header."""
+    if not value:
+        return None
+
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+
+def _get_source_validator(src_path: str) -> Optional[SourceValidator]:
+    """Get source validator from file stat or object's metadata (without reading any data)."""
+    parsed = urlparse(src_path)
+
+    # Local files
+    if parsed.scheme in ["", "file"]:
+        path = parsed.path if parsed.scheme == "file" else src_path
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        return SourceValidator(
+            etag=f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+            last_modified=datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc),
+        )
+
+    # HTTP(S) files
+    if parsed.scheme in ["http", "https"]:
+        request = urllib.request.Request(src_path, method="HEAD")
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                headers = response.headers
+        except (urllib.error.URLError, OSError, ValueError):
+            return None
+
+        etag = headers.get("ETag")
+        last_modified = parse_http_date(headers.get("Last-Modified"))
+        if not etag and not last_modified:
+            return None
+
+        return SourceValidator(etag=etag, last_modified=last_modified)
+
+    # AWS S3 files
+    if parsed.scheme == "s3":
+        try:
+            import boto3
+        except ImportError:  # pragma: nocover
+            return None
+
+        try:
+            meta = boto3.client("s3").head_object(
+                Bucket=parsed.netloc, Key=parsed.path.lstrip("/")
+            )
+        except Exception:  # noqa
+            return None
+
+        return SourceValidator(
+            etag=meta.get("ETag"), last_modified=meta.get("LastModified")
+        )
+
+    return None
+
+
+@lru_cache(maxsize=512)
+def _get_cached_source_validator(
+    src_path: str, ttl_hash: int
+) -> Optional[SourceValidator]:
+    """Get source validator (cached for the time bucket defined by `ttl_hash`)."""
+    return _get_source_validator(src_path)
+
+
+def get_source_validator(src_path: Any, ttl: int = 60) -> Optional[SourceValidator]:
+    """Return dataset's etag/mtime.
+
+    Args:
+        src_path (any): Dataset path. Only `str` (local path, file://, http(s):// and s3:// urls) are supported.
+        ttl (int): Number of seconds the validator should be cached in memory. Defaults to 60.
+
+    Returns:
+        SourceValidator: dataset's etag and last modification date (or None if it cannot be determined).
+
+    """
+    if not isinstance(src_path, str):
+        return None
+
+    if not ttl:
+        return _get_source_validator(src_path)
+
+    return _get_cached_source_validator(src_path, int(time.time() // ttl))
@@ -0,0 +1,113 @@
+"""Test TiTiler archive extension."""
+
+import os
+import sqlite3
+from io import BytesIO
+
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from titiler.core.archives import (
+    deserialize_directory,
+    deserialize_header,
+    find_tile,
+    zxy_to_tileid,
+)
+from titiler.core.errors import DEFAULT_STATUS_CODES, add_exception_handlers
+from titiler.core.factory import TilerFactory
+from titiler.extensions import archiveExtension
+
+cog = os.path.join(os.path.dirname(__file__), "fixtures", "cog.tif")
+
+
+def test_archiveExtension(tmp_path):
+    """Test archiveExtension class."""
+    tiler = TilerFactory()
+    tiler_plus_archive = TilerFactory(extensions=[archiveExtension(max_tiles=50)])
+    # Check that we added one route (/archive.{archive_format})
+    assert len(tiler_plus_archive.router.routes) == len(tiler.router.routes) + 1
+
+    app = FastAPI()
+    app.include_router(tiler_plus_archive.router)
+    with TestClient(app) as client:
+        response = client.get(
+            "/archive.pmtiles", params={"url": cog, "minzoom": 5, "maxzoom": 7}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/vnd.pmtiles"
+        assert "tiles.pmtiles" in response.headers["content-disposition"]
+
+        data = response.content
+        header = deserialize_header(data[:127])
+        assert header.min_zoom == 5
+        assert header.max_zoom == 7
+        assert header.clustered
+
+        root = deserialize_directory(
+            data[header.root_offset : header.root_offset + header.root_length],
+            header.internal_compression,
+        )
+        # tiles are stored in the archive
+        tile_ids = [e.tile_id for e in root]
+        assert tile_ids == sorted(tile_ids)
+
+        entry = find_tile(root, zxy_to_tileid(7, 43, 24))
+        assert entry
+        offset = header.tile_data_offset + entry.offset
+        assert data[offset : offset + 4] == b"\x89PNG"
+
+        response = client.get(
+            "/archive.mbtiles",
+            params={
+                "url": cog,
+                "minzoom": 5,
+                "maxzoom": 6,
+                "tile_format": "webp",
+                "rescale": "0,1000",
+            },
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/vnd.sqlite3"
+
+        path = tmp_path / "tiles.mbtiles"
+        path.write_bytes(response.content)
+        with sqlite3.connect(path) as db:
+            metadata = dict(db.execute("SELECT name, value FROM metadata"))
+            assert metadata["format"] == "webp"
+            assert metadata["minzoom"] == "5"
+            (count,) = db.execute("SELECT count(*) FROM tiles").fetchone()
+            assert count
+            (tile,) = db.execute("SELECT tile_data FROM tiles LIMIT 1").fetchone()
+            assert BytesIO(tile).read(4) == b"RIFF"
+
+        # Too many tiles
+        response = client.get(
+            "/archive.pmtiles", params={"url": cog, "minzoom": 0, "maxzoom": 12}
+        )
+        assert response.status_code == 400
+
+        # Invalid zoom range
+        response = client.get(
+            "/archive.pmtiles", params={"url": cog, "minzoom": 6, "maxzoom": 5}
+        )
+        assert response.status_code == 400
+
+        # Invalid format
+        response = client.get("/archive.zip", params={"url": cog, "maxzoom": 5})
+        assert response.status_code == 422
+
+        # Invalid bbox
+        response = client.get(
+            "/archive.pmtiles", params={"url": cog, "maxzoom": 5, "bbox": "a,b,c,d"}
+        )
+        assert response.status_code == 400
+
+    add_exception_handlers(app, DEFAULT_STATUS_CODES)
+    with TestClient(app, raise_server_exceptions=False) as client:
+        # Rendering errors are returned before the archive is streamed
+        for archive_format in ["pmtiles", "mbtiles"]:
+            response = client.get(
+                f"/archive.{archive_format}",
+                params={"url": cog, "minzoom": 5, "maxzoom": 6, "expression": "b1/b3"},
+            )
+            assert response.status_code == 500
@@ -0,0 +1,197 @@
+"""Test TiTiler contours extension."""
+
+import os
+import struct
+
+import numpy
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from titiler.core.errors import (
+    DEFAULT_STATUS_CODES,
+    BadRequestError,
+    add_exception_handlers,
+)
+from titiler.core.factory import TilerFactory
+from titiler.extensions import contoursExtension
+from titiler.extensions.contours import contour_levels, contour_lines, encode_mvt
+
+cog = os.path.join(os.path.dirname(__file__), "fixtures", "cog.tif")
+
+
+def _read_varint(data: bytes, pos: int):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def _read_fields(data: bytes):
+    """Decode protobuf fields as (number, value) (bytes for length-delimited)."""
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        number, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire == 1:
+            value, pos = data[pos : pos + 8], pos + 8
+        else:
+            size, pos = _read_varint(data, pos)
+            value, pos = data[pos : pos + size], pos + size
+        yield number, value
+
+
+def _packed(data: bytes):
+    pos, values = 0, []
+    while pos < len(data):
+        value, pos = _read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def decode_mvt(content: bytes):
+    """Minimal MVT decoder (single layer, LineString features)."""
+    ((_, layer),) = list(_read_fields(content))
+    fields = list(_read_fields(layer))
+    keys = [v.decode() for n, v in fields if n == 3]
+    values = [
+        struct.unpack("<d", dict(_read_fields(v))[3])[0] for n, v in fields if n == 4
+    ]
+
+    features = []
+    for n, feature in fields:
+        if n != 2:
+            continue
+        feature = dict(_read_fields(feature))
+        tags = _packed(feature[2])
+        properties = {keys[k]: values[v] for k, v in zip(tags[::2], tags[1::2])}
+
+        lines, commands = [], _packed(feature[4])
+        x = y = i = 0
+        while i < len(commands):
+            command, count = commands[i] & 7, commands[i] >> 3
+            i += 1
+            if command == 1:
+                lines.append([])
+            for _ in range(count):
+                dx, dy = commands[i], commands[i + 1]
+                x += (dx >> 1) ^ -(dx & 1)
+                y += (dy >> 1) ^ -(dy & 1)
+                lines[-1].append((x, y))
+                i += 2
+        features.append((feature[3], properties, lines))
+
+    return {
+        "name": dict(fields)[1].decode(),
+        "version": dict(fields)[15],
+        "extent": dict(fields)[5],
+        "features": features,
+    }
+
+
+def test_contour_lines():
+    """Test marching squares contour lines."""
+    y, x = numpy.mgrid[0:64, 0:64]
+    data = numpy.ma.MaskedArray(numpy.hypot(x - 31.5, y - 31.5))
+
+    assert contour_levels(data, 10).tolist() == [10, 20, 30, 40]
+    assert contour_levels(data, 10, base=5).tolist() == [5, 15, 25, 35]
+    assert not len(contour_levels(numpy.ma.masked_all((4, 4)), 10))
+
+    # levels count is checked before creating the levels array
+    assert len(contour_levels(data, 10, max_levels=4)) == 4
+    with pytest.raises(BadRequestError):
+        contour_levels(data, 1e-12, max_levels=500)
+
+    # closed ring
+    (line,) = contour_lines(data, 10)
+    assert line.shape[1] == 2
+    numpy.testing.assert_array_equal(line[0], line[-1])
+    numpy.testing.assert_allclose(
+        numpy.hypot(line[:, 0] - 31.5, line[:, 1] - 31.5), 10, atol=0.05
+    )
+
+    # masked pixels split the ring in an open line
+    data[:, 40:] = numpy.ma.masked
+    lines = contour_lines(data, 10)
+    assert len(lines) == 1
+    assert lines[0][:, 0].max() <= 39
+    assert not numpy.array_equal(lines[0][0], lines[0][-1])
+
+    # saddle: two separate lines
+    saddle = numpy.ma.MaskedArray([[1.0, 0.0], [0.0, 1.0]])
+    assert len(contour_lines(saddle, 0.75)) == 2
+    assert len(contour_lines(saddle, 0.25)) == 2
+
+    assert contour_lines(data, 1000) == []
+
+
+def test_encode_mvt():
+    """Test MVT encoding."""
+    assert encode_mvt([]) == b""
+
+    lines = [
+        numpy.array([[0, 0], [10, 5], [10, -5]]),
+        numpy.array([[20, 20], [30, 20]]),
+    ]
+    tile = decode_mvt(encode_mvt([(lines, {"elevation": 100.5})], extent=512))
+    assert tile["name"] == "contours"
+    assert tile["version"] == 2
+    assert tile["extent"] == 512
+    ((geom_type, properties, decoded),) = tile["features"]
+    assert geom_type == 2
+    assert properties == {"elevation": 100.5}
+    assert decoded == [[(0, 0), (10, 5), (10, -5)], [(20, 20), (30, 20)]]
+
+
+def test_contoursExtension():
+    """Test contoursExtension class."""
+    tiler = TilerFactory()
+    tiler_plus_contours = TilerFactory(extensions=[contoursExtension()])
+    assert len(tiler_plus_contours.router.routes) == len(tiler.router.routes) + 1
+
+    app = FastAPI()
+    app.include_router(tiler_plus_contours.router)
+    add_exception_handlers(app, DEFAULT_STATUS_CODES)
+    with TestClient(app) as client:
+        response = client.get(
+            "/contours/WebMercatorQuad/8/87/49", params={"url": cog, "interval": 1000}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+        tile = decode_mvt(response.content)
+        assert tile["extent"] == 4096
+        elevations = [feat[1]["elevation"] for feat in tile["features"]]
+        assert elevations
+        assert all(e % 1000 == 0 for e in elevations)
+        for _, _, lines in tile["features"]:
+            for line in lines:
+                assert len(line) > 1
+                coords = numpy.array(line)
+                # lines extend in the buffer (2 pixels) around the tile
+                assert coords.min() >= -2 * 16
+                assert coords.max() <= 4096 + 2 * 16
+
+        response = client.get(
+            "/contours/WebMercatorQuad/8/87/49",
+            params={"url": cog, "interval": 1000, "base": 500, "tilesize": 512},
+        )
+        assert response.status_code == 200
+        tile = decode_mvt(response.content)
+        assert all(feat[1]["elevation"] % 1000 == 500 for feat in tile["features"])
+
+        response = client.get(
+            "/contours/WebMercatorQuad/8/87/49", params={"url": cog, "interval": 1}
+        )
+        assert response.status_code == 400
+
+        response = client.get(
+            "/contours/WebMercatorQuad/8/87/49", params={"url": cog, "interval": 0}
+        )
+        assert response.status_code == 422
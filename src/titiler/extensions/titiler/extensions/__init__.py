@@ -2,7 +2,9 @@
 
 __version__ = "0.19.2"
 
+from .archive import archiveExtension  # noqa
 from .cogeo import cogValidateExtension  # noqa
+from .contours import contoursExtension  # noqa
 from .stac import stacExtension  # noqa
 from .viewer import cogViewerExtension, stacViewerExtension  # noqa
 from .wms import wmsExtension  # noqa
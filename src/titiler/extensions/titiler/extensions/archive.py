@@ -0,0 +1,356 @@
+"""Tile archive (PMTiles/MBTiles) export Extension."""
+
+import copy
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack
+from enum import Enum
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    cast,
+)
+
+import morecantile
+import rasterio
+from attrs import define
+from fastapi import Depends, HTTPException, Query
+from rio_tiler.constants import WGS84_CRS
+from rio_tiler.errors import EmptyMosaicError, TileOutsideBounds
+from rio_tiler.models import ImageData
+from rio_tiler.types import ColorMapType
+from starlette.background import BackgroundTask
+from starlette.responses import FileResponse, StreamingResponse
+from typing_extensions import Annotated
+
+from titiler.core.algorithm import with_halo
+from titiler.core.archives import (
+    MBTilesWriter,
+    PMTilesWriter,
+    TileType,
+    tile_types,
+    zxy_to_tileid,
+)
+from titiler.core.factory import BaseFactory, FactoryExtension, TilerFactory
+from titiler.core.resources.enums import ImageType, MediaType
+from titiler.core.utils import render_image
+
+try:
+    from cogeo_mosaic.errors import NoAssetFoundError
+except ImportError:  # pragma: nocover
+    NoAssetFoundError = EmptyMosaicError  # type: ignore
+
+EMPTY_TILE_ERRORS = (TileOutsideBounds, EmptyMosaicError, NoAssetFoundError)
+
+
+class ArchiveType(str, Enum):
+    """Tile archive formats."""
+
+    pmtiles = "pmtiles"
+    mbtiles = "mbtiles"
+
+
+# (open dataset, read tile) functions
+TileSource = Tuple[
+    Callable[[], Any],
+    Callable[[Any, int, int, int, int], Tuple[ImageData, Optional[ColorMapType]]],
+]
+
+
+def _dataset_source(factory: TilerFactory, tms: morecantile.TileMatrixSet) -> Callable:
+    """Tile source dependency for `TilerFactory` (dataset reader)."""
+
+    def deps(
+        src_path=Depends(factory.path_dependency),
+        reader_params=Depends(factory.reader_dependency),
+        tile_params=Depends(factory.tile_dependency),
+        layer_params=Depends(factory.layer_dependency),
+        dataset_params=Depends(factory.dataset_dependency),
+        post_process=Depends(factory.process_dependency),
+    ) -> TileSource:
+        def _open():
+            return factory.reader(src_path, tms=tms, **reader_params.as_dict())
+
+        def _read(
+            src_dst, x: int, y: int, z: int, tilesize: int
+        ) -> Tuple[ImageData, Optional[ColorMapType]]:
+            image = src_dst.tile(
+                x,
+                y,
+                z,
+                tilesize=tilesize,
+                **with_halo(tile_params.as_dict(), post_process),
+                **layer_params.as_dict(),
+                **dataset_params.as_dict(),
+            )
+            return image, getattr(src_dst, "colormap", None)
+
+        return _open, _read
+
+    return deps
+
+
+def _mosaic_source(factory: Any, tms: morecantile.TileMatrixSet) -> Callable:
+    """Tile source dependency for `MosaicTilerFactory` (mosaic backend)."""
+
+    def deps(
+        src_path=Depends(factory.path_dependency),
+        backend_params=Depends(factory.backend_dependency),
+        reader_params=Depends(factory.reader_dependency),
+        tile_params=Depends(factory.tile_dependency),
+        layer_params=Depends(factory.layer_dependency),
+        dataset_params=Depends(factory.dataset_dependency),
+        pixel_selection=Depends(factory.pixel_selection_dependency),
+        post_process=Depends(factory.process_dependency),
+    ) -> TileSource:
+        def _open():
+            return factory.backend(
+                src_path,
+                tms=tms,
+                reader=factory.dataset_reader,
+                reader_options=reader_params.as_dict(),
+                **backend_params.as_dict(),
+            )
+
+        def _read(
+            src_dst, x: int, y: int, z: int, tilesize: int
+        ) -> Tuple[ImageData, Optional[ColorMapType]]:
+            image, _ = src_dst.tile(
+                x,
+                y,
+                z,
+                # pixel selection methods hold the mosaic state
+                pixel_selection=copy.deepcopy(pixel_selection),
+                tilesize=tilesize,
+                **with_halo(tile_params.as_dict(), post_process),
+                **layer_params.as_dict(),
+                **dataset_params.as_dict(),
+            )
+            return image, None
+
+        return _open, _read
+
+    return deps
+
+
+@define
+class archiveExtension(FactoryExtension):
+    """Add /archive.{pmtiles|mbtiles} endpoint to a TilerFactory or MosaicTilerFactory.
+
+    Tiles are rendered concurrently (`max_workers`) in Hilbert (PMTiles tile id) order
+    and spooled to a temporary file, then the archive is streamed.
+
+    Attributes:
+        max_tiles (int): Maximum number of tiles in an archive. Defaults to 10000.
+        max_workers (int): Number of threads rendering the tiles. Defaults to 4.
+        tmpdir (str, optional): Directory for the temporary files.
+
+    """
+
+    max_tiles: int = 10000
+    max_workers: int = 4
+    tmpdir: Optional[str] = None
+
+    def register(self, factory: BaseFactory):  # noqa: C901
+        """Register endpoint to the tiler factory."""
+        tms = morecantile.tms.get("WebMercatorQuad")
+        # `MosaicTilerFactory` has the same rendering dependencies as `TilerFactory`
+        tiler = cast(TilerFactory, factory)
+        is_mosaic = hasattr(factory, "backend")
+        source_dependency = (
+            _mosaic_source(factory, tms) if is_mosaic else _dataset_source(tiler, tms)
+        )
+
+        @factory.router.get(
+            "/archive.{archive_format}",
+            response_class=StreamingResponse,
+            responses={
+                200: {
+                    "content": {
+                        MediaType.pmtiles.value: {},
+                        MediaType.mbtiles.value: {},
+                    },
+                    "description": "Return a PMTiles or MBTiles archive.",
+                }
+            },
+        )
+        def archive(  # noqa: C901
+            archive_format: ArchiveType,
+            maxzoom: Annotated[int, Query(ge=0, le=24, description="Maximum zoom.")],
+            minzoom: Annotated[
+                int, Query(ge=0, le=24, description="Minimum zoom.")
+            ] = 0,
+            bbox: Annotated[
+                Optional[str],
+                Query(
+                    description="Area to export as `minx,miny,maxx,maxy` (WGS84). Defaults to the dataset bounds.",
+                ),
+            ] = None,
+            tile_format: Annotated[
+                ImageType,
+                Query(description="Tiles format."),
+            ] = ImageType.png,
+            tile_scale: Annotated[
+                int,
+                Query(
+                    gt=0, le=4, description="Tile size scale. 1=256x256, 2=512x512..."
+                ),
+            ] = 1,
+            source=Depends(source_dependency),
+            post_process=Depends(tiler.process_dependency),
+            rescale=Depends(tiler.rescale_dependency),
+            color_formula=Depends(tiler.color_formula_dependency),
+            colormap=Depends(tiler.colormap_dependency),
+            render_params=Depends(tiler.render_dependency),
+            env=Depends(tiler.environment_dependency),
+        ):
+            """Create a PMTiles or MBTiles archive."""
+            if minzoom > maxzoom:
+                raise HTTPException(400, "`minzoom` must be lower than `maxzoom`")
+
+            _open, _read = source
+
+            if bbox:
+                try:
+                    bounds = [float(v) for v in bbox.split(",")]
+                except ValueError as e:
+                    raise HTTPException(400, f"Invalid bbox: {bbox}") from e
+
+                if len(bounds) != 4:
+                    raise HTTPException(400, f"Invalid bbox: {bbox}")
+            else:
+                with rasterio.Env(**env):
+                    with _open() as src_dst:
+                        bounds = list(src_dst.get_geographic_bounds(WGS84_CRS))
+
+            # Tiles in Hilbert order (clustered PMTiles archive)
+            tiles: List[Tuple[int, morecantile.Tile]] = []
+            west, south, east, north = bounds
+            zooms = list(range(minzoom, maxzoom + 1))
+            for tile in tms.tiles(west, south, east, north, zooms):
+                tiles.append((zxy_to_tileid(tile.z, tile.x, tile.y), tile))
+                if len(tiles) > self.max_tiles:
+                    raise HTTPException(
+                        400,
+                        f"Maximum number of tiles ({self.max_tiles}) exceeded, use a smaller area or zoom range",
+                    )
+            tiles.sort(key=lambda t: t[0])
+
+            metadata = {
+                "name": "titiler",
+                "format": tile_format.value,
+                "type": "overlay",
+                "bounds": ",".join(map(str, bounds)),
+                "minzoom": str(minzoom),
+                "maxzoom": str(maxzoom),
+                "tilesize": str(256 * tile_scale),
+            }
+
+            local = threading.local()
+            lock = threading.Lock()
+
+            def _render(stack: ExitStack, tile: morecantile.Tile) -> Optional[bytes]:
+                with rasterio.Env(**env):
+                    # Each thread opens the dataset once
+                    src_dst = getattr(local, "src_dst", None)
+                    if src_dst is None:
+                        with lock:
+                            src_dst = local.src_dst = stack.enter_context(_open())
+
+                    try:
+                        image, dst_colormap = _read(
+                            src_dst, tile.x, tile.y, tile.z, 256 * tile_scale
+                        )
+                    except EMPTY_TILE_ERRORS:
+                        return None
+
+                if post_process:
+                    image = post_process(image)
+
+                if rescale:
+                    image.rescale(rescale)
+
+                if color_formula:
+                    image.apply_color_formula(color_formula)
+
+                content, _ = render_image(
+                    image,
+                    output_format=tile_format,
+                    colormap=colormap or dst_colormap,
+                    **render_params.as_dict(),
+                )
+                return content
+
+            def _tiles() -> Iterator[Tuple[morecantile.Tile, Optional[bytes]]]:
+                """Render tiles concurrently, yield them in order."""
+                with ExitStack() as stack:
+                    with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                        pending: Deque[Tuple[morecantile.Tile, Future]] = deque()
+                        for _, tile in tiles:
+                            pending.append(
+                                (tile, executor.submit(_render, stack, tile))
+                            )
+                            if len(pending) >= self.max_workers * 4:
+                                tile, future = pending.popleft()
+                                yield tile, future.result()
+
+                        while pending:
+                            tile, future = pending.popleft()
+                            yield tile, future.result()
+
+            def _write(writer: Any) -> None:
+                for tile, content in _tiles():
+                    if content is not None:
+                        writer.write_tile(tile.z, tile.x, tile.y, content)
+
+            headers: Dict[str, str] = {
+                "Content-Disposition": f'attachment; filename="tiles.{archive_format.value}"'
+            }
+
+            # Tiles are rendered before the response starts, so errors are returned
+            # with their status code (instead of a truncated archive)
+            if archive_format == ArchiveType.pmtiles:
+                pmtiles = PMTilesWriter(
+                    tile_type=tile_types.get(tile_format.name, TileType.unknown),
+                    directory=self.tmpdir,
+                )
+                try:
+                    _write(pmtiles)
+                    content = pmtiles.finalize(
+                        bounds=(west, south, east, north), metadata=metadata
+                    )
+                except BaseException:
+                    pmtiles.close()
+                    raise
+
+                return StreamingResponse(
+                    content,
+                    media_type=MediaType.pmtiles.value,
+                    headers=headers,
+                    background=BackgroundTask(pmtiles.close),
+                )
+
+            fd, path = tempfile.mkstemp(suffix=".mbtiles", dir=self.tmpdir)
+            os.close(fd)
+            try:
+                with MBTilesWriter(path, metadata=metadata) as mbtiles:
+                    _write(mbtiles)
+            except BaseException:
+                os.remove(path)
+                raise
+
+            return FileResponse(
+                path,
+                media_type=MediaType.mbtiles.value,
+                headers=headers,
+                background=BackgroundTask(os.remove, path),
+            )
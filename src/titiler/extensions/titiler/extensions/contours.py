@@ -0,0 +1,400 @@
+"""Contour lines (Mapbox Vector Tile) Extension.
+
+Contour lines are generated with the marching squares algorithm on the tile data (plus
+a buffer, so lines continue across tiles) and encoded as Mapbox Vector Tiles: one
+`LineString` feature per contour level, with an `elevation` property.
+
+"""
+
+import math
+import struct
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
+
+import numpy
+import rasterio
+from attrs import define
+from fastapi import Depends, Path, Query
+from starlette.responses import Response
+from typing_extensions import Annotated
+
+from titiler.core.errors import BadRequestError
+from titiler.core.factory import (
+    FactoryExtension,
+    TilerFactory,
+    count_reader_open,
+)
+from titiler.core.resources.enums import MediaType
+
+# Marching squares segments (pairs of cell edges: 0=top, 1=right, 2=bottom, 3=left),
+# indexed by the center value position (0=below, 1=above the level, only used for the
+# saddle cases 5 and 10) and the cell case
+# (top-left * 8 + top-right * 4 + bottom-right * 2 + bottom-left)
+_CASES = numpy.full((2, 16, 2, 2), -1, dtype="int8")
+for _center in (0, 1):
+    for _case, _segments in {
+        1: [(3, 2)],
+        2: [(2, 1)],
+        3: [(3, 1)],
+        4: [(0, 1)],
+        5: [[(0, 1), (3, 2)], [(3, 0), (2, 1)]][_center],
+        6: [(0, 2)],
+        7: [(3, 0)],
+        8: [(3, 0)],
+        9: [(0, 2)],
+        10: [[(3, 0), (2, 1)], [(0, 1), (3, 2)]][_center],
+        11: [(0, 1)],
+        12: [(3, 1)],
+        13: [(2, 1)],
+        14: [(3, 2)],
+    }.items():
+        _CASES[_center, _case, : len(_segments)] = _segments
+
+
+def contour_levels(
+    data: numpy.ma.MaskedArray,
+    interval: float,
+    base: float = 0.0,
+    max_levels: Optional[int] = None,
+) -> numpy.ndarray:
+    """Contour levels (`base + n * interval`) within the data range.
+
+    Raises a `BadRequestError` when there are more than `max_levels` levels (checked
+    before creating the levels array).
+
+    """
+    if data.count() == 0:
+        return numpy.array([], dtype="float64")
+
+    start = math.ceil((float(data.min()) - base) / interval)
+    stop = math.floor((float(data.max()) - base) / interval)
+    count = stop - start + 1
+    if max_levels is not None and count > max_levels:
+        raise BadRequestError(
+            f"Too many contour levels ({count}), maximum is {max_levels}: increase `interval`"
+        )
+
+    return base + numpy.arange(start, stop + 1) * interval
+
+
+def _chain_segments(
+    seg_start: numpy.ndarray, seg_end: numpy.ndarray
+) -> List[List[int]]:
+    """Chain segments sharing an edge into paths of edges.
+
+    Edges (`0` to `n - 1`) belong to one or two segments: paths start from the edges of a
+    single segment (open lines), the remaining segments form closed rings.
+
+    """
+    count = len(seg_start)
+    endpoints = numpy.concatenate([seg_start, seg_end])
+    order = numpy.argsort(endpoints, kind="stable") % count
+    counts = numpy.bincount(endpoints)
+    offsets = numpy.cumsum(counts) - counts
+    first = order[offsets]
+    second = numpy.where(
+        counts == 2, order[numpy.minimum(offsets + 1, 2 * count - 1)], -1
+    )
+
+    starts, ends = seg_start.tolist(), seg_end.tolist()
+    neighbors = list(zip(first.tolist(), second.tolist()))
+    used = bytearray(count)
+
+    def _walk(edge: int, segment: int) -> List[int]:
+        path = [edge]
+        while segment >= 0 and not used[segment]:
+            used[segment] = 1
+            edge = ends[segment] if starts[segment] == edge else starts[segment]
+            path.append(edge)
+            a, b = neighbors[edge]
+            segment = b if a == segment else a
+
+        return path
+
+    paths = [
+        _walk(edge, segment)
+        for edge in numpy.flatnonzero(counts == 1).tolist()
+        for segment in [neighbors[edge][0]]
+        if not used[segment]
+    ]
+    for segment in range(count):
+        if not used[segment]:
+            paths.append(_walk(starts[segment], segment))
+
+    return paths
+
+
+def contour_lines(data: numpy.ma.MaskedArray, level: float) -> List[numpy.ndarray]:
+    """Contour lines of a 2D array at a level (marching squares).
+
+    Vertices are linearly interpolated between pixels centers and returned as
+    `(x, y)` arrays in pixel coordinates (the center of the top-left pixel is `(0, 0)`).
+    Cells with a masked corner are skipped.
+
+    """
+    values = numpy.ma.getdata(data).astype("float64")
+    shape: Tuple[int, ...] = values.shape
+    height, width = shape
+    if height < 2 or width < 2:
+        return []
+
+    above = values >= level
+    case = (
+        above[:-1, :-1] * 8 + above[:-1, 1:] * 4 + above[1:, 1:] * 2 + above[1:, :-1]
+    ).astype("uint8")
+
+    mask = numpy.ma.getmaskarray(data)
+    invalid = mask[:-1, :-1] | mask[:-1, 1:] | mask[1:, 1:] | mask[1:, :-1]
+    crossing = numpy.flatnonzero((case > 0) & (case < 15) & ~invalid)
+    if not len(crossing):
+        return []
+
+    case = case.ravel()[crossing]
+    row, col = numpy.divmod(crossing, width - 1)
+    center_above = (
+        values[row, col]
+        + values[row, col + 1]
+        + values[row + 1, col + 1]
+        + values[row + 1, col]
+    ) / 4 >= level
+
+    # Edges are identified by their first pixel index: horizontal edges are
+    # `row * width + col`, vertical edges are offset by `height * width`
+    pixel = row * width + col
+    cell_edges = numpy.stack(
+        [
+            pixel,  # top
+            height * width + pixel + 1,  # right
+            pixel + width,  # bottom
+            height * width + pixel,  # left
+        ]
+    )
+
+    segments = _CASES[center_above.astype("uint8"), case]
+    cells = numpy.arange(len(crossing))
+    starts, ends = [], []
+    for i in range(2):
+        valid = segments[:, i, 0] >= 0
+        starts.append(cell_edges[segments[valid, i, 0], cells[valid]])
+        ends.append(cell_edges[segments[valid, i, 1], cells[valid]])
+
+    seg_start = numpy.concatenate(starts)
+    seg_end = numpy.concatenate(ends)
+
+    # Interpolated vertex for each crossed edge
+    edges = numpy.unique(numpy.concatenate([seg_start, seg_end]))
+    vertical = edges >= height * width
+    index = numpy.where(vertical, edges - height * width, edges)
+    row, col = numpy.divmod(index, width)
+    row2 = numpy.where(vertical, row + 1, row)
+    col2 = numpy.where(vertical, col, col + 1)
+    z1, z2 = values[row, col], values[row2, col2]
+    t = (level - z1) / (z2 - z1)
+    vertices = numpy.stack([col + t * (col2 - col), row + t * (row2 - row)], axis=1)
+
+    paths = _chain_segments(
+        numpy.searchsorted(edges, seg_start), numpy.searchsorted(edges, seg_end)
+    )
+    return [vertices[path] for path in paths]
+
+
+def _varint(value: int) -> bytes:
+    """Protobuf varint."""
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _field(number: int, content: bytes) -> bytes:
+    """Length-delimited protobuf field."""
+    return _varint((number << 3) | 2) + _varint(len(content)) + content
+
+
+def _uint_field(number: int, value: int) -> bytes:
+    """Varint protobuf field."""
+    return _varint(number << 3) + _varint(value)
+
+
+def _line_geometry(lines: Sequence[numpy.ndarray]) -> List[int]:
+    """MVT geometry commands for (Multi)LineString with integer coordinates."""
+    commands: List[int] = []
+    cursor = numpy.zeros(2, dtype="int64")
+    for line in lines:
+        deltas = numpy.diff(line, axis=0, prepend=cursor[numpy.newaxis])
+        cursor = line[-1]
+        zigzag = ((deltas << 1) ^ (deltas >> 63)).tolist()
+        commands += [(1 << 3) | 1, *zigzag[0]]  # MoveTo(1)
+        commands.append(((len(line) - 1) << 3) | 2)  # LineTo(n)
+        for dx, dy in zigzag[1:]:
+            commands += [dx, dy]
+
+    return commands
+
+
+def encode_mvt(
+    features: Sequence[Tuple[Sequence[numpy.ndarray], Dict[str, float]]],
+    layer: str = "contours",
+    extent: int = 4096,
+) -> bytes:
+    """Encode LineString features as a single layer Mapbox Vector Tile.
+
+    Args:
+        features: List of (lines, properties) with lines as `(x, y)` integer arrays in
+            tile coordinates (`0` to `extent`).
+        layer (str): Layer name.
+        extent (int): Tile extent.
+
+    """
+    keys: Dict[str, int] = {}
+    values: Dict[float, int] = {}
+
+    encoded_features = []
+    for lines, properties in features:
+        if not lines:
+            continue
+
+        tags: List[int] = []
+        for key, value in properties.items():
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault(value, len(values)))
+
+        geometry = b"".join(_varint(v) for v in _line_geometry(lines))
+        tags_content = b"".join(_varint(v) for v in tags)
+        encoded_features.append(
+            _field(2, tags_content)
+            + _uint_field(3, 2)  # LINESTRING
+            + _field(4, geometry)
+        )
+
+    if not encoded_features:
+        return b""
+
+    content = _uint_field(15, 2) + _field(1, layer.encode())
+    content += b"".join(_field(2, feature) for feature in encoded_features)
+    content += b"".join(_field(3, key.encode()) for key in keys)
+    content += b"".join(
+        _field(4, _varint((3 << 3) | 1) + struct.pack("<d", value))  # double_value
+        for value in values
+    )
+    content += _uint_field(5, extent)
+
+    return _field(3, content)
+
+
+def _to_tile_coordinates(
+    line: numpy.ndarray, buffer: int, tilesize: int, extent: int
+) -> numpy.ndarray:
+    """Pixel coordinates (in the buffered array) to deduplicated tile coordinates."""
+    coords = numpy.rint((line + 0.5 - buffer) * (extent / tilesize)).astype("int64")
+    keep = numpy.ones(len(coords), dtype="bool")
+    keep[1:] = numpy.any(coords[1:] != coords[:-1], axis=1)
+    return coords[keep]
+
+
+@define
+class contoursExtension(FactoryExtension):
+    """Add /contours/{tileMatrixSetId}/{z}/{x}/{y} (Mapbox Vector Tile) endpoint to a TilerFactory.
+
+    Attributes:
+        buffer (int): Pixels read around the tile so contours continue across tiles.
+        extent (int): Vector tile extent.
+        max_levels (int): Maximum number of contour levels in one tile.
+
+    """
+
+    buffer: int = 2
+    extent: int = 4096
+    max_levels: int = 500
+
+    def register(self, factory: TilerFactory):  # type: ignore[override]
+        """Register endpoint to the tiler factory."""
+
+        @factory.router.get(
+            "/contours/{tileMatrixSetId}/{z}/{x}/{y}",
+            response_class=Response,
+            responses={
+                200: {
+                    "content": {MediaType.mvt.value: {}},
+                    "description": "Return contour lines as a Mapbox Vector Tile.",
+                }
+            },
+        )
+        def contours(
+            z: Annotated[
+                int,
+                Path(
+                    description="Identifier (Z) selecting one of the scales defined in the TileMatrixSet and representing the scaleDenominator the tile.",
+                ),
+            ],
+            x: Annotated[
+                int,
+                Path(
+                    description="Column (X) index of the tile on the selected TileMatrix. It cannot exceed the MatrixHeight-1 for the selected TileMatrix.",
+                ),
+            ],
+            y: Annotated[
+                int,
+                Path(
+                    description="Row (Y) index of the tile on the selected TileMatrix. It cannot exceed the MatrixWidth-1 for the selected TileMatrix.",
+                ),
+            ],
+            tileMatrixSetId: Annotated[  # type: ignore
+                Literal[tuple(factory.supported_tms.list())],
+                Path(
+                    description="Identifier selecting one of the TileMatrixSetId supported."
+                ),
+            ],
+            interval: Annotated[
+                float,
+                Query(gt=0, description="Elevation interval between contour lines."),
+            ],
+            base: Annotated[
+                float,
+                Query(description="Elevation of a contour line (levels offset)."),
+            ] = 0.0,
+            tilesize: Annotated[
+                int,
+                Query(ge=64, le=1024, description="Size of the data tile contoured."),
+            ] = 256,
+            src_path=Depends(factory.path_dependency),
+            reader_params=Depends(factory.reader_dependency),
+            layer_params=Depends(factory.layer_dependency),
+            dataset_params=Depends(factory.dataset_dependency),
+            env=Depends(factory.environment_dependency),
+        ):
+            """Create contour lines vector tile from a dataset (first band)."""
+            tms = factory.supported_tms.get(tileMatrixSetId)
+            with rasterio.Env(**env):
+                with factory.reader(
+                    src_path, tms=tms, **reader_params.as_dict()
+                ) as src_dst:
+                    count_reader_open()
+                    image = src_dst.tile(
+                        x,
+                        y,
+                        z,
+                        tilesize=tilesize,
+                        buffer=self.buffer,
+                        **layer_params.as_dict(),
+                        **dataset_params.as_dict(),
+                    )
+
+            data = image.array[0]
+            levels = contour_levels(data, interval, base, max_levels=self.max_levels)
+
+            features = []
+            for level in levels.tolist():
+                lines = [
+                    _to_tile_coordinates(line, self.buffer, tilesize, self.extent)
+                    for line in contour_lines(data, level)
+                ]
+                features.append(
+                    ([line for line in lines if len(line) > 1], {"elevation": level})
+                )
+
+            return Response(
+                encode_mvt(features, extent=self.extent),
+                media_type=MediaType.mvt.value,
+            )
@@ -20,7 +20,11 @@ from starlette.responses import Response
 from starlette.templating import Jinja2Templates
 
 from titiler.core.dependencies import ColorFormulaParams, RescalingParams
-from titiler.core.factory import FactoryExtension, TilerFactory
+from titiler.core.factory import (
+    FactoryExtension,
+    TilerFactory,
+    count_reader_open,
+)
 from titiler.core.resources.enums import ImageType, MediaType
 from titiler.core.utils import render_image
 
@@ -378,6 +382,7 @@ class wmsExtension(FactoryExtension):
                         with factory.reader(
                             layer, **reader_params.as_dict()
                         ) as src_dst:
+                            count_reader_open()
                             layers_dict[layer]["srs"] = f"EPSG:{src_dst.crs.to_epsg()}"
                             layers_dict[layer]["bounds"] = src_dst.bounds
                             layers_dict[layer][
@@ -509,6 +514,7 @@ class wmsExtension(FactoryExtension):
                         with factory.reader(
                             src_path, **reader_params.as_dict()
                         ) as src_dst:
+                            count_reader_open()
                             return src_dst.part(
                                 bbox,
                                 width=width,
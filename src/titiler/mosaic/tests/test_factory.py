@@ -15,8 +15,12 @@ from fastapi import FastAPI
 from rio_tiler.mosaic.methods import PixelSelectionMethod
 from starlette.testclient import TestClient
 
+from titiler.core.arrays import decode_array
+from titiler.core.cache import ImageCache
 from titiler.core.dependencies import DefaultDependency
+from titiler.core.errors import DEFAULT_STATUS_CODES, add_exception_handlers
 from titiler.core.resources.enums import OptionalHeader
+from titiler.mosaic.errors import MOSAIC_STATUS_CODES
 from titiler.mosaic.factory import MosaicTilerFactory
 
 from .conftest import DATA_DIR
@@ -47,7 +51,7 @@ def test_MosaicTilerFactory():
         optional_headers=[OptionalHeader.x_assets],
         router_prefix="mosaic",
     )
-    assert len(mosaic.router.routes) == 18
+    assert len(mosaic.router.routes) == 20
 
     app = FastAPI()
     app.include_router(mosaic.router, prefix="/mosaic")
@@ -382,3 +386,160 @@ def test_MosaicTilerFactory_strict_zoom():
             )
             assert response.status_code == 400
             assert "Invalid ZOOM level 11" in response.text
+
+
+def test_MosaicTilerFactory_conditional_requests():
+    """Test ETag headers and conditional requests for mosaic tiles."""
+    mosaic = MosaicTilerFactory(conditional_requests=True)
+    app = FastAPI()
+    app.include_router(mosaic.router)
+    client = TestClient(app)
+
+    with tmpmosaic() as mosaic_file:
+        response = client.get(
+            "/tiles/WebMercatorQuad/7/37/45.png",
+            params={"url": mosaic_file, "rescale": "0,1000"},
+        )
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert response.headers["Last-Modified"]
+
+        response = client.get(
+            "/tiles/WebMercatorQuad/7/37/45.png",
+            params={"url": mosaic_file, "rescale": "0,1000"},
+            headers={"If-None-Match": etag},
+        )
+        assert response.status_code == 304
+
+
+def test_MosaicTilerFactory_server_timing():
+    """Test Server-Timing header for mosaic tiles."""
+    mosaic = MosaicTilerFactory(
+        optional_headers=[OptionalHeader.server_timing, OptionalHeader.x_assets]
+    )
+    app = FastAPI()
+    app.include_router(mosaic.router)
+    client = TestClient(app)
+
+    with tmpmosaic() as mosaic_file:
+        response = client.get(
+            "/tiles/WebMercatorQuad/7/37/45.png",
+            params={"url": mosaic_file, "rescale": "0,1000"},
+        )
+        assert response.status_code == 200
+        assert response.headers["X-Assets"]
+        timings = response.headers["Server-Timing"]
+        for stage in ["dependencies", "open", "read", "rescale", "encode"]:
+            assert f"{stage};dur=" in timings
+
+
+def test_MosaicTilerFactory_single_flight():
+    """Test concurrent identical mosaic tile requests coalescing."""
+    mosaic = MosaicTilerFactory(
+        single_flight=True, optional_headers=[OptionalHeader.x_assets]
+    )
+    app = FastAPI()
+    app.include_router(mosaic.router)
+    client = TestClient(app)
+
+    with tmpmosaic() as mosaic_file:
+        params = {"url": mosaic_file, "rescale": "0,1000"}
+        with patch.object(
+            mosaic.flights, "do", wraps=mosaic.flights.do
+        ) as single_flight:
+            response = client.get("/tiles/WebMercatorQuad/7/37/45.png", params=params)
+            assert response.status_code == 200
+            assert response.headers["X-Assets"]
+            single_flight.assert_called_once()
+
+            # Other endpoints are not coalesced
+            response = client.get("/WebMercatorQuad/tilejson.json", params=params)
+            assert response.status_code == 200
+            single_flight.assert_called_once()
+
+        assert not mosaic.flights._flights
+
+
+def test_MosaicTilerFactory_image_cache():
+    """Test mosaic tiles images cache."""
+    mosaic = MosaicTilerFactory(
+        image_cache=ImageCache(),
+        optional_headers=[OptionalHeader.x_assets, OptionalHeader.server_timing],
+    )
+    app = FastAPI()
+    app.include_router(mosaic.router)
+    client = TestClient(app)
+
+    with tmpmosaic() as mosaic_file:
+        params = {"url": mosaic_file, "rescale": "0,1000"}
+        response = client.get("/tiles/WebMercatorQuad/7/37/45.png", params=params)
+        assert response.status_code == 200
+        assets = response.headers["X-Assets"]
+        assert "read;dur=" in response.headers["Server-Timing"]
+
+        response = client.get(
+            "/tiles/WebMercatorQuad/7/37/45.jpeg",
+            params={**params, "rescale": "0,500"},
+        )
+        assert response.status_code == 200
+        assert response.headers["X-Assets"] == assets
+        timings = response.headers["Server-Timing"]
+        assert "cache;dur=" in timings
+        assert "read;dur=" not in timings
+
+        response = client.get(
+            "/tiles/WebMercatorQuad/7/37/45.png",
+            params={**params, "pixel_selection": "highest"},
+        )
+        assert response.status_code == 200
+        assert "read;dur=" in response.headers["Server-Timing"]
+
+    assert len(mosaic.image_cache) == 2
+
+
+def test_MosaicTilerFactory_points():
+    """Test /points endpoint for mosaics."""
+    app = FastAPI()
+    app.include_router(MosaicTilerFactory().router)
+    add_exception_handlers(app, DEFAULT_STATUS_CODES)
+    add_exception_handlers(app, MOSAIC_STATUS_CODES)
+    client = TestClient(app)
+
+    coordinates = [[-74.53125, 45.9956935], [-75.759, 46.3847], [0, 0]]
+    with tmpmosaic() as mosaic_file:
+        response = client.post(
+            "/points",
+            params={"url": mosaic_file},
+            json={"type": "MultiPoint", "coordinates": coordinates},
+        )
+        assert response.status_code == 200
+        body = response.json()
+        assert body["coordinates"] == coordinates
+        assert len(body["values"]) == 3
+        for (lon, lat), values in zip(coordinates[:2], body["values"]):
+            point = client.get(f"/point/{lon},{lat}", params={"url": mosaic_file})
+            assert values == [list(v) for v in point.json()["values"]]
+        assert body["values"][2] == []
+
+        # first valid value of each point
+        response = client.post(
+            "/points.bin",
+            params={"url": mosaic_file},
+            json={
+                "lon": [c[0] for c in coordinates],
+                "lat": [c[1] for c in coordinates],
+            },
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/octet-stream"
+        arr, mask = decode_array(response.content)
+        assert arr.shape == (3, 1, 3)
+        assert arr[:, 0, 0].tolist() == body["values"][0][0][1]
+        assert mask.tolist() == [[255, 0, 0]]
+
+        response = client.post(
+            "/points",
+            params={"url": mosaic_file},
+            json={"type": "Point", "coordinates": [0, 0]},
+        )
+        assert response.status_code == 204
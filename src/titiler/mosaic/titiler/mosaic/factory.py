@@ -1,27 +1,44 @@
 """TiTiler.mosaic Router factories."""
 
 import os
-from typing import Any, Callable, Dict, List, Literal, Optional, Type, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
 from urllib.parse import urlencode
 
+import numpy
 import rasterio
 from attrs import define, field
 from cogeo_mosaic.backends import BaseBackend, MosaicBackend
+from cogeo_mosaic.errors import NoAssetFoundError
 from cogeo_mosaic.models import Info as mosaicInfo
 from cogeo_mosaic.mosaic import MosaicJSON
-from fastapi import Depends, HTTPException, Path, Query
+from fastapi import Body, Depends, HTTPException, Path, Query
 from geojson_pydantic.features import Feature
 from geojson_pydantic.geometries import MultiPolygon, Polygon
 from morecantile import tms as morecantile_tms
 from morecantile.defaults import TileMatrixSets
 from pydantic import Field
+from rasterio.crs import CRS
 from rio_tiler.constants import MAX_THREADS, WGS84_CRS
+from rio_tiler.errors import PointOutsideBounds
 from rio_tiler.io import BaseReader, MultiBandReader, MultiBaseReader, Reader
-from rio_tiler.models import Bounds
+from rio_tiler.models import Bounds, ImageData
 from rio_tiler.mosaic.methods import PixelSelectionMethod
 from rio_tiler.mosaic.methods.base import MosaicMethodBase
+from rio_tiler.tasks import create_tasks, filter_tasks
 from rio_tiler.types import ColorMapType
 from rio_tiler.utils import CRS_to_uri
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from starlette.responses import HTMLResponse, Response
 from starlette.routing import NoMatchFound
@@ -30,6 +47,9 @@ from typing_extensions import Annotated
 
 from titiler.core.algorithm import BaseAlgorithm
 from titiler.core.algorithm import algorithms as available_algorithms
+from titiler.core.algorithm import with_halo
+from titiler.core.archives import read_archive_tile
+from titiler.core.cache import ImageCache, RangeCache
 from titiler.core.dependencies import (
     BidxExprParams,
     ColorFormulaParams,
@@ -39,17 +59,42 @@ from titiler.core.dependencies import (
     DatasetParams,
     DefaultDependency,
     ImageRenderingParams,
+    RequestKeyParams,
     RescaleType,
     RescalingParams,
     TileParams,
+    TimingsParams,
+    content_conditional_headers,
+    create_conditional_dependency,
+)
+from titiler.core.errors import BadRequestError
+from titiler.core.factory import (
+    DEFAULT_TEMPLATES,
+    BaseFactory,
+    count_reader_open,
+    img_endpoint_params,
 )
-from titiler.core.factory import DEFAULT_TEMPLATES, BaseFactory, img_endpoint_params
+from titiler.core.middleware import profiled
 from titiler.core.models.mapbox import TileJSON
 from titiler.core.models.OGC import TileSet, TileSetList
-from titiler.core.resources.enums import ImageType, OptionalHeader
+from titiler.core.models.requests import PointsBody
+from titiler.core.points import (
+    PointsValues,
+    points_coordinates,
+    read_points,
+    render_points,
+)
+from titiler.core.resources.enums import (
+    ArrayCompression,
+    ImageType,
+    MediaType,
+    OptionalHeader,
+    PointsFormat,
+)
 from titiler.core.resources.responses import GeoJSONResponse, JSONResponse, XMLResponse
+from titiler.core.singleflight import SingleFlight
 from titiler.core.utils import render_image
-from titiler.mosaic.models.responses import Point
+from titiler.mosaic.models.responses import Point, Points
 
 MOSAIC_THREADS = int(os.getenv("MOSAIC_CONCURRENCY", MAX_THREADS))
 MOSAIC_STRICT_ZOOM = str(os.getenv("MOSAIC_STRICT_ZOOM", False)).lower() in [
@@ -75,6 +120,97 @@ def DatasetPathParams(url: Annotated[str, Query(description="Mosaic URL")]) -> s
     return url
 
 
+MosaicPointValues = List[Tuple[str, numpy.ma.MaskedArray, List[str]]]
+
+
+def read_mosaic_points(
+    src_dst: BaseBackend,
+    coordinates: Sequence[Tuple[float, float]],
+    coord_crs: CRS = WGS84_CRS,
+    threads: int = MOSAIC_THREADS,
+    **kwargs: Any,
+) -> List[MosaicPointValues]:
+    """Read the values of multiple points from a Mosaic.
+
+    Points are grouped by asset: each asset is opened once and its points are read with
+    `titiler.core.points.read_points`. Returns, for each point, the list of
+    `(asset, values, band_names)` (in the mosaic's assets order).
+
+    """
+    points_assets = [
+        src_dst.assets_for_point(lon, lat, coord_crs=coord_crs)
+        for lon, lat in coordinates
+    ]
+
+    assets: Dict[str, List[int]] = {}
+    for idx, point_assets in enumerate(points_assets):
+        for asset in point_assets:
+            assets.setdefault(asset, []).append(idx)
+
+    if not assets:
+        raise NoAssetFoundError("No assets found for points")
+
+    def _reader(asset: str) -> PointsValues:
+        with src_dst.reader(asset, **src_dst.reader_options) as dst:
+            return read_points(
+                dst,
+                [coordinates[idx] for idx in assets[asset]],
+                coord_crs=coord_crs,
+                **kwargs,
+            )
+
+    tasks = create_tasks(_reader, list(assets), threads)
+    results: Dict[Tuple[str, int], Tuple[numpy.ma.MaskedArray, List[str]]] = {}
+    for pts, asset in filter_tasks(tasks, allowed_exceptions=(PointOutsideBounds,)):
+        for i, idx in enumerate(assets[asset]):
+            if not pts.outside[i]:
+                results[(asset, idx)] = (pts.values[:, i], pts.band_names)
+
+    return [
+        [
+            (asset, *results[(asset, idx)])
+            for asset in point_assets
+            if (asset, idx) in results
+        ]
+        for idx, point_assets in enumerate(points_assets)
+    ]
+
+
+def first_points_values(values: Sequence[MosaicPointValues]) -> PointsValues:
+    """Select the first valid value of each point (`first` pixel selection)."""
+    band_names: List[str] = []
+    selected: List[Optional[numpy.ma.MaskedArray]] = []
+    for point in values:
+        valid = [
+            (pts, names)
+            for _, pts, names in point
+            if not numpy.ma.getmaskarray(pts).all()
+        ]
+        if valid:
+            band_names = band_names or valid[0][1]
+            selected.append(valid[0][0])
+        else:
+            selected.append(None)
+
+    count = {len(pts) for pts in selected if pts is not None}
+    if len(count) > 1:
+        raise BadRequestError("Assets have different number of bands")
+
+    dtype = numpy.result_type(
+        *[pts.dtype for pts in selected if pts is not None] or ["float64"]
+    )
+    output = numpy.ma.masked_all(
+        (count.pop() if count else 1, len(values)), dtype=dtype
+    )
+    for idx, pts in enumerate(selected):
+        if pts is not None:
+            output[:, idx] = pts
+
+    return PointsValues(
+        output, band_names, numpy.array([pts is None for pts in selected])
+    )
+
+
 @define(kw_only=True)
 class MosaicTilerFactory(BaseFactory):
     """MosaicTiler Factory."""
@@ -126,6 +262,43 @@ class MosaicTilerFactory(BaseFactory):
     # Add/Remove some endpoints
     add_viewer: bool = True
 
+    # HTTP Conditional requests (ETag/Last-Modified)
+    conditional_requests: bool = False
+
+    # Concurrent identical tile requests coalescing
+    single_flight: bool = False
+    flights: SingleFlight = field(init=False, factory=SingleFlight)
+
+    # Pre-rendered tiles (PMTiles archive) dependency
+    archive_dependency: Callable[..., Optional[str]] = field(default=lambda: None)
+    archive_cache: Optional[RangeCache] = None
+
+    # Processed images (after post-processing) cache
+    image_cache: Optional[ImageCache] = None
+
+    # Maximum number of points for `/points` requests
+    max_points: Optional[int] = 10000
+
+    @property
+    def conditional_dependency(self) -> Callable[..., Dict[str, str]]:
+        """HTTP Conditional requests dependency.
+
+        Note: the validator is computed from the MosaicJSON document, not from the mosaic's assets.
+
+        """
+        if self.conditional_requests:
+            return create_conditional_dependency(self.path_dependency)
+
+        return lambda: {}
+
+    @property
+    def single_flight_dependency(self) -> Callable[..., Optional[str]]:
+        """Request coalescing key dependency."""
+        if self.single_flight:
+            return RequestKeyParams
+
+        return lambda: None
+
     def register_routes(self):
         """This Method register routes to the router."""
 
@@ -168,6 +341,7 @@ class MosaicTilerFactory(BaseFactory):
                     reader_options=reader_params.as_dict(),
                     **backend_params.as_dict(),
                 ) as src_dst:
+                    count_reader_open()
                     return src_dst.mosaic_def
 
     ############################################################################
@@ -196,6 +370,7 @@ class MosaicTilerFactory(BaseFactory):
                     reader_options=reader_params.as_dict(),
                     **backend_params.as_dict(),
                 ) as src_dst:
+                    count_reader_open()
                     crs = crs or WGS84_CRS
                     return {
                         "bounds": src_dst.get_geographic_bounds(crs or WGS84_CRS),
@@ -227,6 +402,7 @@ class MosaicTilerFactory(BaseFactory):
                     reader_options=reader_params.as_dict(),
                     **backend_params.as_dict(),
                 ) as src_dst:
+                    count_reader_open()
                     return src_dst.info()
 
         @self.router.get(
@@ -256,6 +432,7 @@ class MosaicTilerFactory(BaseFactory):
                     reader_options=reader_params.as_dict(),
                     **backend_params.as_dict(),
                 ) as src_dst:
+                    count_reader_open()
                     bounds = src_dst.get_geographic_bounds(crs or WGS84_CRS)
                     if bounds[0] > bounds[2]:
                         pl = Polygon.from_bounds(-180, bounds[1], bounds[2], bounds[3])
@@ -310,6 +487,7 @@ class MosaicTilerFactory(BaseFactory):
                     reader_options=reader_params.as_dict(),
                     **backend_params.as_dict(),
                 ) as src_dst:
+                    count_reader_open()
                     bounds = src_dst.get_geographic_bounds(crs or WGS84_CRS)
 
             collection_bbox = {
@@ -408,6 +586,7 @@ class MosaicTilerFactory(BaseFactory):
                     reader_options=reader_params.as_dict(),
                     **backend_params.as_dict(),
                 ) as src_dst:
+                    count_reader_open()
                     bounds = src_dst.get_geographic_bounds(tms.rasterio_geographic_crs)
                     minzoom = src_dst.minzoom
                     maxzoom = src_dst.maxzoom
@@ -525,7 +704,8 @@ class MosaicTilerFactory(BaseFactory):
             "/tiles/{tileMatrixSetId}/{z}/{x}/{y}@{scale}x.{format}",
             **img_endpoint_params,
         )
-        def tile(
+        async def tile(  # noqa: C901
+            request: Request,
             z: Annotated[
                 int,
                 Path(
@@ -560,6 +740,7 @@ class MosaicTilerFactory(BaseFactory):
                 ImageType,
                 "Default will be automatically defined if the output image needs a mask (png) or not (jpeg).",
             ] = None,
+            timings=Depends(TimingsParams),
             src_path=Depends(self.path_dependency),
             backend_params=Depends(self.backend_dependency),
             reader_params=Depends(self.reader_dependency),
@@ -572,62 +753,156 @@ class MosaicTilerFactory(BaseFactory):
             color_formula=Depends(self.color_formula_dependency),
             colormap=Depends(self.colormap_dependency),
             render_params=Depends(self.render_dependency),
+            cache_headers=Depends(self.conditional_dependency),
+            flight_key=Depends(self.single_flight_dependency),
+            archive=Depends(self.archive_dependency),
             env=Depends(self.environment_dependency),
         ):
             """Create map tile from a COG."""
+            timings.lap("dependencies")
+
             if scale < 1 or scale > 4:
                 raise HTTPException(
                     400,
                     f"Invalid 'scale' parameter: {scale}. Scale HAVE TO be between 1 and 4",
                 )
 
-            tms = self.supported_tms.get(tileMatrixSetId)
-            with rasterio.Env(**env):
-                with self.backend(
-                    src_path,
-                    tms=tms,
-                    reader=self.dataset_reader,
-                    reader_options=reader_params.as_dict(),
-                    **backend_params.as_dict(),
-                ) as src_dst:
+            def _read() -> Tuple[ImageData, List[str]]:
+                tms = self.supported_tms.get(tileMatrixSetId)
+                with rasterio.Env(**env):
+                    with self.backend(
+                        src_path,
+                        tms=tms,
+                        reader=self.dataset_reader,
+                        reader_options=reader_params.as_dict(),
+                        **backend_params.as_dict(),
+                    ) as src_dst:
+                        count_reader_open()
+                        timings.lap("open")
+
+                        if MOSAIC_STRICT_ZOOM and (
+                            z < src_dst.minzoom or z > src_dst.maxzoom
+                        ):
+                            raise HTTPException(
+                                400,
+                                f"Invalid ZOOM level {z}. Should be between {src_dst.minzoom} and {src_dst.maxzoom}",
+                            )
 
-                    if MOSAIC_STRICT_ZOOM and (
-                        z < src_dst.minzoom or z > src_dst.maxzoom
-                    ):
-                        raise HTTPException(
-                            400,
-                            f"Invalid ZOOM level {z}. Should be between {src_dst.minzoom} and {src_dst.maxzoom}",
+                        image, assets = src_dst.tile(
+                            x,
+                            y,
+                            z,
+                            pixel_selection=pixel_selection,
+                            tilesize=scale * 256,
+                            threads=MOSAIC_THREADS,
+                            **with_halo(tile_params.as_dict(), post_process),
+                            **layer_params.as_dict(),
+                            **dataset_params.as_dict(),
                         )
 
-                    image, assets = src_dst.tile(
+                timings.lap("read")
+
+                if post_process:
+                    image = post_process(image)
+                    timings.lap("postprocess")
+
+                return image, assets
+
+            def _render() -> Tuple[bytes, str, List[str]]:
+                if self.image_cache is None:
+                    image, assets = _read()
+
+                else:
+                    key = ImageCache.key(
+                        src_path,
+                        tileMatrixSetId,
+                        z,
                         x,
                         y,
-                        z,
-                        pixel_selection=pixel_selection,
-                        tilesize=scale * 256,
-                        threads=MOSAIC_THREADS,
-                        **tile_params.as_dict(),
-                        **layer_params.as_dict(),
-                        **dataset_params.as_dict(),
+                        scale,
+                        backend_params.as_dict(),
+                        reader_params.as_dict(),
+                        layer_params.as_dict(),
+                        dataset_params.as_dict(),
+                        type(pixel_selection).__name__,
+                        tile_params.as_dict(),
+                        post_process,
+                        env,
                     )
+                    cached = self.image_cache.get(key) if key else None
+                    if cached:
+                        image, assets = cached
+                        timings.lap("cache")
+                    else:
+                        image, assets = _read()
+                        if key:
+                            self.image_cache.set(key, image, assets)
+
+                if rescale:
+                    image.rescale(rescale)
+                    timings.lap("rescale")
+
+                if color_formula:
+                    image.apply_color_formula(color_formula)
+                    timings.lap("color_formula")
+
+                content, media_type = render_image(
+                    image,
+                    output_format=format,
+                    colormap=colormap,
+                    timings=timings,
+                    **render_params.as_dict(),
+                )
 
-            if post_process:
-                image = post_process(image)
-
-            if rescale:
-                image.rescale(rescale)
+                return content, media_type, assets
+
+            # Archive tiles are pre-rendered: only used without rendering options
+            rendering_options = [
+                post_process,
+                rescale,
+                color_formula,
+                colormap,
+                layer_params.as_dict(),
+                dataset_params.as_dict(),
+                tile_params.as_dict(),
+                render_params.as_dict(),
+            ]
+            archive_tile = None
+            if (
+                archive
+                and tileMatrixSetId == "WebMercatorQuad"
+                and not any(rendering_options)
+            ):
+                archive_tile = await run_in_threadpool(
+                    profiled(read_archive_tile),
+                    archive,
+                    z,
+                    x,
+                    y,
+                    tilesize=scale * 256,
+                    format=format.value if format else None,
+                    cache=self.archive_cache,
+                )
 
-            if color_formula:
-                image.apply_color_formula(color_formula)
+            assets: List[str] = []
+            if archive_tile:
+                content, media_type = archive_tile
+                timings.lap("archive")
+                if cache_headers:
+                    cache_headers = content_conditional_headers(request, content)
+            elif flight_key:
+                (content, media_type, assets), shared = await self.flights.do(
+                    flight_key, profiled(_render)
+                )
+                if shared:
+                    timings.lap("singleflight")
+            else:
+                content, media_type, assets = await run_in_threadpool(profiled(_render))
 
-            content, media_type = render_image(
-                image,
-                output_format=format,
-                colormap=colormap,
-                **render_params.as_dict(),
-            )
+            headers: Dict[str, str] = {**cache_headers}
+            if OptionalHeader.server_timing in self.optional_headers:
+                headers["Server-Timing"] = str(timings)
 
-            headers: Dict[str, str] = {}
             if OptionalHeader.x_assets in self.optional_headers:
                 headers["X-Assets"] = ",".join(assets)
 
@@ -720,6 +995,7 @@ class MosaicTilerFactory(BaseFactory):
                     reader_options=reader_params.as_dict(),
                     **backend_params.as_dict(),
                 ) as src_dst:
+                    count_reader_open()
                     center = list(src_dst.mosaic_def.center)
                     if minzoom is not None:
                         center[-1] = minzoom
@@ -887,6 +1163,7 @@ class MosaicTilerFactory(BaseFactory):
                     reader_options=reader_params.as_dict(),
                     **backend_params.as_dict(),
                 ) as src_dst:
+                    count_reader_open()
                     bounds = src_dst.get_geographic_bounds(tms.rasterio_geographic_crs)
                     minzoom = minzoom if minzoom is not None else src_dst.minzoom
                     maxzoom = maxzoom if maxzoom is not None else src_dst.maxzoom
@@ -976,6 +1253,7 @@ class MosaicTilerFactory(BaseFactory):
                     reader_options=reader_params.as_dict(),
                     **backend_params.as_dict(),
                 ) as src_dst:
+                    count_reader_open()
                     values = src_dst.point(
                         lon,
                         lat,
@@ -992,6 +1270,101 @@ class MosaicTilerFactory(BaseFactory):
                 ],
             }
 
+        @self.router.post(
+            "/points",
+            response_model=Points,
+            response_class=JSONResponse,
+            responses={
+                200: {
+                    "content": {
+                        "application/json": {},
+                        MediaType.bin.value: {},
+                    },
+                    "description": "Return values for multiple points",
+                }
+            },
+        )
+        @self.router.post(
+            "/points.{format}",
+            response_model=Points,
+            response_class=JSONResponse,
+            responses={
+                200: {
+                    "content": {
+                        "application/json": {},
+                        MediaType.bin.value: {},
+                    },
+                    "description": "Return values for multiple points",
+                }
+            },
+        )
+        def points(
+            body: Annotated[
+                PointsBody,
+                Body(
+                    description="GeoJSON (Multi)Point, Feature, FeatureCollection or `lon`/`lat` arrays."
+                ),
+            ],
+            format: Annotated[
+                PointsFormat,
+                "Output format (JSON or binary array). Default to JSON.",
+            ] = PointsFormat.json,
+            compression: Annotated[
+                Optional[ArrayCompression],
+                Query(description="Binary array compression."),
+            ] = None,
+            src_path=Depends(self.path_dependency),
+            backend_params=Depends(self.backend_dependency),
+            reader_params=Depends(self.reader_dependency),
+            coord_crs=Depends(CoordCRSParams),
+            layer_params=Depends(self.layer_dependency),
+            dataset_params=Depends(self.dataset_dependency),
+            env=Depends(self.environment_dependency),
+        ):
+            """Get values for multiple points of a Mosaic.
+
+            Points are grouped by asset and each asset is opened once. The JSON output
+            lists the values of all the assets for each point, the binary output holds
+            the first valid value of each point.
+
+            """
+            coordinates = points_coordinates(body)
+            if self.max_points and len(coordinates) > self.max_points:
+                raise BadRequestError(
+                    f"Too many points: {len(coordinates)} (maximum: {self.max_points})"
+                )
+
+            with rasterio.Env(**env):
+                with self.backend(
+                    src_path,
+                    reader=self.dataset_reader,
+                    reader_options=reader_params.as_dict(),
+                    **backend_params.as_dict(),
+                ) as src_dst:
+                    count_reader_open()
+                    values = read_mosaic_points(
+                        src_dst,
+                        coordinates,
+                        coord_crs=coord_crs or WGS84_CRS,
+                        threads=MOSAIC_THREADS,
+                        **layer_params.as_dict(),
+                        **dataset_params.as_dict(),
+                    )
+
+            if format == PointsFormat.bin:
+                content, media_type = render_points(
+                    first_points_values(values), format, compression=compression
+                )
+                return Response(content, media_type=media_type)
+
+            return {
+                "coordinates": [list(c) for c in coordinates],
+                "values": [
+                    [(src, pts.tolist(), band_names) for src, pts, band_names in point]
+                    for point in values
+                ],
+            }
+
     def validate(self):
         """Register /validate endpoint."""
 
@@ -1026,6 +1399,7 @@ class MosaicTilerFactory(BaseFactory):
                     reader_options=reader_params.as_dict(),
                     **backend_params.as_dict(),
                 ) as src_dst:
+                    count_reader_open()
                     return src_dst.assets_for_bbox(
                         minx,
                         miny,
@@ -1055,6 +1429,7 @@ class MosaicTilerFactory(BaseFactory):
                     reader_options=reader_params.as_dict(),
                     **backend_params.as_dict(),
                 ) as src_dst:
+                    count_reader_open()
                     return src_dst.assets_for_point(
                         lon,
                         lat,
@@ -1105,4 +1480,5 @@ class MosaicTilerFactory(BaseFactory):
                     reader_options=reader_params.as_dict(),
                     **backend_params.as_dict(),
                 ) as src_dst:
+                    count_reader_open()
                     return src_dst.assets_for_tile(x, y, z)
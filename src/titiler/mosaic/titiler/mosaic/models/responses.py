@@ -15,3 +15,15 @@ class Point(BaseModel):
 
     coordinates: List[float]
     values: List[Tuple[str, List[Optional[float]], List[str]]]
+
+
+class Points(BaseModel):
+    """
+    Points model.
+
+    response model for `/points` endpoints
+
+    """
+
+    coordinates: List[List[float]]
+    values: List[List[Tuple[str, List[Optional[float]], List[str]]]]
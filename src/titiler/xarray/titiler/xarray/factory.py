@@ -11,6 +11,7 @@ from rio_tiler.constants import WGS84_CRS
 from rio_tiler.models import Info
 from typing_extensions import Annotated
 
+from titiler.core.coverage import get_coverage_array
 from titiler.core.dependencies import (
     CoordCRSParams,
     CRSParams,
@@ -21,6 +22,7 @@ from titiler.core.dependencies import (
     StatisticsParams,
 )
 from titiler.core.factory import TilerFactory as BaseTilerFactory
+from titiler.core.factory import count_reader_open
 from titiler.core.models.responses import InfoGeoJSON, StatisticsGeoJSON
 from titiler.core.resources.responses import GeoJSONResponse, JSONResponse
 from titiler.xarray.dependencies import DatasetParams, PartFeatureParams, XarrayParams
@@ -82,6 +84,7 @@ class TilerFactory(BaseTilerFactory):
             """Return dataset's basic info."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     info = src_dst.info().model_dump()
                     if show_times and "time" in src_dst.input.dims:
                         times = [str(x.data) for x in src_dst.input.time]
@@ -115,6 +118,7 @@ class TilerFactory(BaseTilerFactory):
             """Return dataset's basic info as a GeoJSON feature."""
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     bounds = src_dst.get_geographic_bounds(crs or WGS84_CRS)
                     if bounds[0] > bounds[2]:
                         pl = Polygon.from_bounds(-180, bounds[1], bounds[2], bounds[3])
@@ -171,6 +175,7 @@ class TilerFactory(BaseTilerFactory):
             post_process=Depends(self.process_dependency),
             stats_params=Depends(self.stats_dependency),
             histogram_params=Depends(self.histogram_dependency),
+            coverage_method=Depends(self.coverage_dependency),
             env=Depends(self.environment_dependency),
         ):
             """Get Statistics from a geojson feature or featureCollection."""
@@ -180,6 +185,7 @@ class TilerFactory(BaseTilerFactory):
 
             with rasterio.Env(**env):
                 with self.reader(src_path, **reader_params.as_dict()) as src_dst:
+                    count_reader_open()
                     for feature in fc:
                         shape = feature.model_dump(exclude_none=True)
                         image = src_dst.feature(
@@ -192,9 +198,11 @@ class TilerFactory(BaseTilerFactory):
                         )
 
                         # Get the coverage % array
-                        coverage_array = image.get_coverage_array(
+                        coverage_array = get_coverage_array(
+                            image,
                             shape,
                             shape_crs=coord_crs or WGS84_CRS,
+                            method=coverage_method,
                         )
 
                         if post_process: